@@ -5,37 +5,141 @@ GUI for RAG + LLM Chatbot with PDF Upload
 
 import os
 import shutil
+import sqlite3
 import gc
+import hashlib
+import hmac
 import time
-from flask import Flask, render_template, request, jsonify, session
+import threading
+import uuid
+from flask import (
+    Flask, Blueprint, Response, current_app, g, render_template, request, jsonify, send_from_directory, session
+)
 from werkzeug.utils import secure_filename
-from src.core.rag_pipeline import RAGPipeline
-from src.core.query_engine import QueryEngine
-from src.database.chroma_manager import ChromaManager
-from src.utils import load_config, get_logger
+from src.core.conversation import ConversationStore
+from src.core.prefetch import PrefetchCache
+from src.utils import load_config, get_logger, set_request_id, reset_request_id
+from src.utils.admission import AdmissionPool, AdmissionRejected
+from src.utils.capture import RequestCapture
+from src.utils.profiling import PROFILER, ProfilingError, profiled
+from src.utils.uploads import prune_uploads, receive_upload
+from src.utils.metrics import (
+    REGISTRY, REQUESTS, REQUEST_SECONDS, start_cache_outcomes, start_stage_timings, stop_cache_outcomes,
+    stop_stage_timings
+)
 
 
-app = Flask(__name__)
-app.secret_key = 'project_lexora_secret_key_2024'
-app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB max file size
-
 # Configure upload folder
 UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'pdf'}
 
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
-
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+# Chunks retrieved per question (prefetches use the same, so /query can reuse them)
+TOP_K = 5
 
 logger = get_logger(__name__)
 config = load_config()
 
+bp = Blueprint('lexora', __name__)
+
 
 pipeline = None
 query_engine = None
 chroma_manager = None
 
+# Set once warmup() has finished and the engines can serve requests
+ready = threading.Event()
+_warmup_lock = threading.Lock()
+_warmup_thread = None
+_warmup_thread_lock = threading.Lock()
+
+# Endpoints that need the engines; everything else is served while warming
+ENGINE_ENDPOINTS = {'lexora.upload_pdf', 'lexora.query', 'lexora.prefetch', 'lexora.clear_database'}
+
+
+
+def open_conversations() -> ConversationStore:
+    """Conversation store shared by the workers (CONVERSATION_STORE), or this worker's own"""
+    options = dict(
+        max_sessions=config['conversation_max_sessions'],
+        ttl=config['conversation_ttl'],
+        max_turns=config['conversation_max_turns'],
+        summary_budget=config['history_token_budget'] // 3,
+    )
+    path = config['conversation_store']
+    if path:
+        try:
+            return ConversationStore(path=path, **options)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Conversations kept per worker, could not open {path}: {e}")
+    return ConversationStore(**options)
+
+
+# Chat history per browser session, opened by warmup() in each worker
+# (a SQLite connection must not be shared across a fork)
+conversations = None
+
+# Retrieval results for what each session is typing (kept by this worker process)
+prefetches = PrefetchCache(
+    max_sessions=config['prefetch_max_sessions'],
+    ttl=config['prefetch_ttl'],
+    min_interval=config['prefetch_min_interval'],
+)
+
+# Optional record of every /query for scripts/replay.py
+capture = RequestCapture(config['capture_log']) if config['capture_log'] else None
+
+# Separate admission pools so bulk uploads can't starve interactive queries,
+# and prefetches never queue (a busy worker just skips them)
+admission = {
+    'query': AdmissionPool('query', config['query_max_concurrency'],
+                           config['query_max_queue'], config['query_max_wait']),
+    'prefetch': AdmissionPool('prefetch', config['prefetch_max_concurrency'], 0, 0),
+    'ingest': AdmissionPool('ingest', config['ingest_max_concurrency'],
+                            config['ingest_max_queue'], config['ingest_max_wait']),
+}
+
+
+def busy_response(error):
+    """503 with a Retry-After hint for a request the admission pool turned away"""
+    logger.warning(f"Rejected request: {error}")
+    response = jsonify({
+        'success': False,
+        'message': 'Server is busy, please retry shortly',
+        'retry_after': error.retry_after
+    })
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 503
+
+
+def read_only_response():
+    """403 for write endpoints on a query replica (STORE_MODE=readonly)"""
+    return jsonify({
+        'success': False,
+        'message': 'This server is a read-only query replica; send uploads and clears to the ingestion service'
+    }), 403
+
+
+def admin_denied():
+    """
+    Response refusing an admin request, or None if it carries the admin token.
+    
+    Admin endpoints don't exist (404) unless ADMIN_TOKEN is set.
+    """
+    if not config['admin_token']:
+        return jsonify({'success': False, 'message': 'Not found'}), 404
+    supplied = request.headers.get('X-Admin-Token', '')
+    if not hmac.compare_digest(supplied.encode(), config['admin_token'].encode()):
+        return jsonify({'success': False, 'message': 'Admin token required'}), 403
+    return None
+
+
+def get_conversation():
+    """Conversation for this browser session, creating the session ID if needed"""
+    conversation_id = session.get('conversation_id')
+    if not conversation_id:
+        conversation_id = session['conversation_id'] = uuid.uuid4().hex
+    return conversations.get(conversation_id)
+
 
 def allowed_file(filename):
     """Check if file has allowed extension"""
@@ -46,22 +150,32 @@ def initialize_pipeline():
     """Initialize RAG pipeline and query engine"""
     global pipeline, query_engine, chroma_manager
     try:
+        # Heavy LangChain/Chroma imports happen here, not at module import,
+        # so the server can start answering before they finish
+        from src.core.rag_pipeline import RAGPipeline
+        from src.core.query_engine import QueryEngine
+        from src.database.chroma_manager import ChromaManager
+        
+        # One store handle (and one embedding client) shared by ingestion,
+        # querying and the status endpoints
+        logger.info("Initializing Chroma Manager...")
+        chroma_manager = ChromaManager(persist_directory=config['chroma_path'])
+        logger.info("Chroma Manager initialized successfully")
+        
         logger.info("Initializing RAG Pipeline...")
         pipeline = RAGPipeline(
             data_path=config['data_path'],
-            chroma_path=config['chroma_path']
+            chroma_path=config['chroma_path'],
+            vector_store=chroma_manager
         )
         logger.info("RAG Pipeline initialized successfully")
         
-        logger.info("Initializing Chroma Manager...")
-        from src.database.chroma_manager import ChromaManager
-        chroma_manager = ChromaManager(persist_directory=config['chroma_path'])
-        logger.info("Chroma Manager initialized successfully")
-        
         logger.info("Initializing Query Engine...")
         query_engine = QueryEngine(
             chroma_path=config['chroma_path'],
-            model_name=config.get('model_name', 'mistralai/mistral-7b-instruct')
+            model_name=config.get('model_name', 'mistralai/mistral-7b-instruct'),
+            vector_store=chroma_manager,
+            admission=admission['query']
         )
         logger.info("Query Engine initialized successfully")
         logger.info(f"Initial document count: {chroma_manager.get_document_count()}")
@@ -71,16 +185,152 @@ def initialize_pipeline():
         return False
 
 
-@app.route('/')
+def warmup() -> bool:
+    """
+    Initialize the engines for this process and mark it ready.
+    
+    Safe to call more than once (e.g. from a WSGI server hook and again
+    from a fallback path); only the first successful call does any work.
+    
+    Returns:
+        True if the process is ready to serve queries
+    """
+    global conversations
+    with _warmup_lock:
+        if ready.is_set():
+            return True
+        
+        started = time.perf_counter()
+        logger.info(f"Warming up worker (pid {os.getpid()})...")
+        if not initialize_pipeline():
+            return False
+        if conversations is None:
+            conversations = open_conversations()
+        
+        # Touch the store once so the first real request doesn't pay for
+        # opening the collection
+        chroma_manager.get_document_count()
+        ready.set()
+        logger.info(f"Worker {os.getpid()} ready in {time.perf_counter() - started:.2f}s")
+        return True
+
+
+def start_background_warmup() -> threading.Thread:
+    """
+    Run warmup() on a background thread so the server can accept requests
+    (/, /status, /health) immediately.
+    
+    Returns:
+        The warmup thread (the existing one if already started)
+    """
+    global _warmup_thread
+    with _warmup_thread_lock:
+        if _warmup_thread is None or (not _warmup_thread.is_alive() and not ready.is_set()):
+            _warmup_thread = threading.Thread(target=warmup, name='lexora-warmup', daemon=True)
+            _warmup_thread.start()
+        return _warmup_thread
+
+
+def create_app(config_overrides: dict = None) -> Flask:
+    """
+    Create and configure the Flask application.
+    
+    The engines are not built here: WSGI servers start a background warmup
+    once per worker after forking (see gunicorn.conf.py), and `python app.py`
+    starts one before running the development server.
+    
+    Args:
+        config_overrides: Optional Flask config values to apply
+    
+    Returns:
+        Flask: Configured application
+    """
+    flask_app = Flask(__name__)
+    flask_app.secret_key = os.getenv('SECRET_KEY', 'project_lexora_secret_key_2024')
+    flask_app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB max file size
+    flask_app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+    
+    if config_overrides:
+        flask_app.config.update(config_overrides)
+    
+    if not os.path.exists(flask_app.config['UPLOAD_FOLDER']):
+        os.makedirs(flask_app.config['UPLOAD_FOLDER'])
+    
+    flask_app.register_blueprint(bp)
+    return flask_app
+
+
+@bp.before_app_request
+def assign_request_id():
+    """Tag every log line for this request with a request ID"""
+    g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+    g.request_id_token = set_request_id(g.request_id)
+    g.request_started = time.perf_counter()
+
+
+@bp.after_app_request
+def add_request_id_header(response):
+    """Echo the request ID so clients can correlate logs, and count the request"""
+    request_id = g.get('request_id')
+    if request_id:
+        response.headers['X-Request-ID'] = request_id
+    
+    endpoint = request.endpoint or 'unknown'
+    if endpoint not in ('static', 'lexora.metrics'):
+        REQUESTS.inc(endpoint=endpoint, status=str(response.status_code))
+        started = g.get('request_started')
+        if started is not None:
+            REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+    
+    entry = g.pop('capture', None)
+    if capture is not None and entry is not None:
+        entry['status'] = response.status_code
+        entry['ms'] = round((time.perf_counter() - g.request_started) * 1000, 3)
+        capture.record(entry)
+    return response
+
+
+@bp.teardown_app_request
+def clear_request_id(exc):
+    token = g.pop('request_id_token', None)
+    if token is not None:
+        try:
+            reset_request_id(token)
+        except ValueError:
+            # Token was created in a different context (e.g. streamed response)
+            pass
+
+
+@bp.before_app_request
+def ensure_warm():
+    """
+    Start warming if no server hook did, and hold engine-bound requests
+    until the engines are ready (or answer 503 after WARMUP_WAIT seconds).
+    """
+    if ready.is_set():
+        return None
+    start_background_warmup()
+    if request.endpoint in ENGINE_ENDPOINTS and not ready.wait(config['warmup_wait']):
+        response = jsonify({'success': False, 'message': 'Server is warming up, please retry shortly'})
+        response.headers['Retry-After'] = '2'
+        return response, 503
+    return None
+
+
+@bp.route('/')
 def index():
     """Home page"""
     return render_template('index.html')
 
 
-@app.route('/upload', methods=['POST'])
+@bp.route('/upload', methods=['POST'])
+@profiled('upload')
 def upload_pdf():
     """Handle PDF upload"""
     try:
+        if config['store_mode'] == 'readonly':
+            return read_only_response()
+        
         if 'file' not in request.files:
             return jsonify({'success': False, 'message': 'No file provided'}), 400
         
@@ -92,49 +342,55 @@ def upload_pdf():
         if not allowed_file(file.filename):
             return jsonify({'success': False, 'message': 'Only PDF files allowed'}), 400
         
-        # Save file to uploads folder
+        # Hash while streaming to uploads/<sha256>.pdf; the hash only serves
+        # to recognise files already indexed
         filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
-        
-        logger.info(f"PDF file saved: {filename}")
-        
-        # Process the uploaded PDF
-        from langchain_community.document_loaders import PyPDFLoader
-        logger.info(f"Loading PDF: {filepath}")
-        loader = PyPDFLoader(filepath)
-        documents = loader.load()
-        logger.info(f"Loaded {len(documents)} pages from PDF")
-        
-        # Split and add to database
-        logger.info("Splitting documents...")
-        chunks = pipeline.split_documents(documents)
-        logger.info(f"Created {len(chunks)} chunks")
+        upload_folder = current_app.config['UPLOAD_FOLDER']
+        file_hash, stored_path, size = receive_upload(file.stream, upload_folder, keep=config['upload_keep'])
+        logger.info(f"PDF received: {filename} ({size} bytes, sha256 {file_hash[:12]})")
         
-        logger.info("Adding chunks to database...")
-        added_count = pipeline.add_chunks_to_database(chunks)
-        logger.info(f"Added {added_count} document chunks to database")
-        
-        # Reinitialize both query engine and chroma manager to refresh state
-        global query_engine, chroma_manager
-        logger.info("Reinitializing query engine and chroma manager...")
-        
-        # Recreate chroma manager to get fresh connection to updated database
-        from src.database.chroma_manager import ChromaManager
-        chroma_manager = ChromaManager(persist_directory=config['chroma_path'])
+        try:
+            if chroma_manager.has_file_hash(file_hash):
+                logger.info(f"✓ {filename} is already indexed, skipping")
+                return jsonify({
+                    'success': True,
+                    'message': 'This PDF is already indexed.',
+                    'filename': filename,
+                    'chunks': 0,
+                    'duplicate': True,
+                    'total_documents': chroma_manager.get_document_count()
+                }), 200
+            
+            with admission['ingest'].admit():
+                # Sources and chunk IDs use the uploaded name; new contents
+                # under a known name replace the previous version
+                source = os.path.join(upload_folder, filename)
+                replaced = chroma_manager.delete_source(source)
+                if replaced:
+                    logger.info(f"Replaced {replaced} chunks of the previous {filename}")
+                documents = pipeline.load_pdf(
+                    stored_path, source, metadata={'file_hash': file_hash, 'filename': filename},
+                    file_hash=file_hash
+                )
+                
+                # Split and add to database
+                logger.info("Splitting documents...")
+                chunks = pipeline.split_documents(documents)
+                logger.info(f"Created {len(chunks)} chunks")
+                
+                logger.info("Adding chunks to database...")
+                added_count = pipeline.add_chunks_to_database(chunks)
+                logger.info(f"Added {added_count} document chunks to database")
+        finally:
+            if not config['upload_keep']:
+                os.remove(stored_path)
+        
+        # The pipeline and query engine share chroma_manager, so the new
+        # chunks are already visible to queries
         new_count = chroma_manager.get_document_count()
-        logger.info(f"✓ Chroma manager refreshed. New document count: {new_count}")
-        
-        if new_count != added_count:
-            logger.warning(f"⚠ Mismatch! Added {added_count} chunks, but total is {new_count}")
-        
-        query_engine = QueryEngine(
-            chroma_path=config['chroma_path'],
-            model_name=config.get('model_name', 'mistralai/mistral-7b-instruct')
-        )
-        logger.info("✓ Query engine reinitialized")
         
         logger.info(f"✓ Upload complete! Total documents in DB: {new_count}")
+        prune_uploads(upload_folder, config['upload_max_age_days'])
         
         return jsonify({
             'success': True,
@@ -144,12 +400,14 @@ def upload_pdf():
             'total_documents': new_count
         }), 200
         
+    except AdmissionRejected as e:
+        return busy_response(e)
     except Exception as e:
         logger.error(f"Error uploading PDF: {str(e)}", exc_info=True)
         return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 500
 
 
-@app.route('/query', methods=['POST'])
+@bp.route('/query', methods=['POST'])
 def query():
     """Handle query requests"""
     try:
@@ -163,6 +421,15 @@ def query():
             return jsonify({'success': False, 'message': 'Query engine not initialized'}), 500
         
         logger.info(f"Query received: {user_query[:50]}...")
+        conversation = get_conversation()
+        top_k = TOP_K
+        if capture is not None:
+            g.capture = {
+                'ts': round(time.time(), 3),
+                'sid': hashlib.sha1(session['conversation_id'].encode()).hexdigest()[:10],
+                'q': user_query,
+                'k': top_k
+            }
         
         # Check if database has documents
         global chroma_manager
@@ -182,24 +449,88 @@ def query():
         
         logger.info(f"Executing query: {user_query[:50]}...")
         
-        # Execute query with timeout
-        answer, sources = query_engine.query(user_query, top_k=5)
+        # Optional per-stage breakdown: {"timings": true} or ?timings=1
+        want_timings = bool(data.get('timings')) or request.args.get('timings') == '1'
+        timings_token = start_stage_timings()
+        caches_token = start_cache_outcomes()
+        try:
+            # The engine takes an admission slot only if it has to call the LLM
+            prefetched = prefetches.take(session['conversation_id'])
+            answer, sources = query_engine.query(
+                user_query, top_k=top_k, conversation=conversation, prefetched=prefetched
+            )
+        finally:
+            timings = stop_stage_timings(timings_token)
+            caches = stop_cache_outcomes(caches_token)
+            if 'capture' in g:
+                g.capture.update(stages=timings, cache=caches)
         
         logger.info(f"Query executed successfully. Sources: {len(sources)}")
         
-        return jsonify({
+        response = {
             'success': True,
             'answer': answer,
             'sources': sources,
             'query': user_query
-        }), 200
+        }
+        if want_timings:
+            response['timings_ms'] = timings
+        return jsonify(response), 200
         
+    except AdmissionRejected as e:
+        return busy_response(e)
     except Exception as e:
         logger.error(f"Error executing query: {str(e)}", exc_info=True)
         return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 500
 
 
-@app.route('/status', methods=['GET'])
+@bp.route('/prefetch', methods=['POST'])
+def prefetch():
+    """
+    Retrieve context for the question being typed, for /query to reuse.
+    
+    An empty query cancels this session's prefetch.
+    """
+    try:
+        if not config['prefetch']:
+            return jsonify({'success': False, 'message': 'Prefetch is disabled'}), 404
+        
+        data = request.get_json(silent=True) or {}
+        partial_query = data.get('query', '').strip()
+        conversation = get_conversation()
+        session_id = session['conversation_id']
+        
+        if not partial_query:
+            prefetches.cancel(session_id)
+            return jsonify({'success': True, 'message': 'Prefetch cancelled'}), 200
+        
+        if query_engine is None or chroma_manager is None or chroma_manager.get_document_count() == 0:
+            return jsonify({'success': True, 'message': 'Nothing to prefetch', 'prefetched': False}), 200
+        
+        token = prefetches.begin(session_id)
+        if token is None:
+            response = jsonify({'success': False, 'message': 'Prefetching too often'})
+            response.headers['Retry-After'] = '1'
+            return response, 429
+        
+        with admission['prefetch'].admit():
+            # Skip the search if the user typed on (or submitted) meanwhile
+            if not prefetches.is_current(session_id, token):
+                return jsonify({'success': True, 'message': 'Superseded', 'prefetched': False}), 200
+            result = query_engine.prefetch(partial_query, top_k=TOP_K, conversation=conversation)
+        kept = prefetches.finish(session_id, token, result)
+        return jsonify({'success': True, 'message': 'Prefetched', 'prefetched': kept}), 200
+        
+    except AdmissionRejected:
+        # Prefetches are optional: a busy worker skips them without fuss
+        logger.debug("Prefetch skipped, all prefetch slots busy")
+        return jsonify({'success': True, 'message': 'Skipped', 'prefetched': False}), 200
+    except Exception as e:
+        logger.error(f"Error prefetching: {str(e)}", exc_info=True)
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 500
+
+
+@bp.route('/status', methods=['GET'])
 def status():
     """Get application status"""
     try:
@@ -211,6 +542,9 @@ def status():
         try:
             if chroma_manager is not None:
                 doc_count = chroma_manager.get_document_count()
+            elif _warmup_thread is not None and _warmup_thread.is_alive():
+                # Still warming up: not an error, the UI polls again
+                pass
             else:
                 logger.warning("Status request but chroma_manager is None!")
                 error_msg = "Database not initialized"
@@ -224,6 +558,8 @@ def status():
         response = {
             'success': error_msg is None,
             'initialized': query_engine is not None and error_msg is None,
+            'warming': not ready.is_set(),
+            'read_only': config['store_mode'] == 'readonly',
             'documents': doc_count,
             'model': model_name
         }
@@ -244,12 +580,114 @@ def status():
         }), 200  # Return 200 even on error so frontend can handle it
 
 
-@app.route('/clear', methods=['POST'])
+@bp.route('/health', methods=['GET'])
+def health():
+    """Readiness probe: 200 once this worker has warmed up, 503 before"""
+    if ready.is_set():
+        return jsonify({'status': 'ready', 'pid': os.getpid()}), 200
+    return jsonify({'status': 'starting', 'pid': os.getpid()}), 503
+
+
+@bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics for this worker"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+
+@bp.route('/conversation/reset', methods=['POST'])
+def reset_conversation():
+    """Start a new conversation for this browser session"""
+    conversation_id = session.pop('conversation_id', None)
+    if conversation_id and conversations is not None:
+        conversations.reset(conversation_id)
+        prefetches.cancel(conversation_id)
+    return jsonify({'success': True, 'message': 'Conversation reset'}), 200
+
+
+@bp.route('/admin/profile', methods=['GET', 'POST'])
+def admin_profile():
+    """
+    Profiling status (GET), or arm the profiler (POST).
+    
+    POST body: {"mode": "cprofile"|"sampling", "requests": N, "seconds": T,
+    "interval_ms": 5}; profiling stops after N profiled calls or T seconds.
+    """
+    denied = admin_denied()
+    if denied:
+        return denied
+    if request.method == 'GET':
+        return jsonify({'success': True, **PROFILER.status()}), 200
+    try:
+        data = request.get_json(silent=True) or {}
+        status = PROFILER.start(
+            mode=data.get('mode', 'sampling'),
+            requests=int(data['requests']) if data.get('requests') else None,
+            seconds=float(data['seconds']) if data.get('seconds') else None,
+            interval=float(data.get('interval_ms', 5)) / 1000
+        )
+        return jsonify({'success': True, 'message': 'Profiling started', **status}), 200
+    except (ProfilingError, ValueError) as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+
+@bp.route('/admin/profile/stop', methods=['POST'])
+def admin_profile_stop():
+    """Stop profiling early and write what was collected"""
+    denied = admin_denied()
+    if denied:
+        return denied
+    result = PROFILER.stop()
+    if result is None:
+        return jsonify({'success': False, 'message': 'Profiling is not running', 'last': PROFILER.status()['last']}), 409
+    return jsonify({'success': True, 'message': 'Profiling stopped', 'last': result}), 200
+
+
+@bp.route('/admin/profile/files/<name>', methods=['GET'])
+def admin_profile_file(name):
+    """Download a profile or memory snapshot file"""
+    denied = admin_denied()
+    if denied:
+        return denied
+    return send_from_directory(os.path.abspath(PROFILER.directory), secure_filename(name), as_attachment=True)
+
+
+@bp.route('/admin/memory', methods=['POST'])
+def admin_memory():
+    """
+    Take a tracemalloc snapshot, diffed against the previous one.
+    
+    The first call starts tracing. POST body: {"top": 20, "frames": 1}.
+    """
+    denied = admin_denied()
+    if denied:
+        return denied
+    data = request.get_json(silent=True) or {}
+    try:
+        result = PROFILER.memory_snapshot(top=int(data.get('top', 20)), frames=int(data.get('frames', 1)))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return jsonify({'success': True, **result}), 200
+
+
+@bp.route('/admin/memory/stop', methods=['POST'])
+def admin_memory_stop():
+    """Stop tracing allocations"""
+    denied = admin_denied()
+    if denied:
+        return denied
+    stopped = PROFILER.memory_stop()
+    return jsonify({'success': True, 'message': 'Tracing stopped' if stopped else 'Tracing was not running'}), 200
+
+
+@bp.route('/clear', methods=['POST'])
 def clear_database():
     """Clear the vector database"""
     try:
         global pipeline, query_engine, chroma_manager
         
+        if config['store_mode'] == 'readonly':
+            return read_only_response()
+        
         logger.info("=" * 60)
         logger.info("CLEAR DATABASE REQUEST STARTED")
         logger.info("=" * 60)
@@ -270,7 +708,7 @@ def clear_database():
             # Delete all documents
             if doc_ids:
                 logger.info(f"  Deleting {len(doc_ids)} documents...")
-                chroma_manager.db.delete(ids=doc_ids)
+                chroma_manager.delete_documents(doc_ids)
                 logger.info("  ✓ Documents deleted")
                 
                 # Persist the changes
@@ -281,6 +719,12 @@ def clear_database():
                 except:
                     pass
             
+            # Histories and prefetched results refer to the cleared documents
+            if conversations is not None:
+                conversations.clear()
+            prefetches.clear()
+            logger.info("  ✓ Conversations and prefetches reset")
+            
             # Verify empty
             verify = chroma_manager.db.get(include=[])
             final_count = len(verify.get("ids", []))
@@ -311,18 +755,18 @@ def clear_database():
         return jsonify({'success': False, 'message': str(e)}), 500
 
 
+app = create_app()
+
+
 if __name__ == '__main__':
-    # Initialize pipeline on startup
-    if initialize_pipeline():
-        logger.info("Pipeline initialized successfully")
-        print("✓ Pipeline initialized")
-    else:
-        print("✗ Failed to initialize pipeline")
+    # Warm the engines in the background; / and /status answer right away
+    start_background_warmup()
+    print("✓ Server starting, engines warming up in the background")
     
-    # Run Flask app
+    # Run Flask development server (use gunicorn.conf.py in production)
     app.run(
-        host='0.0.0.0',
-        port=5000,
+        host=config['host'],
+        port=config['port'],
         debug=True,
         use_reloader=False
     )
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""
+Embedding Backend Benchmark
+Compares the remote backend (against the local OpenAI stand-in server, with
+a simulated network round trip) with the in-process backends: ingest
+throughput over synthetic chunks and single-query embedding latency.
+
+Usage:
+    python benchmarks/embedding_bench.py --chunks 2000 --remote-latency 0.15
+    python benchmarks/embedding_bench.py --model-path models/all-MiniLM-L6-v2
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from langchain_core.embeddings import Embeddings
+
+from benchmarks.fake_openai_server import FakeOpenAIServer
+from benchmarks.fakes import synthetic_pages
+from src.models.hash_embeddings import HashingEmbeddings
+
+
+def measure(embeddings: Embeddings, texts: List[str], queries: List[str], batch_size: int) -> Dict[str, float]:
+    """Embed `texts` in ingest-sized batches, then `queries` one at a time"""
+    started = time.perf_counter()
+    for start in range(0, len(texts), batch_size):
+        embeddings.embed_documents(texts[start:start + batch_size])
+    ingest = time.perf_counter() - started
+
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        embeddings.embed_query(query)
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    return {
+        "texts_per_s": len(texts) / ingest,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+    }
+
+
+def main():
+    """Main execution function"""
+    parser = argparse.ArgumentParser(description="Compare embedding backends")
+    parser.add_argument("--chunks", type=int, default=2000, help="Texts embedded for the ingest run")
+    parser.add_argument("--queries", type=int, default=100, help="Single-query embeddings timed")
+    parser.add_argument("--batch-size", type=int, default=100, help="Texts per embed_documents call")
+    parser.add_argument("--remote-latency", type=float, default=0.15,
+                        help="Simulated provider round trip in seconds")
+    parser.add_argument("--model-path", help="ONNX model directory for the local backend")
+    args = parser.parse_args()
+
+    texts = [page.page_content[:800] for page in synthetic_pages(args.chunks)]
+    queries = [f"what is the punishment for offence {i}" for i in range(args.queries)]
+    results = {}
+
+    with FakeOpenAIServer(embed_latency=args.remote_latency) as server:
+        from langchain_openai import OpenAIEmbeddings
+
+        remote = OpenAIEmbeddings(
+            openai_api_base=server.url, openai_api_key="bench", check_embedding_ctx_length=False
+        )
+        results["remote"] = measure(remote, texts, queries, args.batch_size)
+
+    results["hash"] = measure(HashingEmbeddings(), texts, queries, args.batch_size)
+
+    if args.model_path:
+        from src.models.onnx_embeddings import OnnxEmbeddings
+
+        results["local"] = measure(OnnxEmbeddings(args.model_path), texts, queries, args.batch_size)
+    else:
+        print("(pass --model-path to include the local ONNX backend)")
+
+    print(f"{'backend':<8} {'texts/s':>10} {'query p50':>10} {'query p95':>10}")
+    for name, result in results.items():
+        print(f"{name:<8} {result['texts_per_s']:10,.0f} {result['p50_ms']:8.1f}ms {result['p95_ms']:8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
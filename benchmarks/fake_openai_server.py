@@ -0,0 +1,192 @@
+"""
+Local OpenAI-compatible stand-in server for load tests and benchmarks
+
+Serves `/v1/embeddings` and `/v1/chat/completions` with deterministic
+responses and configurable latency, so the app can be exercised end to end
+without a provider account or network access.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+# Shared with the "hash" embedding backend so both produce the same vectors
+from src.models.hash_embeddings import hash_embedding
+
+
+class _BacklogServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer with room for a burst of connections from a load test"""
+
+    request_queue_size = 128
+
+
+class FakeOpenAIServer:
+    """Threaded HTTP server that mimics the subset of the OpenAI API we use"""
+    
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        chat_latency: float = 0.05,
+        embed_latency: float = 0.0,
+        dimensions: int = 64,
+        model_latency: Optional[Dict[str, float]] = None,
+        slow_requests: int = 0,
+        slow_latency: float = 0.0,
+    ):
+        """
+        Initialize the fake server.
+        
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+            chat_latency: Seconds to sleep before each chat completion
+            embed_latency: Seconds to sleep before each embeddings call
+            dimensions: Embedding width
+            model_latency: Per-model chat latency overriding chat_latency
+            slow_requests: Number of initial chat requests to slow down
+            slow_latency: Latency for those slow requests
+        """
+        self.chat_latency = chat_latency
+        self.embed_latency = embed_latency
+        self.dimensions = dimensions
+        self.model_latency = model_latency or {}
+        self.slow_requests = slow_requests
+        self.slow_latency = slow_latency
+        self.lock = threading.Lock()
+        self.stats = {"chat": 0, "embeddings": 0, "embedded_texts": 0, "chat_started": 0}
+        self._server = _BacklogServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def url(self) -> str:
+        """Base URL to use as OPENAI_API_BASE"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+    
+    def start(self) -> "FakeOpenAIServer":
+        """Serve requests on a background thread"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self) -> None:
+        """Shut the server down"""
+        self._server.shutdown()
+        self._server.server_close()
+    
+    def __enter__(self) -> "FakeOpenAIServer":
+        return self.start()
+    
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+    
+    def _count(self, key: str, amount: int = 1) -> None:
+        with self.lock:
+            self.stats[key] += amount
+    
+    def embeddings(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Build an embeddings response"""
+        inputs = body.get("input", [])
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        
+        if self.embed_latency:
+            time.sleep(self.embed_latency)
+        self._count("embeddings")
+        self._count("embedded_texts", len(inputs))
+        
+        data = [
+            {"object": "embedding", "index": i, "embedding": hash_embedding(item, self.dimensions)}
+            for i, item in enumerate(inputs)
+        ]
+        tokens = sum(len(item) if isinstance(item, list) else len(item.split()) for item in inputs)
+        return {
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "fake-embedding"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+    
+    def chat(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Build a chat completion response"""
+        with self.lock:
+            self.stats["chat_started"] += 1
+            slow = self.stats["chat_started"] <= self.slow_requests
+        latency = self.slow_latency if slow else self.model_latency.get(body.get("model"), self.chat_latency)
+        if latency:
+            time.sleep(latency)
+        self._count("chat")
+        
+        messages = body.get("messages", [])
+        prompt = messages[-1].get("content", "") if messages else ""
+        answer = f"Based on the context: {' '.join(prompt.split()[:40])}"
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in messages)
+        completion_tokens = len(answer.split())
+        return {
+            "id": f"chatcmpl-fake-{int(time.time() * 1000)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake-chat"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": answer},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+    
+    def _make_handler(self):
+        fake = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                
+                if self.path.endswith("/embeddings"):
+                    payload = fake.embeddings(body)
+                elif self.path.endswith("/chat/completions"):
+                    payload = fake.chat(body)
+                else:
+                    self.send_error(404)
+                    return
+                
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        return Handler
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Run a local OpenAI-compatible stand-in server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--chat-latency", type=float, default=0.05)
+    parser.add_argument("--embed-latency", type=float, default=0.0)
+    args = parser.parse_args()
+    
+    server = FakeOpenAIServer(port=args.port, chat_latency=args.chat_latency,
+                              embed_latency=args.embed_latency)
+    print(f"Fake OpenAI server listening on {server.url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,204 @@
+"""
+In-process fakes for offline benchmarks and tests
+
+HashEmbeddings and FakeChatModel stand in for the OpenAI-compatible
+providers without any network access; synthetic_pages(), synthetic_statutes()
+and write_pdf() generate a deterministic statute-like corpus.
+"""
+
+import random
+import threading
+import time
+from typing import Any, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from src.models.hash_embeddings import HashingEmbeddings, hash_embedding
+
+OFFENSES = [
+    "hacking with computer system", "cheating by personation using computer resource",
+    "publishing private images without consent", "cyberterrorism",
+    "tampering with computer source documents", "receiving stolen computer resource",
+    "identity theft using password of another person", "securing access to a protected system",
+    "publishing obscene material in electronic form", "breach of confidentiality and privacy",
+]
+
+_chat_lock = threading.Lock()
+
+
+class RateLimitError(RuntimeError):
+    """What a provider raises (HTTP 429) when too many calls are in flight"""
+
+
+class HashEmbeddings(HashingEmbeddings):
+    """The "hash" backend with call counting and optional simulated latency"""
+
+    def __init__(self, dimensions: int = 64, latency: float = 0.0):
+        super().__init__(dimensions)
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _count(self) -> None:
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self._count()
+        return [hash_embedding(text, self.dimensions) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self._count()
+        return hash_embedding(text, self.dimensions)
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that answers from its prompt after a configurable delay"""
+
+    latency: float = 0.0
+    calls: int = 0
+    # Concurrent calls allowed before answering 429 (0 = unlimited)
+    max_concurrency: int = 0
+    in_flight: int = 0
+    rate_limited: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        with _chat_lock:
+            self.calls += 1
+            if self.max_concurrency and self.in_flight >= self.max_concurrency:
+                self.rate_limited += 1
+                raise RateLimitError("429 Too Many Requests")
+            self.in_flight += 1
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+        finally:
+            with _chat_lock:
+                self.in_flight -= 1
+        prompt = str(messages[-1].content) if messages else ""
+        answer = f"Based on the context: {' '.join(prompt.split()[:40])}"
+        prompt_tokens = sum(len(str(m.content).split()) for m in messages)
+        message = AIMessage(
+            content=answer,
+            usage_metadata={
+                "input_tokens": prompt_tokens,
+                "output_tokens": len(answer.split()),
+                "total_tokens": prompt_tokens + len(answer.split()),
+            },
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def synthetic_page(i: int, source: str = "synthetic.pdf") -> Document:
+    """One deterministic statute-like page"""
+    offense = OFFENSES[i % len(OFFENSES)]
+    text = (
+        f"Section {60 + i}. Punishment for {offense}. Whoever commits the offense of "
+        f"{offense} shall be punished with imprisonment for a term which may extend to "
+        f"{i % 10 + 1} years, or with fine which may extend to {(i % 50 + 1) * 10000} rupees, "
+        f"or with both. Explanation {i}: for the purposes of this section, computer resource "
+        f"includes any computer, computer system, network or communication device. "
+    ) * 3
+    return Document(page_content=text, metadata={"source": source, "page": i})
+
+
+def synthetic_pages(n: int, source: str = "synthetic.pdf") -> List[Document]:
+    """A deterministic corpus of `n` pages"""
+    return [synthetic_page(i, source) for i in range(n)]
+
+
+def synthetic_statutes(
+    statutes: int,
+    sections: int,
+    pages_per_section: int = 2,
+    seed: int = 0
+) -> Tuple[List[Document], List[str]]:
+    """
+    A multi-statute corpus in which every statute and section has its own vocabulary.
+
+    Each section opens with a "Section N." heading and its pages mix
+    section-specific terms, statute-wide terms and common filler, so a
+    query built from a section's terms has a known home.
+
+    Returns:
+        (pages, queries) with one query per section, ordered as
+        statute 0 section 0, statute 0 section 1, ...
+    """
+    rng = random.Random(seed)
+    filler = ["whoever", "shall", "punished", "imprisonment", "term", "extend", "fine", "person", "offence"]
+    pages, queries = [], []
+    for statute in range(statutes):
+        statute_terms = [f"act{statute}term{i}" for i in range(20)]
+        for section in range(sections):
+            section_terms = [f"act{statute}sec{section}term{i}" for i in range(8)]
+            queries.append(" ".join(rng.sample(section_terms, 3) + rng.sample(statute_terms, 1)))
+            for part in range(pages_per_section):
+                words = [
+                    rng.choice(section_terms) if roll < 0.3 else rng.choice(statute_terms) if roll < 0.5
+                    else rng.choice(filler)
+                    for roll in (rng.random() for _ in range(260))
+                ]
+                title = " ".join(section_terms[:3])
+                heading = f"Section {section + 1}. Offences of {title}.\n" if part == 0 else ""
+                pages.append(Document(
+                    page_content=heading + " ".join(words),
+                    metadata={"source": f"statute_{statute}.pdf", "page": section * pages_per_section + part},
+                ))
+    return pages, queries
+
+
+def write_pdf(path: str, pages: List[str]) -> None:
+    """
+    Write a minimal, valid PDF with one page of Helvetica text per entry.
+
+    Args:
+        path: Output file path
+        pages: Text for each page (wrapped at ~90 characters)
+    """
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for text in pages:
+        words, lines, line = text.split(), [], ""
+        for word in words:
+            if len(line) + len(word) > 90:
+                lines.append(line)
+                line = ""
+            line += word + " "
+        lines.append(line)
+        escaped = [l.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") for l in lines]
+        stream = "BT /F1 10 Tf 40 800 Td 12 TL " + " ".join(f"({l}) '" for l in escaped) + " ET"
+        stream_bytes = stream.encode("latin-1", "replace")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream_bytes), stream_bytes))
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % pid for pid in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+
+    with open(path, "wb") as f:
+        f.write(output)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""
+Hierarchical Retrieval Benchmark
+Ingests a synthetic multi-statute corpus with document/section summaries,
+then compares flat chunk search with hierarchical search: query latency,
+recall@k of the section each query was written from, and the share of the
+corpus the chunk-level search is restricted to.
+
+Usage:
+    python benchmarks/hierarchical_bench.py --statutes 20 --sections 50
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fakes import synthetic_statutes
+from src.core.rag_pipeline import RAGPipeline
+from src.database.chroma_manager import ChromaManager
+from src.models.hash_embeddings import HashingEmbeddings
+
+
+def main():
+    """Main execution function"""
+    parser = argparse.ArgumentParser(description="Compare flat and hierarchical retrieval")
+    parser.add_argument("--statutes", type=int, default=20, help="Documents in the corpus")
+    parser.add_argument("--sections", type=int, default=50, help="Sections per document")
+    parser.add_argument("--pages", type=int, default=2, help="Pages per section")
+    parser.add_argument("--queries", type=int, default=200, help="Queries timed")
+    parser.add_argument("--k", type=int, default=5, help="Chunks per query")
+    parser.add_argument("--documents", type=int, default=2, help="Documents narrowed down to")
+    parser.add_argument("--top-sections", type=int, default=4, help="Sections searched")
+    args = parser.parse_args()
+
+    pages, queries = synthetic_statutes(args.statutes, args.sections, args.pages)
+    workdir = tempfile.mkdtemp(prefix="lexora_hierarchical_")
+    try:
+        store = ChromaManager(workdir, embedding_function=HashingEmbeddings(256), read_only=False, reduction="none")
+        pipeline = RAGPipeline(data_path="data", chroma_path=workdir, vector_store=store, build_sections=True)
+        started = time.perf_counter()
+        pipeline.add_chunks_to_database(pipeline.split_documents(pages))
+        total = store.get_document_count()
+        print(f"{total:,} chunks, {store.sections.count():,} summaries, "
+              f"ingested in {time.perf_counter() - started:.1f}s")
+
+        rng = np.random.default_rng(0)
+        picks = rng.choice(len(queries), size=min(args.queries, len(queries)), replace=False)
+        items = store.db.get(include=["metadatas"])
+        section_of = {chunk_id: metadata["section"] for chunk_id, metadata in zip(items["ids"], items["metadatas"])}
+        # Every chunk of the section a query was built from counts as relevant
+        home = {}
+        for chunk_id, metadata in zip(items["ids"], items["metadatas"]):
+            statute = int(metadata["source"].split("_")[1].split(".")[0])
+            home.setdefault((statute, metadata["page"] // args.pages), set()).add(chunk_id)
+
+        searches = {
+            "flat": lambda text: store.similarity_search(text, k=args.k),
+            "hierarchical": lambda text: store.hierarchical_search(
+                text, k=args.k, documents=args.documents, sections=args.top_sections
+            ),
+        }
+        print(f"{'mode':<13} {f'recall@{args.k}':>9} {'p50':>8} {'p95':>8} {'searched':>9}")
+        for mode, search in searches.items():
+            latencies, recalls, searched = [], [], []
+            for pick in picks:
+                text = queries[pick]
+                relevant = home[divmod(int(pick), args.sections)]
+                started = time.perf_counter()
+                results = search(text)
+                latencies.append((time.perf_counter() - started) * 1000)
+                found = {doc.metadata["id"] for doc, _score in results}
+                recalls.append(len(found & relevant) / min(args.k, len(relevant)))
+                if mode == "flat":
+                    searched.append(1.0)
+                else:
+                    sections = set(store.select_sections(
+                        store.embedding_function.embed_query(text), args.documents, args.top_sections
+                    ))
+                    searched.append(sum(section in sections for section in section_of.values()) / total)
+            latencies.sort()
+            print(f"{mode:<13} {np.mean(recalls):9.3f} {np.median(latencies):6.2f}ms "
+                  f"{latencies[int(len(latencies) * 0.95) - 1]:6.2f}ms {np.mean(searched):8.1%}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
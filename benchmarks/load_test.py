@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+"""
+Load Test Script
+Measures /query requests per second under gunicorn at several worker counts,
+against a local OpenAI-compatible stand-in server.
+
+Usage:
+    python benchmarks/load_test.py --workers 1 2 4 --concurrency 16 --duration 10
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fake_openai_server import FakeOpenAIServer
+
+QUESTIONS = [
+    "What is the punishment for hacking with computer system?",
+    "What is the offense of cheating using computer resource?",
+    "What is cyberterrorism?",
+    "What is the offense of tampering with computer source documents?",
+]
+
+
+def fake_env(server_url: str, chroma_path: str) -> dict:
+    """Environment pointing the app at the stand-in server"""
+    env = dict(os.environ)
+    env.update({
+        "OPENAI_API_KEY": "fake-key",
+        "OPENAI_API_BASE": server_url,
+        "EMBEDDING_CHECK_CTX_LENGTH": "false",
+        "CHROMA_PATH": chroma_path,
+    })
+    return env
+
+
+def seed_corpus(chroma_path: str, pages: int) -> None:
+    """Populate the store with synthetic statute-like pages"""
+    from benchmarks.fakes import synthetic_pages
+    from src.core.rag_pipeline import RAGPipeline
+
+    pipeline = RAGPipeline(data_path="data", chroma_path=chroma_path)
+    pipeline.add_chunks_to_database(pipeline.split_documents(synthetic_pages(pages)))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(base_url: str, timeout: float = 60.0) -> None:
+    """Poll /health until the server reports ready"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"{base_url}/health", timeout=2) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"Server at {base_url} never became ready")
+
+
+def run_load(base_url: str, concurrency: int, duration: float) -> dict:
+    """Fire /query requests from `concurrency` threads for `duration` seconds"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client(index: int):
+        n = index
+        while time.perf_counter() < stop_at:
+            body = json.dumps({"query": QUESTIONS[n % len(QUESTIONS)]}).encode("utf-8")
+            request = urllib.request.Request(
+                f"{base_url}/query", data=body, headers={"Content-Type": "application/json"}
+            )
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=30) as response:
+                    ok = response.status == 200
+            except Exception:
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+            n += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] if latencies else 0.0
+    p99 = latencies[int(len(latencies) * 0.99)] if latencies else 0.0
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "rps": len(latencies) / wall,
+        "p50_ms": p50 * 1000,
+        "p99_ms": p99 * 1000,
+    }
+
+
+def main():
+    """Main execution function"""
+    parser = argparse.ArgumentParser(description="Load test /query at several gunicorn worker counts")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--threads", type=int, default=4, help="Threads per worker")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per run")
+    parser.add_argument("--chat-latency", type=float, default=0.1, help="Fake LLM latency (s)")
+    parser.add_argument("--pages", type=int, default=200, help="Synthetic pages to index")
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer(chat_latency=args.chat_latency).start()
+    chroma_path = tempfile.mkdtemp(prefix="lexora_load_")
+    env = fake_env(server.url, chroma_path)
+    os.environ.update(env)
+
+    print(f"Seeding {args.pages} pages into {chroma_path}...")
+    seed_corpus(chroma_path, args.pages)
+
+    results = []
+    try:
+        for workers in args.workers:
+            port = free_port()
+            run_env = dict(env, WEB_CONCURRENCY=str(workers), WEB_THREADS=str(args.threads),
+                           HOST="127.0.0.1", PORT=str(port))
+            process = subprocess.Popen(
+                [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"],
+                cwd=ROOT, env=run_env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            base_url = f"http://127.0.0.1:{port}"
+            try:
+                wait_ready(base_url)
+                stats = run_load(base_url, args.concurrency, args.duration)
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+            stats["workers"] = workers
+            results.append(stats)
+            print(f"workers={workers:<3} rps={stats['rps']:8.1f}  p50={stats['p50_ms']:7.1f}ms  "
+                  f"p99={stats['p99_ms']:7.1f}ms  errors={stats['errors']}")
+    finally:
+        server.stop()
+
+    baseline = results[0]["rps"] or 1.0
+    print("\nScaling vs first run:")
+    for stats in results:
+        print(f"  {stats['workers']} worker(s): {stats['rps'] / baseline:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+"""
+Dimensionality Reduction Recall Benchmark
+Indexes the same corpus at full width and reduced by truncation and by PCA,
+then reports recall@k against exact full-width search, index size on disk
+and query time.
+
+By default the corpus is synthetic: unit vectors with a decaying spectrum
+(like real text embeddings) and queries that are noisy copies of corpus
+vectors. With --pdf-dir, chunks of those PDFs are embedded with the
+configured EMBEDDING_BACKEND instead (queries are chunk openings).
+
+Usage:
+    python benchmarks/reduction_recall.py --chunks 20000 --dimensions 1536 --reduced 128 256 512
+    python benchmarks/reduction_recall.py --pdf-dir data --reduced 256
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.database.chroma_manager import ChromaManager
+from src.models.hash_embeddings import HashingEmbeddings
+from src.models.reduction import Projection
+
+
+def synthetic_corpus(chunks: int, queries: int, dimensions: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Unit vectors whose variance decays across a random basis, plus noisy queries"""
+    rng = np.random.default_rng(0)
+    basis, _ = np.linalg.qr(rng.standard_normal((dimensions, dimensions)))
+    scale = 1.0 / np.sqrt(np.arange(1, dimensions + 1))
+    corpus = (rng.standard_normal((chunks, dimensions)) * scale) @ basis.T
+    corpus /= np.linalg.norm(corpus, axis=1, keepdims=True)
+    picks = rng.choice(chunks, size=queries, replace=False)
+    noise = (rng.standard_normal((queries, dimensions)) * scale) @ basis.T
+    query_vectors = corpus[picks] + 0.5 * noise / np.linalg.norm(noise, axis=1, keepdims=True)
+    query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+    return corpus.astype(np.float32), query_vectors.astype(np.float32)
+
+
+def pdf_corpus(pdf_dir: str, queries: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Embed chunks of the PDFs in `pdf_dir` with the configured backend"""
+    from src.core.rag_pipeline import RAGPipeline
+    from src.models import get_embedding_function
+
+    pipeline = RAGPipeline(data_path=pdf_dir, chroma_path=tempfile.mkdtemp(prefix="lexora_recall_"))
+    texts = [chunk.page_content for chunk in pipeline.split_documents(pipeline.load_documents())]
+    embeddings = get_embedding_function()
+    rng = np.random.default_rng(0)
+    picks = rng.choice(len(texts), size=min(queries, len(texts)), replace=False)
+    corpus = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    query_vectors = np.asarray(embeddings.embed_documents([texts[i][:200] for i in picks]), dtype=np.float32)
+    return corpus, query_vectors
+
+
+def directory_size(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(folder, name))
+        for folder, _, names in os.walk(path) for name in names
+    )
+
+
+def index(path: str, corpus: np.ndarray, query_vectors: np.ndarray, k: int) -> Dict[str, object]:
+    """Store `corpus` in a fresh Chroma store and run every query through it"""
+    store = ChromaManager(path, embedding_function=HashingEmbeddings(corpus.shape[1]), reduction="none")
+    ids = [str(i) for i in range(len(corpus))]
+    store.add_embeddings(ids, corpus, [""] * len(corpus), [None] * len(corpus))
+    collection = store.db._collection
+    collection.query(query_embeddings=query_vectors[:1], n_results=k, include=[])
+
+    latencies: List[float] = []
+    results = []
+    for query in query_vectors:
+        started = time.perf_counter()
+        found = collection.query(query_embeddings=query[None, :], n_results=k, include=[])
+        latencies.append((time.perf_counter() - started) * 1000)
+        results.append({int(i) for i in found["ids"][0]})
+    return {"results": results, "p50_ms": float(np.median(latencies)), "bytes": directory_size(path)}
+
+
+def main():
+    """Main execution function"""
+    parser = argparse.ArgumentParser(description="Recall@k of reduced embeddings vs full width")
+    parser.add_argument("--chunks", type=int, default=20000, help="Synthetic corpus size")
+    parser.add_argument("--dimensions", type=int, default=1536, help="Synthetic full width")
+    parser.add_argument("--reduced", type=int, nargs="+", default=[128, 256, 512], help="Reduced widths")
+    parser.add_argument("--queries", type=int, default=200, help="Queries evaluated")
+    parser.add_argument("--k", type=int, default=5, help="Results per query")
+    parser.add_argument("--sample", type=int, default=5000, help="Vectors used to fit PCA")
+    parser.add_argument("--pdf-dir", help="Embed these PDFs with EMBEDDING_BACKEND instead")
+    args = parser.parse_args()
+
+    if args.pdf_dir:
+        corpus, query_vectors = pdf_corpus(args.pdf_dir, args.queries)
+    else:
+        corpus, query_vectors = synthetic_corpus(args.chunks, args.queries, args.dimensions)
+    print(f"{len(corpus):,} chunks, {corpus.shape[1]} dimensions, {len(query_vectors)} queries, k={args.k}")
+
+    # Exact top-k at full width is the baseline every index is scored against
+    scores = query_vectors @ corpus.T
+    exact = [set(np.argsort(-row)[:args.k].tolist()) for row in scores]
+
+    workdir = tempfile.mkdtemp(prefix="lexora_recall_")
+    try:
+        rows = [("full", corpus.shape[1], corpus, query_vectors)]
+        for dimensions in args.reduced:
+            truncate = Projection("truncate", dimensions)
+            pca = Projection.fit_pca(corpus[:args.sample], dimensions)
+            rows.append(("truncate", dimensions, truncate.apply(corpus), truncate.apply(query_vectors)))
+            rows.append(("pca", dimensions, pca.apply(corpus), pca.apply(query_vectors)))
+
+        print(f"{'method':<9} {'dims':>5} {f'recall@{args.k}':>9} {'index MB':>9} {'query p50':>10}")
+        for method, dimensions, vectors, queries in rows:
+            result = index(os.path.join(workdir, f"{method}{dimensions}"), vectors, queries, args.k)
+            recall = np.mean([len(found & truth) / args.k for found, truth in zip(result["results"], exact)])
+            print(f"{method:<9} {dimensions:>5} {recall:9.3f} {result['bytes'] / 1e6:9.1f} "
+                  f"{result['p50_ms']:8.2f}ms")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
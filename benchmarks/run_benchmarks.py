@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+"""
+Offline Benchmark Suite
+Measures ingestion and query performance with local fake embedding/LLM
+backends, writes the results to JSON and optionally fails on regressions
+against a previous run.
+
+Usage:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --baseline benchmarks/results/<old>.json --threshold 0.25
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fakes import FakeChatModel, HashEmbeddings, synthetic_pages, write_pdf
+from src.core.page_cache import PageCache
+from src.core.query_engine import QueryEngine
+from src.core.rag_pipeline import RAGPipeline
+from src.database.chroma_manager import ChromaManager
+
+QUESTIONS = [
+    "What is the punishment for hacking with computer system?",
+    "What is the offense of cheating using computer resource?",
+    "What is the punishment for publishing private images without consent?",
+    "What is cyberterrorism?",
+    "What is the offense of tampering with computer source documents?",
+]
+
+
+def median_seconds(fn: Callable[[], object], repeat: int) -> float:
+    """Median wall time of `repeat` calls"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def metric(value: float, unit: str, better: str) -> Dict[str, object]:
+    return {"value": round(value, 6), "unit": unit, "better": better}
+
+
+def bench_parse_and_split(workdir: str, pages: int) -> Dict[str, Dict]:
+    """PDF parse and split throughput"""
+    pdf_path = os.path.join(workdir, "corpus.pdf")
+    write_pdf(pdf_path, [page.page_content for page in synthetic_pages(pages)])
+    store = ChromaManager(os.path.join(workdir, "parse_db"), embedding_function=HashEmbeddings())
+    pipeline = RAGPipeline(data_path=workdir, chroma_path=store.persist_directory, vector_store=store)
+
+    pipeline.page_cache = None
+    parse_s = median_seconds(lambda: pipeline.load_pdf(pdf_path), repeat=3)
+    documents = pipeline.load_pdf(pdf_path)
+    split_s = median_seconds(lambda: pipeline.split_documents(documents), repeat=5)
+    # Rebuilds read pages parsed before from the page cache
+    pipeline.page_cache = PageCache(os.path.join(workdir, "page_cache"))
+    pipeline.load_pdf(pdf_path)
+    cached_s = median_seconds(lambda: pipeline.load_pdf(pdf_path), repeat=3)
+    return {
+        "pdf_parse_pages_per_s": metric(pages / parse_s, "pages/s", "higher"),
+        "pdf_cached_pages_per_s": metric(pages / cached_s, "pages/s", "higher"),
+        "split_pages_per_s": metric(pages / split_s, "pages/s", "higher"),
+    }
+
+
+def bench_store(workdir: str, size: int, queries: int) -> Dict[str, Dict]:
+    """Ingest, count and search at one corpus size"""
+    store = ChromaManager(os.path.join(workdir, f"db_{size}"), embedding_function=HashEmbeddings())
+    pipeline = RAGPipeline(data_path=workdir, chroma_path=store.persist_directory, vector_store=store)
+    chunks = pipeline.split_documents(synthetic_pages(size))
+
+    started = time.perf_counter()
+    pipeline.add_chunks_to_database(chunks)
+    add_s = time.perf_counter() - started
+
+    count_s = median_seconds(store.get_document_count, repeat=10)
+    search_s = median_seconds(
+        lambda: [store.similarity_search(q, k=5) for q in QUESTIONS], repeat=max(1, queries // len(QUESTIONS))
+    ) / len(QUESTIONS)
+    return {
+        f"add_chunks_{size}_chunks_per_s": metric(len(chunks) / add_s, "chunks/s", "higher"),
+        f"get_document_count_{size}_ms": metric(count_s * 1000, "ms", "lower"),
+        f"similarity_search_{size}_ms": metric(search_s * 1000, "ms", "lower"),
+    }
+
+
+def bench_query_endpoint(workdir: str, pages: int, requests: int, llm_latency: float) -> Dict[str, Dict]:
+    """End-to-end /query through the Flask test client"""
+    import app as app_module
+
+    store = ChromaManager(os.path.join(workdir, "app_db"), embedding_function=HashEmbeddings())
+    pipeline = RAGPipeline(data_path=workdir, chroma_path=store.persist_directory, vector_store=store)
+    pipeline.add_chunks_to_database(pipeline.split_documents(synthetic_pages(pages)))
+
+    app_module.pipeline = pipeline
+    app_module.chroma_manager = store
+    app_module.query_engine = QueryEngine(
+        chroma_path=store.persist_directory, vector_store=store, llm=FakeChatModel(latency=llm_latency)
+    )
+    app_module.ready.set()
+    client = app_module.create_app().test_client()
+
+    samples = []
+    for i in range(requests):
+        started = time.perf_counter()
+        response = client.post('/query', json={'query': QUESTIONS[i % len(QUESTIONS)]})
+        samples.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.get_json()
+    samples.sort()
+    return {
+        "query_endpoint_p50_ms": metric(samples[len(samples) // 2] * 1000, "ms", "lower"),
+        "query_endpoint_p95_ms": metric(samples[int(len(samples) * 0.95) - 1] * 1000, "ms", "lower"),
+    }
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float) -> List[str]:
+    """
+    Find metrics that got worse than the baseline by more than `threshold`.
+
+    Returns:
+        Human-readable description of each regression
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous or not previous["value"]:
+            continue
+        ratio = current["value"] / previous["value"]
+        worse = ratio > 1 + threshold if current["better"] == "lower" else ratio < 1 - threshold
+        if worse:
+            regressions.append(
+                f"{name}: {previous['value']} -> {current['value']} {current['unit']} ({ratio:.2f}x)"
+            )
+    return regressions
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    """Main execution function"""
+    parser = argparse.ArgumentParser(description="Run the offline performance benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000],
+                        help="Corpus sizes (pages) for store benchmarks")
+    parser.add_argument("--parse-pages", type=int, default=50, help="Pages in the synthetic PDF")
+    parser.add_argument("--queries", type=int, default=50, help="Searches per corpus size")
+    parser.add_argument("--requests", type=int, default=50, help="/query requests to time")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Fake LLM latency (s)")
+    parser.add_argument("--output", help="Results file (default benchmarks/results/<commit>.json)")
+    parser.add_argument("--baseline", help="Previous results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Allowed relative regression before failing (default 0.25)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="lexora_bench_")
+    results: Dict[str, Dict] = {}
+    try:
+        results.update(bench_parse_and_split(workdir, args.parse_pages))
+        for size in args.sizes:
+            results.update(bench_store(workdir, size, args.queries))
+        results.update(bench_query_endpoint(workdir, min(args.sizes), args.requests, args.llm_latency))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    commit = git_commit()
+    output = args.output or os.path.join(ROOT, "benchmarks", "results", f"{commit}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({"commit": commit, "timestamp": time.time(), "results": results}, f, indent=2)
+
+    width = max(len(name) for name in results)
+    for name, value in results.items():
+        print(f"{name:<{width}}  {value['value']:>12.3f} {value['unit']}")
+    print(f"\nResults written to {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n✗ {len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  - {line}")
+            sys.exit(1)
+        print(f"\n✓ No regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""
+Snapshot Benchmark
+Builds a synthetic corpus with random unit vectors (no embedding calls),
+then measures snapshot export, checksum verification and import throughput.
+
+Usage:
+    python benchmarks/snapshot_bench.py --chunks 1000000 --dimensions 1536
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fakes import HashEmbeddings, synthetic_page
+from src.database.chroma_manager import ChromaManager
+from src.database.snapshot import export_snapshot, import_snapshot, read_manifest
+
+
+def seed(store: ChromaManager, chunks: int, dimensions: int, batch_size: int = 5000) -> None:
+    """Fill `store` with `chunks` synthetic records and random unit vectors"""
+    rng = np.random.default_rng(0)
+    for start in range(0, chunks, batch_size):
+        n = min(batch_size, chunks - start)
+        vectors = rng.standard_normal((n, dimensions), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        pages = [synthetic_page(i % 1000) for i in range(start, start + n)]
+        store.add_embeddings(
+            [f"synthetic.pdf:{i}:0" for i in range(start, start + n)],
+            vectors,
+            [page.page_content[:800] for page in pages],
+            [dict(page.metadata, page=i) for i, page in zip(range(start, start + n), pages)],
+        )
+
+
+def main():
+    """Main execution function"""
+    parser = argparse.ArgumentParser(description="Measure snapshot export/import throughput")
+    parser.add_argument("--chunks", type=int, default=1_000_000, help="Synthetic records")
+    parser.add_argument("--dimensions", type=int, default=1536, help="Vector dimensions")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Records per batch")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="lexora_snapshot_")
+    try:
+        source = ChromaManager(os.path.join(workdir, "source"), embedding_function=HashEmbeddings())
+        started = time.perf_counter()
+        seed(source, args.chunks, args.dimensions, args.batch_size)
+        print(f"seeded {args.chunks:,} chunks in {time.perf_counter() - started:.1f}s")
+
+        snapshot = os.path.join(workdir, "snapshot")
+        timings = {}
+        started = time.perf_counter()
+        export_snapshot(source, snapshot, batch_size=args.batch_size)
+        timings["export"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        read_manifest(snapshot, verify=True)
+        timings["verify"] = time.perf_counter() - started
+
+        target = ChromaManager(os.path.join(workdir, "target"), embedding_function=HashEmbeddings())
+        started = time.perf_counter()
+        import_snapshot(target, snapshot, batch_size=args.batch_size, verify=False)
+        timings["import"] = time.perf_counter() - started
+        assert target.db._collection.count() == args.chunks
+
+        size = sum(entry.stat().st_size for entry in os.scandir(snapshot))
+        print(f"snapshot size {size / 1e6:,.1f} MB")
+        for name, seconds in timings.items():
+            print(f"{name:<8} {seconds:8.2f}s  {args.chunks / seconds:12,.0f} records/s  "
+                  f"{size / 1e6 / seconds:8.1f} MB/s")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
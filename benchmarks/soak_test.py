@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+"""
+Memory Soak Test
+Ingests a growing synthetic corpus and answers queries from an ever-growing
+number of sessions in one process (conversations, prefetches and stored
+answers all pile up), checking after each round that the caches stay within
+a memory budget and that resident memory stops growing with them.
+
+Usage:
+    python benchmarks/soak_test.py --budget-mb 32 --rounds 30
+    python benchmarks/soak_test.py --budget-mb 0 --rounds 30    # unbounded, for comparison
+"""
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fakes import FakeChatModel, HashEmbeddings, synthetic_pages
+from src.core.answers import AnswerStore
+from src.core.conversation import ConversationStore
+from src.core.prefetch import PrefetchCache
+from src.core.query_engine import QueryEngine
+from src.core.rag_pipeline import RAGPipeline
+from src.database.chroma_manager import ANSWER_STORE_FILE, ChromaManager
+from src.utils.memory import MemoryBudget, limit_malloc_arenas, release_free_memory
+from src.utils.metrics import MEMORY_EVICTIONS
+
+QUESTIONS = [
+    "What is the punishment for hacking with computer system?",
+    "What is the offense of cheating using computer resource?",
+    "What is cyberterrorism?",
+    "What is the fine for tampering with computer source documents?",
+]
+
+
+def rss_mb() -> float:
+    """Resident set size of this process in MB (peak RSS where /proc is missing)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def evictions() -> Dict[str, int]:
+    """Evictions so far per cache"""
+    return {cache: int(MEMORY_EVICTIONS.get(cache=cache))
+            for cache in ("index", "sections", "answers", "conversations", "prefetch")}
+
+
+def run_session(
+    session: str,
+    question: str,
+    top_k: int,
+    engine: QueryEngine,
+    conversations: ConversationStore,
+    prefetches: PrefetchCache
+) -> None:
+    """One new session: a prefetch left unused, a query and a stored answer"""
+    conversation = conversations.get(session)
+    token = prefetches.begin(session)
+    if token is not None:
+        prefetches.finish(session, token, engine.prefetch(question, top_k, conversation))
+    engine.query(question, top_k, conversation)
+    engine.precompute(question, top_k)
+
+
+def soak(args: argparse.Namespace, workdir: str) -> List[Dict[str, Any]]:
+    """Run the rounds and return one sample per round"""
+    budget = MemoryBudget(int(args.budget_mb * 2**20))
+    if budget.limit:
+        # As the app does when MEMORY_BUDGET_MB is set
+        limit_malloc_arenas()
+    store = ChromaManager(os.path.join(workdir, "db"), embedding_function=HashEmbeddings(args.dimensions),
+                          read_only=False, reduction="none", budget=budget)
+    pipeline = RAGPipeline(data_path=workdir, chroma_path=store.persist_directory, vector_store=store,
+                           page_cache=None)
+    engine = QueryEngine(chroma_path=store.persist_directory, vector_store=store, llm=FakeChatModel(),
+                         answer_store=AnswerStore(os.path.join(workdir, "db", ANSWER_STORE_FILE), budget=budget))
+    # Session limits out of the way: only the budget bounds these
+    conversations = ConversationStore(max_sessions=10**9, ttl=10**9, budget=budget)
+    prefetches = PrefetchCache(max_sessions=10**9, ttl=10**9, min_interval=0, budget=budget)
+
+    # Warm every code path once, then measure growth from there
+    pipeline.add_chunks_to_database(pipeline.split_documents(synthetic_pages(10, source="warmup.pdf")))
+    for i, question in enumerate(QUESTIONS):
+        run_session(f"warmup-{i}", question, args.top_k, engine, conversations, prefetches)
+        conversations.reset(f"warmup-{i}")
+        prefetches.cancel(f"warmup-{i}")
+    release_free_memory()
+    baseline = rss_mb()
+    print(f"Baseline RSS {baseline:.0f}MB, budget "
+          f"{f'{args.budget_mb:g}MB' if args.budget_mb else 'unbounded'}")
+    print(f"{'round':>5} {'chunks':>7} {'rss MB':>7} {'growth':>7} {'cached MB':>9} {'sessions':>8} {'s':>6}")
+
+    samples = []
+    for round_ in range(args.rounds):
+        started = time.perf_counter()
+        pages = synthetic_pages(args.pages, source=f"soak-{round_}.pdf")
+        pipeline.add_chunks_to_database(pipeline.split_documents(pages))
+        for i in range(args.queries):
+            question = f"{QUESTIONS[i % len(QUESTIONS)]} (case {round_}-{i})"
+            run_session(f"{round_}-{i}", question, args.top_k, engine, conversations, prefetches)
+        stats = budget.stats()
+        rss = rss_mb()
+        sample = {
+            "round": round_ + 1,
+            "chunks": store.get_document_count(),
+            "rss_mb": rss,
+            "growth_mb": rss - baseline,
+            "cached_mb": stats["used"] / 2**20,
+            "caches_mb": {name: used / 2**20 for name, used in stats["caches"].items()},
+            "sessions": len(conversations),
+            "seconds": time.perf_counter() - started,
+        }
+        samples.append(sample)
+        print(f"{sample['round']:>5} {sample['chunks']:>7} {rss:>7.0f} {sample['growth_mb']:>7.0f} "
+              f"{sample['cached_mb']:>9.1f} {sample['sessions']:>8} {sample['seconds']:>6.1f}")
+    return samples
+
+
+def main():
+    """Main execution function"""
+    parser = argparse.ArgumentParser(description="Check that memory stays bounded under a growing workload")
+    parser.add_argument("--budget-mb", type=float, default=32.0, help="Cache memory budget (0 = unbounded)")
+    parser.add_argument("--slack-mb", type=float, default=48.0,
+                        help="Allowed RSS growth beyond the budget (allocator and library overhead)")
+    parser.add_argument("--rounds", type=int, default=30, help="Ingest+query rounds")
+    parser.add_argument("--pages", type=int, default=50, help="Synthetic pages ingested per round")
+    parser.add_argument("--queries", type=int, default=200, help="New sessions (one query each) per round")
+    parser.add_argument("--dimensions", type=int, default=384, help="Embedding width")
+    parser.add_argument("--top-k", type=int, default=5, help="Chunks retrieved per query")
+    parser.add_argument("--json", action="store_true", help="Print the samples as JSON")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="lexora_soak_")
+    try:
+        samples = soak(args, workdir)
+    except Exception as e:
+        print(f"✗ Error: {str(e)}")
+        sys.exit(1)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    evicted = evictions()
+    if args.json:
+        print(json.dumps({"samples": samples, "evictions": evicted}, indent=2))
+    print(f"Evictions: {', '.join(f'{cache} {count}' for cache, count in evicted.items())}")
+    if not args.budget_mb:
+        print(f"✓ Unbounded run: RSS grew {samples[-1]['growth_mb']:.0f}MB, caches hold "
+              f"{samples[-1]['cached_mb']:.1f}MB")
+        return
+
+    worst_cached = max(sample["cached_mb"] for sample in samples)
+    worst_growth = max(sample["growth_mb"] for sample in samples)
+    failures = []
+    if worst_cached > args.budget_mb:
+        failures.append(f"caches held {worst_cached:.1f}MB, over the {args.budget_mb:g}MB budget")
+    if worst_growth > args.budget_mb + args.slack_mb:
+        failures.append(f"RSS grew {worst_growth:.0f}MB, over budget + slack "
+                        f"({args.budget_mb + args.slack_mb:g}MB)")
+    if failures:
+        for failure in failures:
+            print(f"✗ {failure}")
+        sys.exit(1)
+    print(f"✓ Caches peaked at {worst_cached:.1f}MB of {args.budget_mb:g}MB; "
+          f"RSS grew at most {worst_growth:.0f}MB")
+
+
+if __name__ == "__main__":
+    main()
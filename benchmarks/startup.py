@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+"""
+Startup Benchmark
+Measures how long `import app` takes, and how long a fresh server takes to
+answer `/`, `/status` and its first successful `/query`, against a local
+OpenAI-compatible stand-in server.
+
+Usage:
+    python benchmarks/startup.py --repeat 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fake_openai_server import FakeOpenAIServer
+from benchmarks.load_test import fake_env, free_port, seed_corpus
+
+IMPORT_SNIPPETS = {
+    "import_app_s": "import app",
+    "import_engines_s": "import src.core.query_engine, src.core.rag_pipeline",
+}
+
+
+def time_import(snippet: str, env: dict, repeat: int) -> float:
+    """Median wall time of a fresh interpreter running `snippet`"""
+    code = f"import time; t = time.perf_counter(); {snippet}; print(time.perf_counter() - t)"
+    samples = []
+    for _ in range(repeat):
+        output = subprocess.check_output([sys.executable, "-c", code], cwd=ROOT, env=env,
+                                         stderr=subprocess.DEVNULL)
+        samples.append(float(output.decode().strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+
+def time_to_first(base_url: str, path: str, started: float, body: dict = None, timeout: float = 120.0) -> float:
+    """Seconds from `started` until `path` first returns 200"""
+    deadline = started + timeout
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    while time.perf_counter() < deadline:
+        request = urllib.request.Request(f"{base_url}{path}", data=data,
+                                         headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                if response.status == 200:
+                    return time.perf_counter() - started
+        except OSError:
+            pass
+        time.sleep(0.02)
+    raise TimeoutError(f"{path} never answered")
+
+
+def main():
+    """Main execution function"""
+    parser = argparse.ArgumentParser(description="Measure import time and time-to-first-answer")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement")
+    parser.add_argument("--pages", type=int, default=50, help="Synthetic pages to index")
+    args = parser.parse_args()
+
+    results = {}
+    with FakeOpenAIServer(chat_latency=0.0) as server:
+        chroma_path = tempfile.mkdtemp(prefix="lexora_startup_")
+        env = fake_env(server.url, chroma_path)
+        os.environ.update(env)
+        seed_corpus(chroma_path, args.pages)
+
+        for name, snippet in IMPORT_SNIPPETS.items():
+            results[name] = time_import(snippet, env, args.repeat)
+
+        firsts = {"first_index_s": [], "first_status_s": [], "first_answer_s": []}
+        for _ in range(args.repeat):
+            port = free_port()
+            run_env = dict(env, WEB_CONCURRENCY="1", HOST="127.0.0.1", PORT=str(port))
+            started = time.perf_counter()
+            process = subprocess.Popen(
+                [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"],
+                cwd=ROOT, env=run_env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            base_url = f"http://127.0.0.1:{port}"
+            try:
+                firsts["first_index_s"].append(time_to_first(base_url, "/", started))
+                firsts["first_status_s"].append(time_to_first(base_url, "/status", started))
+                firsts["first_answer_s"].append(
+                    time_to_first(base_url, "/query", started, body={"query": "What is cyberterrorism?"})
+                )
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+        for name, samples in firsts.items():
+            results[name] = statistics.median(samples)
+
+    for name, value in results.items():
+        print(f"{name:<20} {value * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+Gunicorn configuration for Project Lexora
+
+Run with:
+    gunicorn -c gunicorn.conf.py app:app
+
+Worker and thread counts come from the same environment variables as the
+rest of the configuration (WEB_CONCURRENCY, WEB_THREADS, WORKER_CLASS,
+WORKER_TIMEOUT, HOST, PORT).
+"""
+
+from src.utils import load_config
+
+_config = load_config()
+
+bind = f"{_config['host']}:{_config['port']}"
+workers = _config['workers']
+threads = _config['threads']
+worker_class = _config['worker_class']
+timeout = _config['worker_timeout']
+graceful_timeout = 30
+
+# Import app.py once in the master so workers fork with Flask already loaded.
+# Engines hold network clients and database handles, which must not be shared
+# across a fork, so they are built per worker, in the background, starting
+# from post_worker_init.
+preload_app = True
+
+accesslog = '-'
+
+
+def post_worker_init(worker):
+    """Start warming engines once per worker; /health stays 503 until done"""
+    from app import start_background_warmup
+
+    start_background_warmup()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+"""
+Export Snapshot Script
+Writes the Chroma collection (IDs, vectors, texts, metadata) to a compact
+snapshot directory with checksums, for warm-starting other replicas
+"""
+
+import argparse
+import sys
+import os
+import time
+
+# Add parent directory to path to allow imports from src
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database.chroma_manager import ChromaManager
+from src.database.snapshot import export_snapshot
+from src.utils import load_config, get_logger
+
+logger = get_logger(__name__)
+
+
+def main():
+    """Main execution function"""
+    parser = argparse.ArgumentParser(
+        description="Export the vector database to a snapshot directory"
+    )
+    parser.add_argument("output", help="Snapshot directory to write")
+    parser.add_argument("--chroma-path", help="Database to export (default CHROMA_PATH)")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Records read per batch")
+    
+    args = parser.parse_args()
+    config = load_config()
+    
+    try:
+        store = ChromaManager(args.chroma_path or config['chroma_path'])
+        started = time.perf_counter()
+        manifest = export_snapshot(store, args.output, batch_size=args.batch_size)
+        elapsed = time.perf_counter() - started
+        print(f"✓ Exported {manifest['count']} records to {args.output} "
+              f"in {elapsed:.1f}s ({manifest['count'] / max(elapsed, 1e-9):,.0f} records/s)")
+    except Exception as e:
+        logger.error(f"Error exporting snapshot: {str(e)}")
+        print(f"✗ Error: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+"""
+Import Snapshot Script
+Loads a snapshot written by export_snapshot.py into an empty Chroma database
+using bulk writes and the stored vectors (no embedding calls)
+"""
+
+import argparse
+import sys
+import os
+import time
+
+# Add parent directory to path to allow imports from src
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database.chroma_manager import ChromaManager
+from src.database.snapshot import import_snapshot
+from src.utils import load_config, get_logger
+
+logger = get_logger(__name__)
+
+
+def main():
+    """Main execution function"""
+    parser = argparse.ArgumentParser(
+        description="Import a snapshot into the vector database"
+    )
+    parser.add_argument("snapshot", help="Snapshot directory to read")
+    parser.add_argument("--chroma-path", help="Destination database (default CHROMA_PATH)")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Records written per batch")
+    parser.add_argument("--no-verify", action="store_true", help="Skip checksum verification")
+    parser.add_argument(
+        "--merge",
+        action="store_true",
+        help="Allow importing into a database that already has documents"
+    )
+    
+    args = parser.parse_args()
+    config = load_config()
+    
+    try:
+        store = ChromaManager(args.chroma_path or config['chroma_path'])
+        started = time.perf_counter()
+        count = import_snapshot(
+            store, args.snapshot, batch_size=args.batch_size,
+            verify=not args.no_verify, allow_existing=args.merge
+        )
+        elapsed = time.perf_counter() - started
+        print(f"✓ Imported {count} records in {elapsed:.1f}s "
+              f"({count / max(elapsed, 1e-9):,.0f} records/s)")
+    except Exception as e:
+        logger.error(f"Error importing snapshot: {str(e)}")
+        print(f"✗ Error: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+"""
+Load Replay Script
+Replays a request capture (CAPTURE_LOG) against a running instance, or
+against the app in-process backed by a local stand-in embedding/LLM server,
+keeping the recorded arrival pattern at 1x or N times speed, and reports
+throughput, latency percentiles and error rates
+
+Usage:
+    python scripts/replay.py logs/capture.jsonl --url http://127.0.0.1:5000 --speed 2
+    python scripts/replay.py logs/capture.jsonl --local --speed 10 --concurrency 16
+"""
+
+import argparse
+import atexit
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+from typing import Any, Callable, Dict, List
+
+# Add parent directory to path to allow imports from src
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.utils.capture import read_capture
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Value at `fraction` (0-1) of the sorted values (0 for none)"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def http_sender(base_url: str, timeout: float) -> Callable[[str], Callable[[Dict[str, Any]], int]]:
+    """Sender factory for a running instance; one cookie jar per recorded session"""
+    def for_session(_sid: str) -> Callable[[Dict[str, Any]], int]:
+        opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()))
+
+        def send(body: Dict[str, Any]) -> int:
+            request = urllib.request.Request(
+                f"{base_url}/query", data=json.dumps(body).encode("utf-8"),
+                headers={"Content-Type": "application/json"}
+            )
+            try:
+                with opener.open(request, timeout=timeout) as response:
+                    return response.status
+            except urllib.error.HTTPError as e:
+                return e.code
+        return send
+    return for_session
+
+
+def local_sender(args: argparse.Namespace) -> Callable[[str], Callable[[Dict[str, Any]], int]]:
+    """
+    Sender factory for the app in this process, with embeddings and the LLM
+    served by a local stand-in server and a synthetic corpus unless
+    --chroma-path is given
+    """
+    from benchmarks.fake_openai_server import FakeOpenAIServer
+    from benchmarks.load_test import fake_env, seed_corpus
+
+    server = FakeOpenAIServer(chat_latency=args.chat_latency, embed_latency=args.embed_latency).start()
+    chroma_path = args.chroma_path
+    if not chroma_path:
+        # The synthetic store only lives as long as the replay
+        chroma_path = tempfile.mkdtemp(prefix="lexora_replay_")
+        atexit.register(shutil.rmtree, chroma_path, ignore_errors=True)
+    # Don't capture the replay into a log, and keep LLM calls off the network
+    os.environ.update(fake_env(server.url, chroma_path), CAPTURE_LOG="")
+    if not args.chroma_path:
+        print(f"Seeding {args.pages} synthetic pages into {chroma_path}...")
+        seed_corpus(chroma_path, args.pages)
+
+    import app as app_module
+    if not app_module.warmup():
+        raise RuntimeError("App failed to warm up")
+    flask_app = app_module.create_app()
+
+    def for_session(_sid: str) -> Callable[[Dict[str, Any]], int]:
+        client = flask_app.test_client()
+        lock = threading.Lock()
+
+        def send(body: Dict[str, Any]) -> int:
+            # The test client isn't safe to share between threads
+            with lock:
+                return client.post("/query", json=body).status_code
+        return send
+    return for_session
+
+
+def replay(
+    records: List[Dict[str, Any]],
+    sender: Callable[[str], Callable[[Dict[str, Any]], int]],
+    speed: float,
+    concurrency: int
+) -> Dict[str, Any]:
+    """
+    Send the recorded requests on their recorded schedule.
+
+    Args:
+        records: Capture records, oldest first
+        sender: Returns the send function for a recorded session ID
+        speed: Time compression (2 = twice as fast; 0 = as fast as possible)
+        concurrency: Most requests in flight
+
+    Returns:
+        Summary statistics
+    """
+    sessions: Dict[str, Callable[[Dict[str, Any]], int]] = {}
+    latencies: List[float] = []
+    lags: List[float] = []
+    statuses: Dict[str, int] = {}
+    lock = threading.Lock()
+    first = records[0]["ts"]
+    started = time.perf_counter()
+
+    def run(record: Dict[str, Any], scheduled: float) -> None:
+        send = sessions[record.get("sid", "")]
+        sent = time.perf_counter()
+        try:
+            status = str(send({"query": record["q"]}))
+        except Exception as e:
+            status = type(e).__name__
+        elapsed = time.perf_counter() - sent
+        with lock:
+            statuses[status] = statuses.get(status, 0) + 1
+            lags.append(max(0.0, sent - scheduled))
+            if status == "200":
+                latencies.append(elapsed)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for record in records:
+            sid = record.get("sid", "")
+            if sid not in sessions:
+                sessions[sid] = sender(sid)
+            scheduled = started + ((record["ts"] - first) / speed if speed > 0 else 0.0)
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(run, record, scheduled)
+    wall = time.perf_counter() - started
+
+    errors = sum(count for status, count in statuses.items() if status != "200")
+    recorded = [record["ms"] / 1000 for record in records if record.get("status") == 200 and "ms" in record]
+    return {
+        "requests": len(records),
+        "errors": errors,
+        "error_rate": errors / len(records),
+        "statuses": statuses,
+        "wall_s": wall,
+        "rps": len(records) / wall,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p90_ms": percentile(latencies, 0.90) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": max(latencies, default=0.0) * 1000,
+        "max_lag_ms": max(lags, default=0.0) * 1000,
+        "recorded_p50_ms": percentile(recorded, 0.50) * 1000,
+        "recorded_p99_ms": percentile(recorded, 0.99) * 1000,
+    }
+
+
+def main():
+    """Main execution function"""
+    parser = argparse.ArgumentParser(description="Replay captured /query traffic")
+    parser.add_argument("capture", help="Capture file written with CAPTURE_LOG (.gz allowed)")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="Base URL of a running instance")
+    target.add_argument("--local", action="store_true",
+                        help="Replay against the app in-process with a stand-in embedding/LLM server")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed (2 = twice as fast, 0 = no delays)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Most requests in flight")
+    parser.add_argument("--limit", type=int, default=0, help="Replay only the first N requests")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout for --url (s)")
+    parser.add_argument("--chat-latency", type=float, default=0.1, help="Stand-in LLM latency for --local (s)")
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="Stand-in embedding latency for --local (s)")
+    parser.add_argument("--pages", type=int, default=200, help="Synthetic pages to index for --local")
+    parser.add_argument("--chroma-path", help="Existing database for --local instead of a synthetic one")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+
+    args = parser.parse_args()
+
+    try:
+        records = sorted((r for r in read_capture(args.capture) if r.get("q") and "ts" in r),
+                         key=lambda r: r["ts"])
+        if args.limit:
+            records = records[:args.limit]
+        if not records:
+            raise ValueError(f"No requests in {args.capture}")
+        span = records[-1]["ts"] - records[0]["ts"]
+        print(f"Replaying {len(records)} requests recorded over {span:.1f}s at {args.speed:g}x "
+              f"with concurrency {args.concurrency}")
+
+        sender = http_sender(args.url.rstrip("/"), args.timeout) if args.url else local_sender(args)
+        stats = replay(records, sender, args.speed, args.concurrency)
+    except Exception as e:
+        print(f"✗ Error: {str(e)}")
+        sys.exit(1)
+
+    if args.json:
+        print(json.dumps(stats, indent=2))
+    else:
+        print(f"✓ {stats['requests']} requests in {stats['wall_s']:.1f}s ({stats['rps']:.1f} req/s)")
+        print(f"  latency p50={stats['p50_ms']:.1f}ms  p90={stats['p90_ms']:.1f}ms  "
+              f"p99={stats['p99_ms']:.1f}ms  max={stats['max_ms']:.1f}ms")
+        print(f"  recorded p50={stats['recorded_p50_ms']:.1f}ms  p99={stats['recorded_p99_ms']:.1f}ms")
+        print(f"  errors {stats['errors']} ({stats['error_rate']:.1%})  statuses {stats['statuses']}")
+        print(f"  worst scheduling lag {stats['max_lag_ms']:.1f}ms (high = client concurrency too low)")
+    if stats["errors"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
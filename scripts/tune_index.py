@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+"""
+HNSW Index Tuner
+Builds indexes over a sample of the corpus with a grid of HNSW settings,
+measures recall@k against exact search and query latency, and recommends
+the fastest setting that reaches a recall target
+
+The sample comes from an existing store (CHROMA_PATH by default) or is
+synthetic. Queries are questions from a file (embedded with the configured
+backend), or else stored chunks held out of the sample.
+
+Usage:
+    python scripts/tune_index.py --sample 20000 --queries questions.txt --target-recall 0.95
+    python scripts/tune_index.py --synthetic 20000 --dimensions 768 --max-neighbors 8 16 32
+"""
+
+import argparse
+import itertools
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+# Add parent directory to path to allow imports from src
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.reduction_recall import synthetic_corpus
+from src.database.chroma_manager import ChromaManager
+from src.models.hash_embeddings import HashingEmbeddings
+from src.utils import load_config
+
+
+def store_sample(chroma_path: str, sample: int, queries_file: str, held_out: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Up to `sample` stored vectors, plus query vectors (from a file or held out)"""
+    store = ChromaManager(chroma_path, read_only=True)
+    collection = store.db._collection
+    ids = collection.get(include=[])["ids"]
+    if not ids:
+        raise ValueError(f"Store at {chroma_path} is empty")
+    rng = np.random.default_rng(0)
+    extra = 0 if queries_file else held_out
+    picks = rng.choice(len(ids), size=min(len(ids), sample + extra), replace=False)
+    vectors = []
+    for start in range(0, len(picks), 1000):
+        batch = [ids[i] for i in picks[start:start + 1000]]
+        vectors.extend(collection.get(ids=batch, include=["embeddings"])["embeddings"])
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if queries_file:
+        with open(queries_file) as f:
+            questions = [line.strip() for line in f if line.strip()]
+        query_vectors = np.asarray([store.embedding_function.embed_query(q) for q in questions], dtype=np.float32)
+        return vectors, query_vectors
+    if len(vectors) <= extra:
+        raise ValueError(f"Store at {chroma_path} has too few chunks to hold out {extra} queries")
+    return vectors[extra:], vectors[:extra]
+
+
+def exact_neighbors(corpus: np.ndarray, queries: np.ndarray, k: int, space: str) -> List[set]:
+    """True top-k rows of `corpus` for each query in the index's distance space"""
+    if space == "l2":
+        distances = (corpus ** 2).sum(axis=1)[None, :] - 2.0 * queries @ corpus.T
+    elif space == "cosine":
+        normed = corpus / np.clip(np.linalg.norm(corpus, axis=1, keepdims=True), 1e-12, None)
+        distances = -(queries @ normed.T)
+    else:
+        distances = -(queries @ corpus.T)
+    return [set(np.argsort(row)[:k].tolist()) for row in distances]
+
+
+def measure(store: ChromaManager, queries: np.ndarray, exact: List[set], k: int) -> Dict[str, float]:
+    """Recall@k and single-query latency percentiles of the store's index"""
+    collection = store.db._collection
+    collection.query(query_embeddings=queries[:1], n_results=k, include=[])
+    latencies = []
+    recalls = []
+    for query, truth in zip(queries, exact):
+        started = time.perf_counter()
+        found = collection.query(query_embeddings=query[None, :], n_results=k, include=[])
+        latencies.append((time.perf_counter() - started) * 1000)
+        recalls.append(len({int(i) for i in found["ids"][0]} & truth) / k)
+    return {
+        "recall": float(np.mean(recalls)),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+    }
+
+
+def sweep(corpus: np.ndarray, queries: np.ndarray, args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Build one index per (ef_construction, max_neighbors) and search it at every ef_search"""
+    exact = exact_neighbors(corpus, queries, args.k, args.space)
+    embeddings = HashingEmbeddings(corpus.shape[1])
+    ids = [str(i) for i in range(len(corpus))]
+    workdir = tempfile.mkdtemp(prefix="lexora_tune_")
+    rows = []
+    try:
+        for ef_construction, max_neighbors in itertools.product(args.ef_construction, args.max_neighbors):
+            path = os.path.join(workdir, f"efc{ef_construction}-m{max_neighbors}")
+            hnsw = {"space": args.space, "ef_construction": ef_construction,
+                    "max_neighbors": max_neighbors, "ef_search": args.ef_search[0]}
+            store = ChromaManager(path, embedding_function=embeddings, read_only=False,
+                                  reduction="none", hnsw=hnsw)
+            started = time.perf_counter()
+            store.add_embeddings(ids, corpus, [""] * len(ids), [None] * len(ids))
+            build_s = time.perf_counter() - started
+            for ef_search in args.ef_search:
+                # Reopening with another ef_search updates the stored setting
+                store = ChromaManager(path, embedding_function=embeddings, read_only=False,
+                                      reduction="none", hnsw=dict(hnsw, ef_search=ef_search))
+                row = dict(hnsw, ef_search=ef_search, build_s=build_s, **measure(store, queries, exact, args.k))
+                rows.append(row)
+                print(f"{ef_construction:>6} {max_neighbors:>4} {ef_search:>6} {row['recall']:8.3f} "
+                      f"{row['p50_ms']:8.2f} {row['p99_ms']:8.2f} {build_s:8.1f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return rows
+
+
+def main():
+    """Main execution function"""
+    config = load_config()
+    parser = argparse.ArgumentParser(description="Tune HNSW settings for recall and latency")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--chroma-path", help="Store to sample (default CHROMA_PATH)")
+    source.add_argument("--synthetic", type=int, help="Use this many synthetic vectors instead of a store")
+    parser.add_argument("--dimensions", type=int, default=768, help="Width of synthetic vectors")
+    parser.add_argument("--sample", type=int, default=20000, help="Stored vectors to index")
+    parser.add_argument("--queries", help="File with questions, one per line (default: held-out chunks)")
+    parser.add_argument("--num-queries", type=int, default=200, help="Held-out chunks used as queries")
+    parser.add_argument("-k", type=int, default=5, help="Results per query")
+    parser.add_argument("--space", default=config['hnsw_space'], choices=["l2", "cosine", "ip"])
+    parser.add_argument("--ef-construction", type=int, nargs="+", default=[64, 100, 200])
+    parser.add_argument("--max-neighbors", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[10, 20, 40, 80, 160])
+    parser.add_argument("--target-recall", type=float, default=0.95, help="Least acceptable recall@k")
+    parser.add_argument("--max-p99-ms", type=float, help="Also require this p99 latency")
+
+    args = parser.parse_args()
+    args.ef_search = sorted(args.ef_search)
+
+    try:
+        if args.synthetic:
+            corpus, queries = synthetic_corpus(args.synthetic, args.num_queries, args.dimensions)
+        else:
+            corpus, queries = store_sample(args.chroma_path or config['chroma_path'], args.sample,
+                                           args.queries, args.num_queries)
+        print(f"{len(corpus):,} vectors, {corpus.shape[1]} dimensions, {len(queries)} queries, "
+              f"k={args.k}, space={args.space}")
+        print(f"{'ef_c':>6} {'M':>4} {'ef_s':>6} {f'recall@{args.k}':>8} {'p50 ms':>8} {'p99 ms':>8} {'build s':>8}")
+        rows = sweep(corpus, queries, args)
+    except Exception as e:
+        print(f"✗ Error: {str(e)}")
+        sys.exit(1)
+
+    passing = [
+        row for row in rows
+        if row["recall"] >= args.target_recall and (args.max_p99_ms is None or row["p99_ms"] <= args.max_p99_ms)
+    ]
+    if not passing:
+        best = max(rows, key=lambda row: row["recall"])
+        print(f"✗ No setting reached recall {args.target_recall}"
+              + (f" within p99 {args.max_p99_ms}ms" if args.max_p99_ms else "")
+              + f"; best was {best['recall']:.3f} (ef_c={best['ef_construction']}, "
+              f"M={best['max_neighbors']}, ef_s={best['ef_search']})")
+        sys.exit(1)
+
+    # Fastest queries first; smaller graphs (memory) and cheaper builds break ties
+    best = min(passing, key=lambda row: (round(row["p50_ms"], 1), row["max_neighbors"],
+                                         row["ef_construction"], row["ef_search"]))
+    print(f"✓ Recommended (recall {best['recall']:.3f}, p50 {best['p50_ms']:.2f}ms, p99 {best['p99_ms']:.2f}ms):")
+    print(f"  HNSW_SPACE={best['space']}")
+    print(f"  HNSW_EF_CONSTRUCTION={best['ef_construction']}")
+    print(f"  HNSW_MAX_NEIGHBORS={best['max_neighbors']}")
+    print(f"  HNSW_EF_SEARCH={best['ef_search']}")
+    current = (config['hnsw_space'], config['hnsw_ef_construction'], config['hnsw_max_neighbors'])
+    if (best['space'], best['ef_construction'], best['max_neighbors']) != current:
+        print("  Space, ef_construction and M apply to new stores only; rebuild with "
+              "populate_database.py --reset to use them")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+"""
+Answer Warmup Script
+Precomputes answers to the most frequent logged questions (and optionally a
+list of known questions) against the current corpus, so the app serves them
+without retrieval or an LLM call until the corpus changes
+"""
+
+import argparse
+import sys
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add parent directory to path to allow imports from src
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.query_engine import QueryEngine, normalize_question
+from src.database.chroma_manager import ChromaManager
+from src.utils import load_config, get_logger
+
+logger = get_logger(__name__)
+
+
+def main():
+    """Main execution function"""
+    parser = argparse.ArgumentParser(
+        description="Precompute answers to frequent questions"
+    )
+    parser.add_argument("--top", type=int, default=50, help="Most frequent logged questions to answer")
+    parser.add_argument("--min-count", type=int, default=2, help="Skip questions asked fewer times")
+    parser.add_argument("--questions", help="File with extra questions, one per line")
+    parser.add_argument("-k", "--top-k", type=int, default=5, help="Documents retrieved per answer")
+    parser.add_argument("--concurrency", type=int, default=2, help="Answers computed in parallel")
+    parser.add_argument("--rate", type=float, default=1.0, help="Most LLM calls started per second")
+    parser.add_argument("--force", action="store_true", help="Recompute answers that are still valid")
+    parser.add_argument("--chroma-path", help="Database to answer from (default CHROMA_PATH)")
+
+    args = parser.parse_args()
+    config = load_config()
+
+    try:
+        store = ChromaManager(args.chroma_path or config['chroma_path'])
+        engine = QueryEngine(
+            chroma_path=store.persist_directory,
+            model_name=config.get('model_name', 'mistralai/mistral-7b-instruct'),
+            vector_store=store
+        )
+        if engine.answer_store is None:
+            raise RuntimeError("No answer store (is ANSWER_STORE=false?)")
+
+        questions = [question for question, _count in engine.query_log.top(args.top, args.min_count)] \
+            if engine.query_log is not None else []
+        if args.questions:
+            with open(args.questions) as f:
+                questions += [line.strip() for line in f if line.strip()]
+        # Answers are keyed by normalized question; keep the first spelling
+        unique = {}
+        for question in questions:
+            unique.setdefault(normalize_question(question), question)
+
+        version = store.corpus_version
+        pending = [
+            question for key, question in unique.items()
+            if args.force or engine.answer_store.get(key, args.top_k, version, engine.answer_settings) is None
+        ]
+        pruned = engine.answer_store.prune(version, engine.answer_settings)
+        print(f"Corpus version {version}: {len(unique)} questions, {len(pending)} to answer "
+              f"({pruned} stale answers removed)")
+
+        started = time.perf_counter()
+        interval = 1.0 / args.rate if args.rate > 0 else 0.0
+        saved = failed = 0
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            futures = []
+            for i, question in enumerate(pending):
+                # Space out submissions so the provider sees at most `rate` calls/s
+                delay = started + i * interval - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                futures.append((question, executor.submit(engine.precompute, question, args.top_k)))
+            for question, future in futures:
+                try:
+                    if future.result():
+                        saved += 1
+                        print(f"✓ {question}")
+                    else:
+                        failed += 1
+                        print(f"✗ {question} (corpus changed while answering)")
+                except Exception as e:
+                    failed += 1
+                    logger.error(f"Error answering {question!r}: {str(e)}")
+                    print(f"✗ {question}: {str(e)}")
+
+        print(f"✓ Precomputed {saved} answers in {time.perf_counter() - started:.1f}s ({failed} failed)")
+        if failed:
+            sys.exit(1)
+    except Exception as e:
+        logger.error(f"Error warming answers: {str(e)}")
+        print(f"✗ Error: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
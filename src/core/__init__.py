@@ -2,7 +2,20 @@
 Core RAG functionality for Project Lexora
 """
 
-from .query_engine import QueryEngine
-from .rag_pipeline import RAGPipeline
+import importlib
 
-__all__ = ["QueryEngine", "RAGPipeline"]
+# Re-exports are resolved on first access so importing a light submodule
+# doesn't pull in LangChain
+_EXPORTS = {
+    "ConversationStore": ".conversation",
+    "QueryEngine": ".query_engine",
+    "RAGPipeline": ".rag_pipeline",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
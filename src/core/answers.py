@@ -0,0 +1,363 @@
+"""
+Query log and precomputed answer store
+
+Both live in SQLite files so every worker process (and the offline warmup
+job) shares them:
+
+    QueryLog      normalized question -> how often it was asked
+    AnswerStore   (question, top_k, settings) -> answer and sources, stamped
+                  with the corpus version they were computed against
+
+An answer is only served while the corpus is still at the version it was
+computed for, so any ingest or clear invalidates the whole store. The
+settings string identifies what else shaped the answer (model, relevance
+threshold, retrieval mode), so changing those doesn't serve stale answers.
+
+Each thread keeps its own connection to a file, so the request path doesn't
+open one (or wait on the disk for query counts, which a background thread
+writes).
+"""
+
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+
+from src.utils import get_logger
+from src.utils.memory import MEMORY_BUDGET, MemoryBudget, approximate_size
+
+logger = get_logger(__name__)
+
+
+QUERIES_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS queries ("
+    "question TEXT PRIMARY KEY, count INTEGER NOT NULL, last_seen REAL NOT NULL)"
+)
+ANSWERS_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS answers ("
+    "question TEXT NOT NULL, top_k INTEGER NOT NULL, settings TEXT NOT NULL, "
+    "corpus_version INTEGER NOT NULL, answer TEXT NOT NULL, sources TEXT NOT NULL, created REAL NOT NULL, "
+    "PRIMARY KEY (question, top_k, settings))"
+)
+
+# Seconds a question found to have no stored answer is not looked up again
+# (answers written meanwhile by another process show up after at most this)
+MISS_TTL = 60.0
+# Most remembered misses; beyond that they are forgotten all at once
+MAX_MISSES = 10000
+
+
+def _connect(path: str, schema: str) -> sqlite3.Connection:
+    """New connection (WAL lets readers and one writer overlap), creating the table"""
+    connection = sqlite3.connect(path, timeout=5.0)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute(schema)
+    return connection
+
+
+class ThreadConnections:
+    """
+    One connection to a SQLite file per thread, opened on first use.
+
+    A connection is reopened in a forked child, and when the file was
+    replaced: delete_all() removes the answer file from under running
+    processes, and a connection to the removed file would never see (or
+    share) new rows.
+    """
+
+    def __init__(self, path: str, schema: str):
+        """
+        Initialize the connections.
+
+        Args:
+            path: SQLite file (created if missing)
+            schema: CREATE TABLE IF NOT EXISTS statement for its table
+        """
+        self.path = path
+        self.schema = schema
+        self._local = threading.local()
+
+    def get(self) -> sqlite3.Connection:
+        """This thread's connection"""
+        try:
+            inode = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            inode = None
+        local = self._local
+        connection = getattr(local, "connection", None)
+        if connection is not None and (local.pid, local.inode) == (os.getpid(), inode):
+            return connection
+        if connection is not None and local.pid == os.getpid():
+            connection.close()  # the file was replaced (a parent's connection is left alone)
+        local.connection = _connect(self.path, self.schema)
+        local.pid = os.getpid()
+        local.inode = os.stat(self.path).st_ino
+        return local.connection
+
+
+class QueryLog:
+    """
+    Counts normalized questions.
+
+    Counts are buffered in memory and a background thread writes them in one
+    transaction every `flush_interval` seconds (or sooner once `flush_size`
+    distinct questions are pending), so the request path never waits on the
+    disk.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 10.0, flush_size: int = 100):
+        """
+        Initialize the log.
+
+        Args:
+            path: SQLite file (created if missing)
+            flush_interval: Most seconds counts stay buffered
+            flush_size: Distinct buffered questions that trigger a flush
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self._connections = ThreadConnections(path, QUERIES_SCHEMA)
+        self._lock = threading.Lock()
+        self._pending: Counter = Counter()
+        self._wake = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_pid: Optional[int] = None
+        self._connections.get()
+        atexit.register(self.flush)
+
+    def record(self, question: str) -> None:
+        """Count one occurrence of an already-normalized question"""
+        with self._lock:
+            self._pending[question] += 1
+            due = len(self._pending) >= self.flush_size
+            if self._writer_pid != os.getpid():
+                # First record in this process (threads don't survive a fork)
+                self._writer_pid = os.getpid()
+                self._writer = threading.Thread(target=self._write_loop, name="query-log", daemon=True)
+                self._writer.start()
+        if due:
+            self._wake.set()
+
+    def _write_loop(self) -> None:
+        """Flush every flush_interval seconds, or when record() asks for it"""
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self) -> None:
+        """Write buffered counts (a failure is logged and the counts dropped)"""
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+        if not pending:
+            return
+        now = time.time()
+        try:
+            connection = self._connections.get()
+            with connection:
+                connection.executemany(
+                    "INSERT INTO queries (question, count, last_seen) VALUES (?, ?, ?) "
+                    "ON CONFLICT(question) DO UPDATE SET count = count + excluded.count, "
+                    "last_seen = excluded.last_seen",
+                    [(question, count, now) for question, count in pending.items()]
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Could not write query log {self.path}: {e}")
+
+    def top(self, n: int, min_count: int = 1) -> List[Tuple[str, int]]:
+        """
+        Most frequent questions.
+
+        Args:
+            n: Questions to return
+            min_count: Skip questions asked fewer times
+
+        Returns:
+            (question, count) pairs, most frequent first
+        """
+        self.flush()
+        return self._connections.get().execute(
+            "SELECT question, count FROM queries WHERE count >= ? "
+            "ORDER BY count DESC, last_seen DESC LIMIT ?",
+            (min_count, n)
+        ).fetchall()
+
+
+class AnswerStore:
+    """
+    Precomputed answers, valid for one corpus version.
+
+    Answers are kept in memory as well, charged to a memory budget; one the
+    budget evicts is read from the file again when next asked for. Questions
+    without an answer are remembered for `miss_ttl` seconds, so asking them
+    again doesn't query the file every time.
+    """
+
+    def __init__(self, path: str, budget: Optional[MemoryBudget] = None, miss_ttl: float = MISS_TTL):
+        """
+        Open the store.
+
+        Args:
+            path: SQLite file (created if missing)
+            budget: Memory budget to draw from (defaults to MEMORY_BUDGET_MB's)
+            miss_ttl: Seconds a miss is remembered per corpus version
+        """
+        self.path = path
+        self.miss_ttl = miss_ttl
+        self._connections = ThreadConnections(path, ANSWERS_SCHEMA)
+        self._lock = threading.Lock()
+        # (question, top_k, settings) -> (corpus_version, answer, sources)
+        self._answers: Dict[Tuple[str, int, str], Tuple[int, str, List[str]]] = {}
+        # Keys with no answer for _misses_version, forgotten at _misses_expiry
+        self._misses: Set[Tuple[str, int, str]] = set()
+        self._misses_version: Optional[int] = None
+        self._misses_expiry = 0.0
+        self._memory = (budget if budget is not None else MEMORY_BUDGET).account("answers", self._evict)
+        self._upgrade()
+
+    def _upgrade(self) -> None:
+        """Drop a table written before answers were keyed by settings (they are only a cache)"""
+        connection = self._connections.get()
+        columns = [row[1] for row in connection.execute("PRAGMA table_info(answers)")]
+        if "settings" not in columns:
+            logger.info(f"Discarding answers in {self.path} stored without their settings")
+            with connection:
+                connection.execute("DROP TABLE answers")
+                connection.execute(ANSWERS_SCHEMA)
+
+    def _remember(self, key: Tuple[str, int, str], value: Tuple[int, str, List[str]]) -> None:
+        """Keep an answer in memory and charge it to the budget"""
+        with self._lock:
+            self._answers[key] = value
+            self._misses.discard(key)
+        self._memory.charge(key, approximate_size((key, value)))
+
+    def _evict(self, key: Tuple[str, int, str]) -> None:
+        """Drop an answer from memory (it stays in the file)"""
+        with self._lock:
+            self._answers.pop(key, None)
+
+    def _known_miss(self, key: Tuple[str, int, str], corpus_version: int) -> bool:
+        """Whether `key` recently had no answer, starting afresh for a new version or once expired"""
+        now = time.monotonic()
+        with self._lock:
+            if (self._misses_version != corpus_version or now >= self._misses_expiry
+                    or len(self._misses) >= MAX_MISSES):
+                self._misses = set()
+                self._misses_version = corpus_version
+                self._misses_expiry = now + self.miss_ttl
+                return False
+            return key in self._misses
+
+    def load(self, corpus_version: int, settings: str = "") -> int:
+        """
+        Load every answer computed for `corpus_version` under `settings` into memory.
+
+        Returns:
+            Number of answers loaded
+        """
+        rows = self._connections.get().execute(
+            "SELECT question, top_k, answer, sources FROM answers WHERE corpus_version = ? AND settings = ?",
+            (corpus_version, settings)
+        ).fetchall()
+        with self._lock:
+            self._answers = {}
+            self._misses = set()
+            self._misses_version = None
+        self._memory.clear()
+        for question, top_k, answer, sources in rows:
+            self._remember((question, top_k, settings), (corpus_version, answer, json.loads(sources)))
+        logger.info(f"Loaded {len(rows)} precomputed answers for corpus version {corpus_version}")
+        return len(rows)
+
+    def get(
+        self,
+        question: str,
+        top_k: int,
+        corpus_version: int,
+        settings: str = ""
+    ) -> Optional[Tuple[str, List[str]]]:
+        """
+        Answer for a normalized question, if one was computed for this corpus
+        under these settings.
+
+        Falls back to the file on a memory miss (unless the question missed
+        there within miss_ttl), so answers written by a warmup job after
+        startup are picked up.
+
+        Returns:
+            (answer, sources), or None
+        """
+        key = (question, top_k, settings)
+        cached = self._answers.get(key)
+        if cached is not None and cached[0] == corpus_version:
+            self._memory.touch(key)
+            return cached[1], list(cached[2])
+        if self._known_miss(key, corpus_version):
+            return None
+        try:
+            row = self._connections.get().execute(
+                "SELECT answer, sources FROM answers "
+                "WHERE question = ? AND top_k = ? AND settings = ? AND corpus_version = ?",
+                (question, top_k, settings, corpus_version)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not read answer store {self.path}: {e}")
+            return None
+        if row is None:
+            with self._lock:
+                if self._misses_version == corpus_version:
+                    self._misses.add(key)
+            return None
+        answer, sources = row[0], json.loads(row[1])
+        self._remember(key, (corpus_version, answer, sources))
+        return answer, list(sources)
+
+    def put(
+        self,
+        question: str,
+        top_k: int,
+        corpus_version: int,
+        answer: str,
+        sources: List[str],
+        settings: str = ""
+    ) -> None:
+        """Store (or replace) the answer to a normalized question"""
+        connection = self._connections.get()
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO answers "
+                "(question, top_k, settings, corpus_version, answer, sources, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (question, top_k, settings, corpus_version, answer, json.dumps(sources), time.time())
+            )
+        self._remember((question, top_k, settings), (corpus_version, answer, list(sources)))
+
+    def prune(self, corpus_version: int, settings: str = "") -> int:
+        """
+        Delete answers computed for any other corpus version or settings.
+
+        Returns:
+            Number of answers deleted
+        """
+        connection = self._connections.get()
+        with connection:
+            deleted = connection.execute(
+                "DELETE FROM answers WHERE corpus_version != ? OR settings != ?", (corpus_version, settings)
+            ).rowcount
+        with self._lock:
+            stale = [key for key, value in self._answers.items()
+                     if value[0] != corpus_version or key[2] != settings]
+            for key in stale:
+                del self._answers[key]
+        for key in stale:
+            self._memory.release(key)
+        return deleted
+
+    def __len__(self) -> int:
+        return self._connections.get().execute("SELECT COUNT(*) FROM answers").fetchone()[0]
@@ -0,0 +1,372 @@
+"""
+Per-session conversation memory for multi-turn chat
+
+Recent turns are kept verbatim; older ones are folded into a running
+extractive summary, so the history sent to the LLM stays within a fixed
+token budget however long the conversation gets.
+
+Conversations can also be kept in a SQLite file that every worker process
+shares, so a session's history doesn't depend on which worker serves it.
+"""
+
+import functools
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from src.core.answers import ThreadConnections
+from src.utils import get_logger
+from src.utils.memory import MEMORY_BUDGET, MemoryBudget, approximate_size
+
+logger = get_logger(__name__)
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "but", "of", "to", "in", "on", "for", "with", "by", "at",
+    "from", "as", "is", "are", "was", "were", "be", "been", "what", "which", "who", "whom",
+    "how", "why", "when", "where", "does", "do", "did", "can", "could", "would", "should",
+    "about", "it", "its", "that", "this", "those", "these", "they", "them", "their", "there",
+    "i", "me", "my", "you", "your", "we", "us", "our", "he", "she", "his", "her", "also",
+    "same", "any", "some", "if", "then", "so", "than", "more", "tell",
+}
+
+# Questions that lean on the previous turn. An opening like "what about" is
+# enough; a pronoun only counts in a short question ("Is it bailable?"), as
+# a longer one usually names its subject, and a demonstrative only when it
+# stands alone ("the fine for that?") rather than before a noun ("this act").
+# Pronouns are matched case-sensitively so acronyms ("IT Act") don't count.
+FOLLOW_UP_OPENING = re.compile(r"^\s*(and|also|what about|how about|so|then)\b", re.IGNORECASE)
+FOLLOW_UP_PRONOUN = re.compile(r"\b(it|its|they|them|their|he|she|his|her|the same|the above)\b")
+FOLLOW_UP_DEMONSTRATIVE = re.compile(
+    r"\b(this|that|these|those)\s*(?:[?.!]*\s*$"
+    r"|(is|are|was|were|does|do|did|mean|means|apply|applies|cover|covers|include|includes)\b)"
+)
+# Longest question (in words) in which a pronoun marks a follow-up
+FOLLOW_UP_MAX_WORDS = 8
+
+
+def looks_like_follow_up(question: str) -> bool:
+    """Whether `question` reads as leaning on an earlier one"""
+    if FOLLOW_UP_OPENING.search(question):
+        return True
+    text = question.strip()
+    text = text[:1].lower() + text[1:]
+    if FOLLOW_UP_DEMONSTRATIVE.search(text):
+        return True
+    return len(text.split()) <= FOLLOW_UP_MAX_WORDS and FOLLOW_UP_PRONOUN.search(text) is not None
+
+
+CONVERSATIONS_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS conversations ("
+    "session_id TEXT PRIMARY KEY, revision INTEGER NOT NULL, state TEXT NOT NULL, updated REAL NOT NULL)"
+)
+
+# Seconds between deletions of expired rows from the shared file
+PRUNE_INTERVAL = 60.0
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)"""
+    return (len(text) + 3) // 4
+
+
+def keywords(text: str, limit: int = 8) -> List[str]:
+    """Distinct content words of `text`, in order of appearance"""
+    seen: List[str] = []
+    for word in re.findall(r"[a-z0-9][a-z0-9'-]*", text.lower()):
+        if word not in STOPWORDS and len(word) > 2 and word not in seen:
+            seen.append(word)
+    return seen[:limit]
+
+
+def first_sentence(text: str, max_chars: int = 200) -> str:
+    """Leading sentence of `text`, cut at `max_chars`"""
+    sentence = re.split(r"(?<=[.!?])\s", text.strip(), maxsplit=1)[0]
+    return sentence[:max_chars]
+
+
+class Conversation:
+    """History of one chat session"""
+
+    def __init__(
+        self,
+        max_turns: int = 4,
+        summary_budget: int = 200,
+        on_change: Optional[Callable[["Conversation"], None]] = None
+    ):
+        """
+        Initialize an empty conversation.
+
+        Args:
+            max_turns: Recent turns kept verbatim before folding into the summary
+            summary_budget: Token budget for the running summary
+            on_change: Called after each recorded turn (to re-measure its size)
+        """
+        self.max_turns = max_turns
+        self.summary_budget = summary_budget
+        self.on_change = on_change
+        self.turns: Deque[Tuple[str, str]] = deque()
+        self.summary: Deque[str] = deque()
+        self.last_query = ""
+        self.last_used = time.monotonic()
+        # Revision of the shared copy this one matches (0 = none)
+        self.revision = 0
+        self._lock = threading.Lock()
+
+    def is_follow_up(self, question: str) -> bool:
+        """
+        Whether `question` leans on the conversation so far ("what about ...",
+        or pronouns) rather than standing on its own.
+        """
+        with self._lock:
+            previous = self.last_query
+        return bool(previous) and looks_like_follow_up(question)
+
+    def standalone_query(self, question: str) -> str:
+        """
+        Rewrite a follow-up question into a self-contained retrieval query.
+
+        Follow-ups get the content words of the previous query that they
+        don't already mention; other questions are returned unchanged.
+        """
+        if not self.is_follow_up(question):
+            return question
+        with self._lock:
+            previous = self.last_query
+        present = set(keywords(question, limit=50))
+        missing = [word for word in keywords(previous) if word not in present]
+        return f"{question} ({' '.join(missing)})" if missing else question
+
+    def history_text(self, budget: int) -> str:
+        """
+        Summary plus recent turns, oldest parts dropped to fit `budget` tokens.
+
+        Args:
+            budget: Maximum tokens of history
+
+        Returns:
+            History formatted for the prompt ('' for a new conversation)
+        """
+        with self._lock:
+            sections = [f"User: {q}\nAssistant: {a}" for q, a in self.turns]
+            if self.summary:
+                sections.insert(0, "Earlier: " + " ".join(self.summary))
+        while sections and estimate_tokens("\n\n".join(sections)) > budget:
+            if len(sections) == 1:
+                # Keep the end of the latest turn, which matters most
+                sections[0] = sections[0][-budget * 4:]
+                break
+            sections.pop(0)
+        return "\n\n".join(sections)
+
+    def add_turn(self, question: str, standalone: str, answer: str) -> None:
+        """Record a turn, folding the oldest turns into the summary"""
+        with self._lock:
+            self.turns.append((question, answer))
+            self.last_query = standalone
+            while len(self.turns) > self.max_turns:
+                old_question, old_answer = self.turns.popleft()
+                self.summary.append(f"Q: {old_question} A: {first_sentence(old_answer)}")
+            while len(self.summary) > 1 and estimate_tokens(" ".join(self.summary)) > self.summary_budget:
+                self.summary.popleft()
+            self.last_used = time.monotonic()
+        if self.on_change is not None:
+            self.on_change(self)
+
+    def size(self) -> int:
+        """Approximate bytes held by this conversation"""
+        with self._lock:
+            return approximate_size([self.turns, self.summary, self.last_query]) + 512
+
+    def state(self) -> Dict[str, Any]:
+        """Turns, summary and last query, as JSON-serializable data"""
+        with self._lock:
+            return {
+                "turns": [list(turn) for turn in self.turns],
+                "summary": list(self.summary),
+                "last_query": self.last_query,
+            }
+
+    def restore(self, state: Dict[str, Any], revision: int) -> None:
+        """Replace the history with `state` (from state()) at a shared revision"""
+        with self._lock:
+            self.turns = deque(tuple(turn) for turn in state.get("turns", []))
+            self.summary = deque(state.get("summary", []))
+            self.last_query = state.get("last_query", "")
+            self.revision = revision
+
+
+class ConversationStore:
+    """
+    Bounded in-memory conversations with LRU eviction and idle expiry.
+
+    Conversations are also charged to a memory budget, which may evict them
+    before max_sessions is reached.
+
+    Given a path, every recorded turn is also written to a SQLite file, and
+    get() reloads a conversation whenever another process has written a
+    newer revision of it, so workers sharing the file share conversations.
+    Two requests of one session answered at the same time by different
+    workers both record their turn, but the later write replaces the other.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 1000,
+        ttl: float = 3600.0,
+        max_turns: int = 4,
+        summary_budget: int = 200,
+        budget: Optional[MemoryBudget] = None,
+        path: Optional[str] = None
+    ):
+        """
+        Initialize the store.
+
+        Args:
+            max_sessions: Conversations kept in memory before evicting the
+                least recently used
+            ttl: Seconds of inactivity after which a conversation is dropped
+            max_turns: Recent turns kept verbatim per conversation
+            summary_budget: Token budget for each running summary
+            budget: Memory budget to draw from (defaults to MEMORY_BUDGET_MB's)
+            path: SQLite file shared with other processes (created if
+                missing; None = this process only)
+
+        Raises:
+            sqlite3.Error: If the file can't be opened
+            OSError: If its directory can't be created
+        """
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_turns = max_turns
+        self.summary_budget = summary_budget
+        self.path = path
+        self._conversations: "OrderedDict[str, Conversation]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._memory = (budget if budget is not None else MEMORY_BUDGET).account("conversations", self._evict)
+        self._connections = None
+        self._next_prune = 0.0
+        if path is not None:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._connections = ThreadConnections(path, CONVERSATIONS_SCHEMA)
+            self._connections.get()
+
+    def __len__(self) -> int:
+        return len(self._conversations)
+
+    def get(self, session_id: str) -> Conversation:
+        """Conversation for `session_id`, created if missing or expired"""
+        now = time.monotonic()
+        dropped = []
+        with self._lock:
+            # Ordered by last access, so expired entries are at the front
+            while self._conversations:
+                oldest = next(iter(self._conversations.values()))
+                if now - oldest.last_used <= self.ttl:
+                    break
+                dropped.append(self._conversations.popitem(last=False)[0])
+
+            conversation = self._conversations.get(session_id)
+            if conversation is None:
+                conversation = Conversation(self.max_turns, self.summary_budget,
+                                            on_change=functools.partial(self._changed, session_id))
+                self._conversations[session_id] = conversation
+                while len(self._conversations) > self.max_sessions:
+                    dropped.append(self._conversations.popitem(last=False)[0])
+            else:
+                self._conversations.move_to_end(session_id)
+            conversation.last_used = now
+        for dropped_id in dropped:
+            self._memory.release(dropped_id)
+        if self._connections is not None:
+            self._load(session_id, conversation)
+        self._charge(session_id, conversation)
+        return conversation
+
+    def reset(self, session_id: str) -> None:
+        """Forget the conversation for `session_id`"""
+        with self._lock:
+            self._conversations.pop(session_id, None)
+        self._memory.release(session_id)
+        if self._connections is not None:
+            try:
+                connection = self._connections.get()
+                with connection:
+                    connection.execute("DELETE FROM conversations WHERE session_id = ?", (session_id,))
+            except sqlite3.Error as e:
+                logger.warning(f"Could not reset conversation in {self.path}: {e}")
+
+    def clear(self) -> None:
+        """Forget every conversation (including those of other processes sharing the file)"""
+        with self._lock:
+            session_ids = list(self._conversations)
+            self._conversations.clear()
+        for session_id in session_ids:
+            self._memory.release(session_id)
+        if self._connections is not None:
+            try:
+                connection = self._connections.get()
+                with connection:
+                    connection.execute("DELETE FROM conversations")
+            except sqlite3.Error as e:
+                logger.warning(f"Could not clear conversations in {self.path}: {e}")
+
+    def _load(self, session_id: str, conversation: Conversation) -> None:
+        """Bring a conversation up to the shared file's revision of it"""
+        try:
+            row = self._connections.get().execute(
+                "SELECT revision, state, updated FROM conversations WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not read conversation from {self.path}: {e}")
+            return
+        if row is None or time.time() - row[2] > self.ttl:
+            if conversation.revision:
+                # Reset or expired in another process
+                conversation.restore({}, 0)
+        elif row[0] != conversation.revision:
+            conversation.restore(json.loads(row[1]), row[0])
+
+    def _save(self, session_id: str, conversation: Conversation) -> None:
+        """Write a conversation to the shared file as its next revision"""
+        now = time.time()
+        try:
+            connection = self._connections.get()
+            with connection:
+                connection.execute(
+                    "INSERT INTO conversations VALUES (?, 1, ?, ?) ON CONFLICT(session_id) DO UPDATE "
+                    "SET revision = revision + 1, state = excluded.state, updated = excluded.updated",
+                    (session_id, json.dumps(conversation.state()), now)
+                )
+                revision = connection.execute(
+                    "SELECT revision FROM conversations WHERE session_id = ?", (session_id,)
+                ).fetchone()[0]
+                if now >= self._next_prune:
+                    self._next_prune = now + PRUNE_INTERVAL
+                    connection.execute("DELETE FROM conversations WHERE updated < ?", (now - self.ttl,))
+        except sqlite3.Error as e:
+            logger.warning(f"Could not write conversation to {self.path}: {e}")
+            return
+        conversation.revision = revision
+
+    def _changed(self, session_id: str, conversation: Conversation) -> None:
+        """Share and re-measure a conversation after a turn was recorded"""
+        if self._connections is not None:
+            self._save(session_id, conversation)
+        self._charge(session_id, conversation)
+
+    def _charge(self, session_id: str, conversation: Conversation) -> None:
+        """Charge a conversation's current size to the memory budget (unless it was dropped)"""
+        if self._conversations.get(session_id) is conversation:
+            self._memory.charge(session_id, conversation.size())
+
+    def _evict(self, session_id: str) -> None:
+        """Drop a conversation to free memory (a shared one stays in the file)"""
+        with self._lock:
+            self._conversations.pop(session_id, None)
@@ -0,0 +1,117 @@
+"""
+Cache of parsed PDF pages
+
+Parsing is the slowest CPU step of ingestion, and its output only depends
+on the file's bytes and the parser. Each parsed file is kept as one
+gzip-compressed JSON file named by the SHA-256 of its contents, and tagged
+with the parser version, so re-chunking or rebuilding a store re-reads the
+text instead of re-parsing it. A file parsed by another parser version is a
+miss (and is overwritten).
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from importlib import metadata as importlib_metadata
+from typing import Any, Dict, List, Optional
+
+from langchain_core.documents import Document
+
+from src.utils import get_logger
+
+logger = get_logger(__name__)
+
+
+def _package_version(name: str) -> str:
+    try:
+        return importlib_metadata.version(name)
+    except importlib_metadata.PackageNotFoundError:
+        return "unknown"
+
+
+# Bump the trailing number when the pipeline's parsing options change
+PARSER_VERSION = f"pypdf {_package_version('pypdf')}; langchain-community {_package_version('langchain-community')}; 1"
+
+
+def content_hash(data: bytes) -> str:
+    """SHA-256 hex digest of file contents"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_content_hash(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 hex digest of a file, read in chunks"""
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+class PageCache:
+    """Parsed pages per file content hash, one compressed file per document"""
+
+    def __init__(self, directory: str, parser_version: str = PARSER_VERSION):
+        """
+        Initialize the cache.
+
+        Args:
+            directory: Where cache files are kept (created on the first put)
+            parser_version: Entries made by any other version are ignored
+        """
+        self.directory = directory
+        self.parser_version = parser_version
+
+    def _path(self, file_hash: str) -> str:
+        return os.path.join(self.directory, f"{file_hash}.json.gz")
+
+    def get(self, file_hash: str, source: str) -> Optional[List[Document]]:
+        """
+        Pages parsed from a file with this content hash.
+
+        Args:
+            file_hash: SHA-256 of the file contents
+            source: Value for each page's "source" metadata (the same bytes
+                may have been parsed under another path)
+
+        Returns:
+            One document per page, or None on a miss
+        """
+        try:
+            with gzip.open(self._path(file_hash), "rt", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable page cache entry {file_hash[:12]}: {e}")
+            return None
+        if entry.get("parser") != self.parser_version:
+            return None
+        return [
+            Document(page_content=page["text"], metadata={**page["metadata"], "source": source})
+            for page in entry["pages"]
+        ]
+
+    def put(self, file_hash: str, documents: List[Document]) -> None:
+        """Store the parsed pages of a file (a failure is logged, not raised)"""
+        pages: List[Dict[str, Any]] = [
+            {
+                "text": document.page_content,
+                "metadata": {key: value for key, value in document.metadata.items() if key != "source"},
+            }
+            for document in documents
+        ]
+        path = self._path(file_hash)
+        temp_path = None
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # A unique temp file: threads of one process may cache the same file at once
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix=f"{file_hash[:12]}.", suffix=".tmp")
+            with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8", compresslevel=6) as f:
+                json.dump({"parser": self.parser_version, "pages": pages}, f, default=str)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write page cache entry {file_hash[:12]}: {e}")
+            if temp_path is not None and os.path.exists(temp_path):
+                os.remove(temp_path)
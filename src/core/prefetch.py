@@ -0,0 +1,182 @@
+"""
+Speculative retrieval while the user types
+
+The UI sends the partial question to /prefetch; its search results are kept
+per session for a few seconds. When the full question arrives and is the
+same or nearly the same, /query reuses those results and goes straight to
+generation.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from typing import Any, List, Optional, Tuple
+
+from src.utils.memory import MEMORY_BUDGET, MemoryBudget, approximate_size
+
+
+class Prefetch:
+    """Search results for one session's latest partial question"""
+
+    def __init__(self, search_text: str, top_k: int, corpus_version: int, results: List[Tuple[Any, float]]):
+        self.search_text = search_text
+        self.top_k = top_k
+        self.corpus_version = corpus_version
+        self.results = results
+        self.created = time.monotonic()
+
+    def matches(self, search_text: str, top_k: int, corpus_version: int, min_ratio: float) -> bool:
+        """
+        Whether these results can stand in for a search for `search_text`.
+
+        Args:
+            search_text: Normalized retrieval query of the submitted question
+            top_k: Results the query needs
+            corpus_version: Current corpus version
+            min_ratio: Least similarity (0-1) between the two texts
+
+        Returns:
+            True for the same corpus and top_k and a (nearly) identical text
+        """
+        if corpus_version != self.corpus_version or top_k > self.top_k:
+            return False
+        if search_text == self.search_text:
+            return True
+        return SequenceMatcher(None, search_text, self.search_text).ratio() >= min_ratio
+
+
+class PrefetchCache:
+    """
+    Bounded per-session prefetch results.
+
+    Each session keeps only its latest prefetch, sessions are evicted LRU
+    beyond `max_sessions`, and results expire after `ttl` seconds. Starting a
+    new prefetch (or cancelling) supersedes one still running, whose
+    results are then discarded. Kept results are charged to a memory
+    budget, which may drop them early.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 1000,
+        ttl: float = 30.0,
+        min_interval: float = 0.25,
+        budget: Optional[MemoryBudget] = None
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            max_sessions: Sessions kept before evicting the least recently used
+            ttl: Seconds a prefetch stays usable
+            min_interval: Least seconds between prefetches of one session
+            budget: Memory budget to draw from (defaults to MEMORY_BUDGET_MB's)
+        """
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        # session -> [generation, last start time, Prefetch or None]
+        self._sessions: "OrderedDict[str, list]" = OrderedDict()
+        self._memory = (budget if budget is not None else MEMORY_BUDGET).account("prefetch", self._drop)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _session(self, session_id: str, dropped: List[str]) -> list:
+        """Entry for `session_id`, adding evicted sessions to `dropped` (caller holds the lock)"""
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            entry = self._sessions[session_id] = [0, float("-inf"), None]
+            while len(self._sessions) > self.max_sessions:
+                dropped.append(self._sessions.popitem(last=False)[0])
+        else:
+            self._sessions.move_to_end(session_id)
+        return entry
+
+    def begin(self, session_id: str) -> Optional[int]:
+        """
+        Start a prefetch, superseding any running one.
+
+        Returns:
+            Token to pass to finish(), or None if the session is prefetching
+            faster than min_interval allows
+        """
+        now = time.monotonic()
+        dropped: List[str] = []
+        with self._lock:
+            entry = self._session(session_id, dropped)
+            token = None
+            if now - entry[1] >= self.min_interval:
+                entry[0] += 1
+                entry[1] = now
+                token = entry[0]
+        for dropped_id in dropped:
+            self._memory.release(dropped_id)
+        return token
+
+    def finish(self, session_id: str, token: int, prefetch: Prefetch) -> bool:
+        """
+        Keep a prefetch's results unless a newer prefetch or a cancel came in.
+
+        Returns:
+            True if the results were kept
+        """
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None or entry[0] != token:
+                return False
+            entry[2] = prefetch
+        self._memory.charge(session_id, approximate_size(prefetch.results) + 256)
+        return True
+
+    def is_current(self, session_id: str, token: int) -> bool:
+        """Whether the prefetch with `token` is still the session's latest"""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            return entry is not None and entry[0] == token
+
+    def cancel(self, session_id: str) -> None:
+        """Drop the session's results and discard any running prefetch"""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None:
+                entry[0] += 1
+                entry[2] = None
+        self._memory.release(session_id)
+
+    def clear(self) -> None:
+        """Drop every session's results and discard all running prefetches"""
+        with self._lock:
+            session_ids = list(self._sessions)
+            for entry in self._sessions.values():
+                entry[0] += 1
+                entry[2] = None
+        for session_id in session_ids:
+            self._memory.release(session_id)
+
+    def take(self, session_id: str) -> Optional[Prefetch]:
+        """
+        Remove and return the session's unexpired prefetch, if any.
+
+        A prefetch still running for the session is discarded: its text is
+        older than the question now being answered.
+        """
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            entry[0] += 1
+            prefetch, entry[2] = entry[2], None
+        if prefetch is None:
+            return None
+        self._memory.release(session_id)
+        if time.monotonic() - prefetch.created > self.ttl:
+            return None
+        return prefetch
+
+    def _drop(self, session_id: str) -> None:
+        """Forget a session to free memory (a running prefetch's results are then discarded)"""
+        with self._lock:
+            self._sessions.pop(session_id, None)
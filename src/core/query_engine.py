@@ -2,12 +2,23 @@
 Query engine for RAG-based question answering
 """
 
-from typing import List, Tuple, Any
+import os
+import re
+import sqlite3
+from contextlib import nullcontext
+from typing import ContextManager, List, Optional, Tuple, Any
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.messages import HumanMessage, SystemMessage
-from src.database.chroma_manager import ChromaManager
+from src.core.answers import AnswerStore, QueryLog
+from src.core.conversation import Conversation
+from src.core.prefetch import Prefetch
+from src.database.chroma_manager import ANSWER_STORE_FILE, QUERY_LOG_FILE, ChromaManager
 from src.models import get_llm_model
-from src.utils import get_logger
+from src.utils import get_logger, load_config
+from src.utils.admission import AdmissionPool
+from src.utils.metrics import CHUNKS_FILTERED, LLM_CALLS_SKIPPED, record_cache, record_llm_usage, timed
+from src.utils.profiling import profiled
+from src.utils.single_flight import SingleFlight
 
 logger = get_logger(__name__)
 
@@ -24,56 +35,302 @@ Question: {question}
 
 Answer:"""
 
+CONVERSATION_PROMPT_TEMPLATE = """Conversation so far:
+
+{history}
+
+---
+
+""" + PROMPT_TEMPLATE
+
+NO_ANSWER = "No relevant information found in the uploaded documents."
+
+
+def normalize_question(text: str) -> str:
+    """Canonical form of a question for coalescing and caching"""
+    text = re.sub(r"\s+", " ", text.strip().lower())
+    return text.rstrip(" ?.!")
+
 
 class QueryEngine:
     """Handles query processing and RAG-based retrieval"""
     
-    def __init__(self, chroma_path: str, model_name: str = "mistralai/mistral-7b-instruct"):
+    def __init__(
+        self,
+        chroma_path: str,
+        model_name: str = "mistralai/mistral-7b-instruct",
+        vector_store: ChromaManager = None,
+        llm: Any = None,
+        relevance_threshold: Optional[float] = None,
+        history_token_budget: Optional[int] = None,
+        retrieval_mode: Optional[str] = None,
+        query_log: Optional[QueryLog] = None,
+        answer_store: Optional[AnswerStore] = None,
+        admission: Optional[AdmissionPool] = None
+    ):
         """
         Initialize query engine.
         
         Args:
             chroma_path: Path to Chroma database
             model_name: LLM model to use
+            vector_store: Existing store to use instead of opening chroma_path
+            llm: Chat model to use instead of get_llm_model(model_name)
+            relevance_threshold: Minimum chunk similarity sent to the LLM
+                (defaults to RELEVANCE_THRESHOLD; 0 disables filtering)
+            history_token_budget: Tokens of conversation history put in the
+                prompt (defaults to HISTORY_TOKEN_BUDGET)
+            retrieval_mode: "flat" or "hierarchical" (defaults to RETRIEVAL_MODE)
+            query_log: Question counter (defaults to one in the store
+                directory when QUERY_LOG is on)
+            answer_store: Precomputed answers (defaults to the store
+                directory's when ANSWER_STORE is on)
+            admission: Pool a query must get a slot from before it searches
+                and calls the LLM; stored answers and queries joining an
+                identical in-flight one don't need a slot (None = no limit)
         """
-        self.vector_store = ChromaManager(chroma_path)
-        self.llm = get_llm_model(model_name=model_name)
+        config = load_config()
+        self.vector_store = vector_store or ChromaManager(chroma_path)
+        self.llm = llm or get_llm_model(model_name=model_name)
+        if relevance_threshold is None:
+            relevance_threshold = config['relevance_threshold']
+        self.relevance_threshold = relevance_threshold
+        if history_token_budget is None:
+            history_token_budget = config['history_token_budget']
+        self.history_token_budget = history_token_budget
+        self.retrieval_mode = retrieval_mode or config['retrieval_mode']
+        self.retrieval_documents = config['retrieval_documents']
+        self.retrieval_sections = config['retrieval_sections']
+        self.prefetch_match_ratio = config['prefetch_match_ratio']
+        directory = self.vector_store.persist_directory
+        if query_log is None and config['query_log']:
+            query_log = self._open(QueryLog, os.path.join(directory, QUERY_LOG_FILE))
+        self.query_log = query_log
+        if answer_store is None and config['answer_store']:
+            answer_store = self._open(AnswerStore, os.path.join(directory, ANSWER_STORE_FILE))
+        self.answer_store = answer_store
+        # What besides the corpus shapes an answer: stored answers computed
+        # under other settings are not served
+        self.answer_settings = (
+            f"model={model_name};threshold={self.relevance_threshold};retrieval={self.retrieval_mode}"
+            f"/{self.retrieval_documents}/{self.retrieval_sections}"
+        )
+        if self.answer_store is not None:
+            self.answer_store.load(self.vector_store.corpus_version, self.answer_settings)
+        self.admission = admission
+        self._in_flight = SingleFlight()
         logger.info(f"Initialized Query Engine with model {model_name}")
     
-    def query(self, query_text: str, top_k: int = 5) -> Tuple[str, List[str]]:
+    @staticmethod
+    def _open(kind: Any, path: str) -> Any:
+        """Open a QueryLog/AnswerStore, or None if the directory isn't writable"""
+        try:
+            return kind(path)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"{kind.__name__} disabled, could not open {path}: {e}")
+            return None
+    
+    def _admitted(self) -> ContextManager:
+        """Slot in the admission pool for provider-bound work, if there is a pool"""
+        return self.admission.admit() if self.admission is not None else nullcontext()
+    
+    @profiled("query")
+    def query(
+        self,
+        query_text: str,
+        top_k: int = 5,
+        conversation: Optional[Conversation] = None,
+        prefetched: Optional[Prefetch] = None
+    ) -> Tuple[str, List[str]]:
         """
         Execute a query against the RAG system.
         
         Args:
             query_text: User query
             top_k: Number of relevant documents to retrieve
+            conversation: Chat history; follow-ups are rewritten into
+                standalone queries and answered with the history, other
+                questions are answered (and coalesced) as if asked alone;
+                the turn is recorded afterwards either way
+            prefetched: Results of prefetch() for what the user was typing;
+                used instead of searching if the question (nearly) matches
         
         Returns:
             Tuple of (answer, source_ids)
+        
+        Raises:
+            AdmissionRejected: If the query needs the LLM and the admission
+                pool is full
         """
+        search_text, history = query_text, ""
+        if conversation is not None and conversation.is_follow_up(query_text):
+            search_text = conversation.standalone_query(query_text)
+            history = conversation.history_text(self.history_token_budget)
+            if search_text != query_text:
+                logger.info(f"Rewrote follow-up as: {search_text[:80]}...")
+        
+        question = normalize_question(search_text)
+        if self.query_log is not None:
+            self.query_log.record(question)
+        
+        # Frequent questions may have been answered ahead of time for this
+        # corpus; follow-ups depend on their history, so aren't looked up
+        if self.answer_store is not None and not history:
+            stored = self.answer_store.get(question, top_k, self.vector_store.corpus_version,
+                                           self.answer_settings)
+            record_cache("answers", stored is not None)
+            if stored is not None:
+                logger.info(f"Served precomputed answer: {query_text[:50]}...")
+                answer, sources = stored
+                if conversation is not None:
+                    conversation.add_turn(query_text, search_text, answer)
+                return answer, sources
+        
+        # Chunks retrieved while the user was typing this question
+        results = None
+        if prefetched is not None:
+            hit = prefetched.matches(question, top_k, self.vector_store.corpus_version,
+                                     self.prefetch_match_ratio)
+            record_cache("prefetch", hit)
+            if hit:
+                logger.info(f"Using prefetched retrieval for: {query_text[:50]}...")
+                results = prefetched.results[:top_k]
+        
+        # Identical questions arriving while one is being answered wait for
+        # that answer instead of running their own search and LLM call; only
+        # the one doing the work takes an admission slot
+        def answer_once() -> Tuple[str, List[str]]:
+            with self._admitted():
+                return self._answer(query_text, top_k, search_text, history, results)
+        
+        key = (question, top_k, self.vector_store.corpus_version, history)
+        (answer, sources), shared = self._in_flight.do(key, answer_once)
+        record_cache("coalesce", shared)
+        if shared:
+            logger.info(f"Coalesced with in-flight query: {query_text[:50]}...")
+        if conversation is not None:
+            conversation.add_turn(query_text, search_text, answer)
+        return answer, list(sources)
+    
+    def precompute(self, question: str, top_k: int = 5) -> bool:
+        """
+        Answer a question and save it in the answer store.
+        
+        Args:
+            question: Question to answer
+            top_k: Number of relevant documents to retrieve
+        
+        Returns:
+            True if saved; False if there is no answer store or the corpus
+            changed while answering (the answer would already be stale)
+        """
+        if self.answer_store is None:
+            return False
+        version = self.vector_store.corpus_version
+        answer, sources = self._answer(question, top_k)
+        if self.vector_store.corpus_version != version:
+            return False
+        self.answer_store.put(normalize_question(question), top_k, version, answer, sources,
+                              self.answer_settings)
+        return True
+    
+    def prefetch(
+        self,
+        query_text: str,
+        top_k: int = 5,
+        conversation: Optional[Conversation] = None
+    ) -> Prefetch:
+        """
+        Retrieve context for a question that is still being typed.
+        
+        Args:
+            query_text: Partial question
+            top_k: Number of relevant documents to retrieve
+            conversation: Chat history, for rewriting follow-ups as query() will
+        
+        Returns:
+            Prefetch to hand to query() with the finished question
+        """
+        search_text = conversation.standalone_query(query_text) if conversation is not None else query_text
+        version = self.vector_store.corpus_version
+        with timed("prefetch"):
+            results = self.retrieve(search_text, top_k)
+        return Prefetch(normalize_question(search_text), top_k, version, results)
+    
+    def retrieve(self, search_text: str, top_k: int) -> List[Tuple[Any, float]]:
+        """
+        Search the store the way this engine is configured to.
+        
+        Args:
+            search_text: Retrieval query
+            top_k: Number of documents to return
+        
+        Returns:
+            (document, score) pairs, best first
+        """
+        if self.retrieval_mode == 'hierarchical':
+            return self.vector_store.hierarchical_search(
+                search_text,
+                k=top_k,
+                documents=self.retrieval_documents,
+                sections=self.retrieval_sections
+            )
+        return self.vector_store.similarity_search(search_text, k=top_k)
+    
+    def _answer(
+        self,
+        query_text: str,
+        top_k: int,
+        search_text: Optional[str] = None,
+        history: str = "",
+        results: Optional[List[Tuple[Any, float]]] = None
+    ) -> Tuple[str, List[str]]:
+        """Retrieve context (unless already retrieved) and generate an answer (uncoalesced)"""
         logger.info(f"Processing query: {query_text[:50]}...")
         
         # Retrieve relevant documents
-        results = self.vector_store.similarity_search(query_text, k=top_k)
+        if results is None:
+            results = self.retrieve(search_text or query_text, top_k)
         
         if not results:
             logger.warning("No relevant documents found")
-            return "No relevant information found in the database.", []
-        
-        # Extract context and sources
-        context_text = "\n\n---\n\n".join([doc.page_content for doc, _score in results])
-        sources = [doc.metadata.get("id", "Unknown") for doc, _score in results]
+            return NO_ANSWER, []
         
-        # Format prompt
-        prompt = PROMPT_TEMPLATE.format(context=context_text, question=query_text)
+        if self.relevance_threshold > 0:
+            relevant = [
+                (doc, score) for doc, score in results
+                if self.vector_store.relevance(score) >= self.relevance_threshold
+            ]
+            CHUNKS_FILTERED.inc(len(results) - len(relevant))
+            if not relevant:
+                # Nothing on topic: answer without spending a generation
+                LLM_CALLS_SKIPPED.inc()
+                logger.info(f"No chunk above relevance {self.relevance_threshold}, skipped LLM call")
+                return NO_ANSWER, []
+            results = relevant
         
-        # Generate response
-        messages = [
-            SystemMessage(content=SYSTEM_MESSAGE),
-            HumanMessage(content=prompt)
-        ]
+        with timed("context_build"):
+            # Extract context and sources
+            context_text = "\n\n---\n\n".join([doc.page_content for doc, _score in results])
+            sources = [doc.metadata.get("id", "Unknown") for doc, _score in results]
+            
+            # Format prompt
+            if history:
+                prompt = CONVERSATION_PROMPT_TEMPLATE.format(
+                    history=history, context=context_text, question=query_text
+                )
+            else:
+                prompt = PROMPT_TEMPLATE.format(context=context_text, question=query_text)
+            
+            # Generate response
+            messages = [
+                SystemMessage(content=SYSTEM_MESSAGE),
+                HumanMessage(content=prompt)
+            ]
         
-        response = self.llm.invoke(messages)
+        with timed("llm"):
+            response = self.llm.invoke(messages)
+        record_llm_usage(response)
         answer = response.content.strip() if hasattr(response, 'content') else str(response)
         
         logger.info(f"Generated response with {len(sources)} sources")
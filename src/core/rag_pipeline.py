@@ -2,12 +2,18 @@
 RAG Pipeline - Retrieval-Augmented Generation
 """
 
-from typing import List, Tuple, Any
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
 from langchain_core.documents import Document
+from langchain_core.documents.base import Blob
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import PyPDFDirectoryLoader
+from langchain_community.document_loaders.parsers import PyPDFParser
+from src.core.page_cache import PageCache, file_content_hash
+from src.core.sections import assign_sections
 from src.database.chroma_manager import ChromaManager
-from src.utils import get_logger
+from src.utils import get_logger, load_config
+from src.utils.metrics import INGESTED, record_cache, timed
+from src.utils.profiling import profiled
 
 logger = get_logger(__name__)
 
@@ -15,16 +21,35 @@ logger = get_logger(__name__)
 class RAGPipeline:
     """Manages the complete RAG pipeline"""
     
-    def __init__(self, data_path: str, chroma_path: str):
+    def __init__(
+        self,
+        data_path: str,
+        chroma_path: str,
+        vector_store: ChromaManager = None,
+        build_sections: Optional[bool] = None,
+        page_cache: Optional[PageCache] = None
+    ):
         """
         Initialize RAG pipeline.
         
         Args:
             data_path: Path to PDF data directory
             chroma_path: Path to Chroma database
+            vector_store: Existing store to use instead of opening chroma_path
+            build_sections: Index document/section summaries for hierarchical
+                retrieval (defaults to RETRIEVAL_MODE=hierarchical)
+            page_cache: Parsed pages to reuse (defaults to one in
+                PAGE_CACHE_DIR; none if that is empty)
         """
+        config = load_config()
         self.data_path = data_path
-        self.vector_store = ChromaManager(chroma_path)
+        self.vector_store = vector_store or ChromaManager(chroma_path)
+        if build_sections is None:
+            build_sections = config['retrieval_mode'] == 'hierarchical'
+        self.build_sections = build_sections
+        if page_cache is None and config['page_cache_dir']:
+            page_cache = PageCache(config['page_cache_dir'])
+        self.page_cache = page_cache
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=800,
             chunk_overlap=80,
@@ -36,15 +61,77 @@ class RAGPipeline:
     def load_documents(self) -> List[Document]:
         """Load documents from PDF directory"""
         logger.info(f"Loading documents from {self.data_path}")
-        loader = PyPDFDirectoryLoader(self.data_path)
-        documents = loader.load()
+        root = Path(self.data_path)
+        documents = []
+        for path in sorted(root.glob("**/[!.]*.pdf")):
+            # Same files as PyPDFDirectoryLoader: no hidden directories
+            if path.is_file() and not any(part.startswith(".") for part in path.relative_to(root).parts):
+                documents.extend(self._parse(str(path), str(path)))
+        INGESTED.inc(len(documents), kind="pages")
         logger.info(f"Loaded {len(documents)} documents")
         return documents
     
+    def load_pdf(
+        self,
+        filepath: str,
+        source: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        file_hash: Optional[str] = None
+    ) -> List[Document]:
+        """
+        Load the pages of a single PDF file.
+        
+        Args:
+            filepath: PDF file to read
+            source: Value for each page's "source" metadata (defaults to
+                filepath; e.g. the uploaded name of a content-addressed file)
+            metadata: Extra metadata added to every page
+            file_hash: SHA-256 of the file if already known (saves hashing
+                it again for the page cache)
+        
+        Returns:
+            One document per page
+        """
+        logger.info(f"Loading PDF: {filepath}")
+        documents = self._parse(filepath, source or filepath, file_hash)
+        for document in documents:
+            document.metadata.update(metadata or {})
+        INGESTED.inc(len(documents), kind="pages")
+        logger.info(f"Loaded {len(documents)} pages from PDF")
+        return documents
+    
+    def _parse(self, path: str, source: str, file_hash: Optional[str] = None) -> List[Document]:
+        """
+        Pages of a PDF, from the page cache when these bytes were parsed before.
+        
+        Args:
+            path: PDF file to read
+            source: Value for each page's "source" metadata
+            file_hash: SHA-256 of the file (computed if needed and not given)
+        
+        Returns:
+            One document per page
+        """
+        if self.page_cache is not None:
+            file_hash = file_hash or file_content_hash(path)
+            cached = self.page_cache.get(file_hash, source)
+            record_cache("pages", cached is not None)
+            if cached is not None:
+                return cached
+        # The parser PyPDFLoader uses, reading the file as it goes
+        with timed("pdf_parse"):
+            blob = Blob.from_path(path, metadata={"source": source})
+            documents = list(PyPDFParser().lazy_parse(blob))
+        if self.page_cache is not None:
+            self.page_cache.put(file_hash, documents)
+        return documents
+    
+    @profiled("split_documents")
     def split_documents(self, documents: List[Document]) -> List[Document]:
         """Split documents into chunks"""
         logger.info("Splitting documents into chunks")
-        chunks = self.text_splitter.split_documents(documents)
+        with timed("split"):
+            chunks = self.text_splitter.split_documents(documents)
         logger.info(f"Created {len(chunks)} chunks")
         return chunks
     
@@ -53,6 +140,8 @@ class RAGPipeline:
         # Calculate chunk IDs
         chunks_with_ids = self._calculate_chunk_ids(chunks)
         logger.info(f"Calculated IDs for {len(chunks_with_ids)} chunks")
+        # Tag every chunk with its section (whole files, so IDs are stable)
+        summaries = assign_sections(chunks_with_ids)
         
         # Get existing documents
         existing_count = self.vector_store.get_document_count()
@@ -75,6 +164,12 @@ class RAGPipeline:
             logger.info(f"Adding {len(new_chunks)} chunks with IDs: {new_chunk_ids[:3]}...")
             
             self.vector_store.add_documents(new_chunks, ids=new_chunk_ids)
+            INGESTED.inc(len(new_chunks), kind="chunks")
+            if self.build_sections:
+                new_sources = {chunk.metadata.get("source", "unknown") for chunk in new_chunks}
+                self.vector_store.add_sections([
+                    summary for summary in summaries if summary.metadata["source"] in new_sources
+                ])
             
             # Verify they were added
             final_count = self.vector_store.get_document_count()
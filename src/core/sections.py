@@ -0,0 +1,109 @@
+"""
+Section detection for hierarchical retrieval
+
+Chunks of each document are grouped into sections at detected headings
+("Section 420.", "CHAPTER XVII", "12A. Title ..."), or into fixed-size runs
+when a document has none. Each document and each section gets a short
+summary (titles, headings and its opening text) for the upper-level index.
+"""
+
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+from langchain_core.documents import Document
+
+HEADING_PATTERNS = [
+    re.compile(r"^\s*(?i:chapter|part|section|sec\.|article|schedule)\s+(?:\d+[A-Z]?|[IVXLC]+)\b[^\n]*", re.M),
+    re.compile(r"^\s*\d+[A-Z]?\.\s+[A-Z][^\n]*", re.M),
+]
+TITLE_LENGTH = 100
+SUMMARY_LENGTH = 1000
+MAX_DOCUMENT_TITLES = 30
+
+
+def find_heading(text: str) -> Optional[str]:
+    """
+    First heading in `text`, cut to its first sentence.
+
+    Args:
+        text: Chunk text
+
+    Returns:
+        Heading title, or None if the chunk has no heading
+    """
+    matches = [match for pattern in HEADING_PATTERNS for match in [pattern.search(text)] if match]
+    if not matches:
+        return None
+    heading = min(matches, key=lambda match: match.start()).group(0).strip()
+    # "Section 60. Punishment for theft. Whoever ..." -> "Section 60. Punishment for theft."
+    sentences = re.split(r"(?<=[a-z]{4}\.)\s", heading, maxsplit=1)
+    return sentences[0][:TITLE_LENGTH]
+
+
+def _opening(chunks: List[Document]) -> str:
+    """Text of the first chunks, up to SUMMARY_LENGTH (a heading is often a chunk of its own)"""
+    text = ""
+    for chunk in chunks:
+        if len(text) >= SUMMARY_LENGTH:
+            break
+        text += chunk.page_content + "\n"
+    return text[:SUMMARY_LENGTH]
+
+
+def assign_sections(chunks: List[Document], max_chunks: int = 20) -> List[Document]:
+    """
+    Tag chunks with metadata["section"] and build the upper-level entries.
+
+    Chunks must be in document order. A section starts at every chunk
+    containing a heading, and after `max_chunks` chunks without one.
+    Section IDs derive from chunk IDs (metadata["id"]) when present.
+
+    Args:
+        chunks: Chunks of one or more documents (with metadata["source"])
+        max_chunks: Longest run of chunks in one section
+
+    Returns:
+        One summary Document per document and per section, with metadata
+        "level" ("document" or "section"), "source", "section" and "title"
+        (plus "chunks", the newline-separated chunk IDs, for sections)
+    """
+    documents: Dict[str, List[Dict[str, Any]]] = {}
+    current: Dict[str, Dict[str, Any]] = {}
+    for chunk in chunks:
+        source = chunk.metadata.get("source", "unknown")
+        sections = documents.setdefault(source, [])
+        heading = find_heading(chunk.page_content)
+        section = current.get(source)
+        if section is None or heading or len(section["chunks"]) >= max_chunks:
+            page = chunk.metadata.get("page")
+            section = {
+                # Named after the first chunk's ID so re-ingesting part of a file
+                # can't give a different section the same ID
+                "id": f"{chunk.metadata.get('id') or f'{source}:{len(sections)}'}#section",
+                "title": heading or (f"Page {page + 1}" if isinstance(page, int) else f"Part {len(sections) + 1}"),
+                "chunks": [],
+            }
+            sections.append(section)
+            current[source] = section
+        section["chunks"].append(chunk)
+        chunk.metadata["section"] = section["id"]
+
+    entries = []
+    for source, sections in documents.items():
+        name = os.path.splitext(os.path.basename(source))[0].replace("_", " ")
+        titles = "; ".join(section["title"] for section in sections[:MAX_DOCUMENT_TITLES])
+        entries.append(Document(
+            page_content=f"{name}\n{titles}\n{_opening(sections[0]['chunks'])}"[:SUMMARY_LENGTH],
+            metadata={"level": "document", "source": source, "section": f"{source}#doc", "title": name},
+        ))
+        for section in sections:
+            entries.append(Document(
+                page_content=f"{name}: {section['title']}\n{_opening(section['chunks'])}"[:SUMMARY_LENGTH],
+                metadata={
+                    "level": "section", "source": source, "section": section["id"], "title": section["title"],
+                    # Lets a search fetch the section's chunks by ID rather than by filter
+                    "chunks": "\n".join(chunk.metadata.get("id", "") for chunk in section["chunks"]),
+                },
+            ))
+    return entries
@@ -2,7 +2,19 @@
 Database and vector store modules for Project Lexora
 """
 
-from .vector_store import VectorStore
-from .chroma_manager import ChromaManager
+import importlib
 
-__all__ = ["VectorStore", "ChromaManager"]
+# Re-exports are resolved on first access so importing a light submodule
+# doesn't pull in Chroma
+_EXPORTS = {
+    "VectorStore": ".vector_store",
+    "ChromaManager": ".chroma_manager",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
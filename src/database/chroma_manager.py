@@ -4,32 +4,175 @@ Chroma vector database manager
 
 import os
 import shutil
-from typing import List, Tuple, Any
+import threading
+import time
+import numpy as np
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 from langchain_chroma import Chroma
+from langchain_core.documents import Document
 from src.database.vector_store import VectorStore
-from src.models import get_embedding_function
-from src.utils import get_logger
+from src.models import describe_embeddings, get_embedding_function
+from src.models.reduction import PROJECTION_FILE, ReducedEmbeddings, sample_key
+from src.utils import get_logger, load_config
+from src.utils.memory import MEMORY_BUDGET, MemoryBudget, approximate_size
+from src.utils.metrics import timed
+
+try:
+    import fcntl
+except ImportError:  # Windows: writes are only serialized within a process
+    fcntl = None
 
 logger = get_logger(__name__)
 
+# Coordination files kept inside the store directory (shared by every
+# process using it, and preserved by delete_all)
+CORPUS_VERSION_FILE = "corpus_version"
+WRITE_LOCK_FILE = "write.lock"
+
+# Question log and precomputed answers (src/core/answers.py); delete_all
+# keeps the log but drops the answers along with the corpus
+QUERY_LOG_FILE = "query_log.db"
+ANSWER_STORE_FILE = "answers.db"
+
+# Upper-level index of document and section summaries (hierarchical retrieval)
+SECTION_COLLECTION = "lexora_sections"
+
+# HNSW settings fixed when the collection is created; ef_search can change later
+HNSW_BUILD_SETTINGS = ("space", "ef_construction", "max_neighbors")
+
+
+class ReadOnlyStoreError(PermissionError):
+    """Raised when writing through a store opened read-only"""
+
+
+class EmbeddingMismatchError(ValueError):
+    """Raised when a store's vectors came from a different embedding model"""
+
+
+# Chroma systems (one per directory, shared by every client in the process)
+# -> ChromaManagers whose handle uses it; the last to let go stops it
+_system_holds: Dict[int, int] = {}
+_system_holds_lock = threading.Lock()
+
+
+def _hold_system(system: Any) -> None:
+    with _system_holds_lock:
+        _system_holds[id(system)] = _system_holds.get(id(system), 0) + 1
+
+
+def _release_system(system: Any) -> None:
+    """Let go of a Chroma system, stopping it (files, index) if nothing else uses it"""
+    with _system_holds_lock:
+        holds = _system_holds.get(id(system), 0) - 1
+        if holds > 0:
+            _system_holds[id(system)] = holds
+            return
+        _system_holds.pop(id(system), None)
+    try:
+        system.stop()
+    except Exception as e:
+        logger.warning(f"Could not stop Chroma system: {e}")
+
+
+def _nearest(vectors: Any, query: Any, n: int) -> List[int]:
+    """Rows of `vectors` closest to `query` (squared L2), nearest first"""
+    if not len(vectors):
+        return []
+    distances = np.einsum("ij,ij->i", vectors, vectors) - 2.0 * (vectors @ query)
+    n = min(n, len(distances))
+    top = np.argpartition(distances, n - 1)[:n]
+    return top[np.argsort(distances[top])].tolist()
+
 
 class ChromaManager(VectorStore):
     """Manages Chroma vector database operations"""
     
-    def __init__(self, persist_directory: str = "chroma_db"):
+    def __init__(
+        self,
+        persist_directory: str = "chroma_db",
+        embedding_function: Any = None,
+        read_only: Optional[bool] = None,
+        poll_interval: Optional[float] = None,
+        reduction: Optional[str] = None,
+        reduced_dimensions: Optional[int] = None,
+        hnsw: Optional[Dict[str, Any]] = None,
+        budget: Optional[MemoryBudget] = None
+    ):
         """
         Initialize Chroma manager.
         
         Args:
             persist_directory: Path to persist the database
+            embedding_function: Embeddings to use (defaults to get_embedding_function())
+            read_only: Reject writes (defaults to STORE_MODE=readonly)
+            poll_interval: Seconds between checks for writes by other
+                processes (defaults to STORE_POLL_INTERVAL)
+            reduction: "none", "truncate" or "pca" (defaults to EMBEDDING_REDUCTION)
+            reduced_dimensions: Stored vector width when reducing
+                (defaults to EMBEDDING_REDUCED_DIMENSIONS)
+            hnsw: Index settings (space, ef_construction, max_neighbors,
+                ef_search) for a new collection (defaults to the HNSW_* settings)
+            budget: Memory budget the loaded index and section summaries are
+                charged to (defaults to MEMORY_BUDGET_MB's); evicting the
+                index unloads it until the next search
         """
+        config = load_config()
         self.persist_directory = persist_directory
-        self.embedding_function = get_embedding_function()
-        self.db = Chroma(
-            persist_directory=persist_directory,
-            embedding_function=self.embedding_function
-        )
-        logger.info(f"Initialized Chroma at {persist_directory}")
+        self.embedding_function = embedding_function or get_embedding_function()
+        self.read_only = config['store_mode'] == 'readonly' if read_only is None else read_only
+        self.poll_interval = config['store_poll_interval'] if poll_interval is None else poll_interval
+        if hnsw is None:
+            hnsw = {
+                'space': config['hnsw_space'],
+                'ef_construction': config['hnsw_ef_construction'],
+                'max_neighbors': config['hnsw_max_neighbors'],
+                'ef_search': config['hnsw_ef_search'],
+            }
+        self.hnsw = dict(hnsw)
+        os.makedirs(persist_directory, exist_ok=True)
+        reduction = config['embedding_reduction'] if reduction is None else reduction
+        if reduction != 'none':
+            # Documents and queries go through the same projection; a PCA
+            # fit is stored with the index and made under the write lock
+            self.embedding_function = ReducedEmbeddings(
+                self.embedding_function,
+                reduction,
+                reduced_dimensions or config['embedding_reduced_dimensions'],
+                path=os.path.join(persist_directory, PROJECTION_FILE),
+                fit_lock=self._writing,
+                sample_size=config['embedding_reduction_sample'],
+                min_sample=config['embedding_reduction_min_sample'],
+                on_refit=self._reproject
+            )
+        # Bumped on every write (by any process) so caches can key on the
+        # corpus state; persisted so other processes can notice the change
+        self._version_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        # Chroma system behind self.db; replaced ones are stopped once no
+        # search of this process is still using them
+        self._system = None
+        self._retired: List[Any] = []
+        self._readers = 0
+        self._readers_lock = threading.Lock()
+        self._version = self._read_version_file()
+        self._next_poll = time.monotonic() + self.poll_interval
+        # Section index handle and its in-memory copy (hierarchical retrieval)
+        self._sections_client = None
+        self._sections = None
+        self._summary_cache = None
+        # Estimated size of the loaded index: (version, db, bytes)
+        self._index_size = None
+        # Chunk count: (version, db, count)
+        self._document_count = None
+        budget = budget if budget is not None else MEMORY_BUDGET
+        self._index_memory = budget.account("index", self._unload_index)
+        self._summary_memory = budget.account("sections", self._drop_summaries)
+        self.db = self._open_db()
+        self._check_embedding_identity()
+        self._apply_index_settings()
+        mode = "read-only" if self.read_only else "read-write"
+        logger.info(f"Initialized Chroma at {persist_directory} ({mode}, version {self._version})")
     
     def add_documents(self, documents: List[Any], ids: List[str]) -> None:
         """
@@ -39,7 +182,14 @@ class ChromaManager(VectorStore):
             documents: List of documents to add
             ids: Unique IDs for each document
         """
-        self.db.add_documents(documents, ids=ids)
+        texts = [doc.page_content for doc in documents]
+        metadatas = [doc.metadata or None for doc in documents]
+        
+        # Embed and write separately so each stage is timed on its own
+        with timed("embed"):
+            embeddings = self.embedding_function.embed_documents(texts)
+        
+        self.add_embeddings(ids, embeddings, texts, metadatas)
         
         # Ensure documents are persisted
         try:
@@ -53,6 +203,391 @@ class ChromaManager(VectorStore):
         count = self.get_document_count()
         logger.info(f"Added {len(documents)} documents to Chroma (total now: {count})")
     
+    def add_embeddings(
+        self,
+        ids: List[str],
+        embeddings: Any,
+        texts: List[str],
+        metadatas: List[Any]
+    ) -> None:
+        """
+        Write precomputed embeddings in the largest batches Chroma accepts.
+        
+        Args:
+            ids: Unique IDs
+            embeddings: One vector per ID (list of lists or 2-D array)
+            texts: Document text per ID
+            metadatas: Metadata dict (or None) per ID
+        """
+        with self._writing(), timed("store_write"):
+            if len(ids):
+                self._record_embedding_identity(len(embeddings[0]))
+            batch_size = self.db._client.get_max_batch_size()
+            for start in range(0, len(ids), batch_size):
+                end = start + batch_size
+                self.db._collection.upsert(
+                    ids=ids[start:end],
+                    embeddings=embeddings[start:end],
+                    documents=texts[start:end],
+                    metadatas=metadatas[start:end],
+                )
+            self._bump_version()
+        self._charge_memory()
+    
+    def _open_db(self) -> Chroma:
+        """LangChain handle on the chunk collection, created with self.hnsw if new"""
+        from chromadb.api.client import SharedSystemClient
+        
+        db = Chroma(
+            persist_directory=self.persist_directory,
+            embedding_function=self.embedding_function,
+            collection_configuration={'hnsw': self.hnsw}
+        )
+        system = SharedSystemClient._identifier_to_system.get(self.persist_directory)
+        if system is not self._system:
+            if system is not None:
+                _hold_system(system)
+            if self._system is not None:
+                self._retire(self._system)
+            self._system = system
+        return db
+    
+    def _retire(self, system: Any) -> None:
+        """Release a replaced Chroma system now, or when the searches using it finish"""
+        with self._readers_lock:
+            if self._readers:
+                self._retired.append(system)
+                return
+        _release_system(system)
+    
+    @contextmanager
+    def _in_use(self) -> Iterator[None]:
+        """Keep the current Chroma system from being stopped while it is read"""
+        with self._readers_lock:
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._readers_lock:
+                self._readers -= 1
+                retired = self._retired if not self._readers else []
+                if retired:
+                    self._retired = []
+            for system in retired:
+                _release_system(system)
+    
+    def index_configuration(self) -> Dict[str, Any]:
+        """HNSW settings stored with the chunk collection"""
+        configuration = getattr(self.db._collection, 'configuration', None) or {}
+        hnsw = configuration.get('hnsw') or {}
+        return {key: hnsw.get(key) for key in HNSW_BUILD_SETTINGS + ('ef_search',)}
+    
+    def _apply_index_settings(self) -> None:
+        """
+        Bring an existing collection's search width in line with self.hnsw.
+        
+        Build settings can't change without re-ingesting, so a mismatch is
+        only logged; ef_search is updated in the stored configuration (which
+        Chroma applies when it loads the index, hence the reopen).
+        """
+        stored = self.index_configuration()
+        for key in HNSW_BUILD_SETTINGS:
+            wanted = self.hnsw.get(key)
+            if wanted is not None and stored.get(key) is not None and stored[key] != wanted:
+                logger.warning(
+                    f"Store at {self.persist_directory} was built with HNSW {key}={stored[key]}, "
+                    f"not {wanted}; rebuild it (populate_database.py --reset) to change it"
+                )
+        wanted = self.hnsw.get('ef_search')
+        if wanted is None or stored.get('ef_search') in (None, wanted):
+            return
+        if self.read_only:
+            logger.warning(f"Read-only store keeps HNSW ef_search={stored['ef_search']} (configured {wanted})")
+            return
+        with self._file_lock():
+            self.db._collection.modify(configuration={'hnsw': {'ef_search': wanted}})
+            self._drop_cached_client()
+            self.db = self._open_db()
+        logger.info(f"Changed HNSW ef_search {stored['ef_search']} -> {wanted}")
+    
+    def _check_embedding_identity(self) -> None:
+        """
+        Refuse to open a store built with a different embedding model.
+        
+        Raises:
+            EmbeddingMismatchError: If the recorded model or dimensions differ
+        """
+        stored = self.db._collection.metadata or {}
+        current = describe_embeddings(self.embedding_function)
+        if stored.get("embedding_model") and stored["embedding_model"] != current["model"]:
+            raise EmbeddingMismatchError(
+                f"Store at {self.persist_directory} was built with {stored['embedding_model']!r} "
+                f"embeddings, but {current['model']!r} is configured; re-ingest or switch back"
+            )
+        if stored.get("embedding_dimensions") and current["dimensions"] \
+                and stored["embedding_dimensions"] != current["dimensions"]:
+            raise EmbeddingMismatchError(
+                f"Store at {self.persist_directory} holds {stored['embedding_dimensions']}-dimensional "
+                f"vectors, but the configured embeddings produce {current['dimensions']}"
+            )
+    
+    def _record_embedding_identity(self, dimensions: int) -> None:
+        """
+        Record the embedding model and width on the first write, and check
+        later writes against them (call while holding _writing).
+        
+        Args:
+            dimensions: Width of the vectors being written
+        
+        Raises:
+            EmbeddingMismatchError: If the vectors don't match the store
+        """
+        collection = self.db._collection
+        stored = collection.metadata or {}
+        recorded = stored.get("embedding_dimensions")
+        if recorded and recorded != dimensions:
+            raise EmbeddingMismatchError(
+                f"Cannot write {dimensions}-dimensional vectors to a store of {recorded}-dimensional ones"
+            )
+        if recorded and stored.get("embedding_model"):
+            return
+        model = describe_embeddings(self.embedding_function)["model"]
+        collection.modify(metadata={**stored, "embedding_model": model, "embedding_dimensions": dimensions})
+        logger.info(f"Recorded embedding identity for {self.persist_directory}: {model}, {dimensions} dimensions")
+    
+    def embedding_identity(self) -> Dict[str, Any]:
+        """Embedding model and dimensions recorded in the store (empty before the first write)"""
+        stored = self.db._collection.metadata or {}
+        return {key: stored[key] for key in ("embedding_model", "embedding_dimensions") if key in stored}
+    
+    @property
+    def corpus_version(self) -> int:
+        """
+        Counter identifying the current contents of the store.
+        
+        At most every poll_interval seconds this checks whether another
+        process has written, and if so reopens the store so searches see it.
+        """
+        now = time.monotonic()
+        if now >= self._next_poll:
+            self._next_poll = now + self.poll_interval
+            persisted = self._read_version_file()
+            if persisted != self._version:
+                self._reopen(persisted)
+        return self._version
+    
+    def _version_path(self) -> str:
+        return os.path.join(self.persist_directory, CORPUS_VERSION_FILE)
+    
+    def _read_version_file(self) -> int:
+        try:
+            with open(self._version_path()) as f:
+                return int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+    
+    def _bump_version(self) -> None:
+        """Advance the version and publish it (call while holding _writing)"""
+        with self._version_lock:
+            self._version = max(self._version, self._read_version_file()) + 1
+            temp_path = f"{self._version_path()}.{os.getpid()}.tmp"
+            with open(temp_path, "w") as f:
+                f.write(str(self._version))
+            os.replace(temp_path, self._version_path())
+    
+    def _reopen(self, version: int, locked: bool = False) -> None:
+        """
+        Open a fresh client so the in-memory index includes other processes' writes.
+        
+        Args:
+            version: Persisted version being caught up to
+            locked: Caller already holds the store's file lock
+        """
+        with self._version_lock:
+            if version == self._version:
+                return
+            # Load the new index while no writer is mid-write (Chroma reads
+            # the HNSW files lazily on the first query)
+            with self._file_lock(shared=True) if not locked else nullcontext():
+                self._drop_cached_client()
+                db = self._open_db()
+                sample = db._collection.get(limit=1, include=["embeddings"])
+                if sample["ids"]:
+                    db._collection.query(query_embeddings=[sample["embeddings"][0]], n_results=1)
+                version = self._read_version_file()
+                if isinstance(self.embedding_function, ReducedEmbeddings):
+                    self.embedding_function.reload()
+            self.db = db
+            logger.info(f"Corpus changed by another process ({self._version} -> {version}), reopened store")
+            self._version = version
+    
+    @contextmanager
+    def _file_lock(self, shared: bool = False) -> Iterator[None]:
+        """Cross-process lock on the store directory (exclusive for writers)"""
+        with open(os.path.join(self.persist_directory, WRITE_LOCK_FILE), "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            yield
+    
+    def _drop_cached_client(self) -> None:
+        """
+        Forget Chroma's per-path shared system so the next client reloads
+        from disk, and stop the old one (its files and loaded index) once
+        nothing uses it.
+        """
+        from chromadb.api.client import SharedSystemClient
+        
+        SharedSystemClient._identifier_to_system.pop(self.persist_directory, None)
+        SharedSystemClient._identifier_to_refcount.pop(self.persist_directory, None)
+        system, self._system = self._system, None
+        if system is not None:
+            self._retire(system)
+    
+    def _charge_memory(self) -> None:
+        """
+        Charge the loaded index (and section summaries, if loaded) to the
+        memory budget, marking them as just used.
+        
+        Called after searches and writes, outside the store's locks, since
+        charging may evict other entries, including this store's own.
+        """
+        db = self.db
+        cached = self._index_size
+        if cached is None or cached[0] != self._version or cached[1] is not db:
+            with self._in_use():
+                count = db._collection.count()
+            dimensions = self.embedding_identity().get("embedding_dimensions") or 0
+            neighbors = self.index_configuration().get("max_neighbors") or 16
+            # float32 vector, 2*M level-0 links and ID maps per element, doubled
+            # for the spare capacity Chroma's index grows into (as measured)
+            cached = (self._version, db, count * (dimensions * 4 + neighbors * 8 + 128) * 2)
+            self._index_size = cached
+        self._index_memory.charge(self.persist_directory, cached[2])
+        summaries = self._summary_cache
+        if summaries is not None:
+            self._summary_memory.charge(self.persist_directory, summaries[3])
+    
+    def _unload_index(self, _key: str) -> None:
+        """
+        Free the loaded index (memory budget eviction).
+        
+        The client is reopened, and Chroma loads the index again on the next
+        search. Skipped while this process is writing; the write charges the
+        index again when it finishes.
+        """
+        if not self._write_lock.acquire(blocking=False):
+            return
+        try:
+            with self._version_lock:
+                self._drop_cached_client()
+                self.db = self._open_db()
+                self._sections = self._sections_client = None
+                self._summary_cache = None
+                self._index_size = None
+        finally:
+            self._write_lock.release()
+        self._summary_memory.release(self.persist_directory)
+        logger.info(f"Unloaded index of {self.persist_directory} to stay within the memory budget")
+    
+    def _drop_summaries(self, _key: str) -> None:
+        """Free the in-memory section summaries (memory budget eviction)"""
+        self._summary_cache = None
+    
+    def _store_entries(self) -> List[str]:
+        """Paths of Chroma's files in the store directory"""
+        if not os.path.isdir(self.persist_directory):
+            return []
+        # The query log outlives corpus changes (SQLite adds -wal/-shm files)
+        keep = (CORPUS_VERSION_FILE, WRITE_LOCK_FILE, QUERY_LOG_FILE)
+        return [
+            os.path.join(self.persist_directory, name)
+            for name in os.listdir(self.persist_directory)
+            if not name.startswith(keep)
+        ]
+    
+    @contextmanager
+    def _reading(self) -> Iterator[None]:
+        """
+        Keep other processes from writing during a search, catching up with
+        their earlier writes first.
+        """
+        if self._write_lock.locked():
+            # This process is writing; Chroma handles in-process concurrency
+            with self._in_use():
+                yield
+            return
+        with self._in_use(), self._file_lock(shared=True):
+            persisted = self._read_version_file()
+            if persisted != self._version:
+                self._reopen(persisted, locked=True)
+            yield
+    
+    @contextmanager
+    def _writing(self) -> Iterator[None]:
+        """
+        Serialize writes across threads and processes sharing the directory.
+        
+        Raises:
+            ReadOnlyStoreError: If the store was opened read-only
+        """
+        if self.read_only:
+            raise ReadOnlyStoreError(f"Store at {self.persist_directory} is read-only")
+        with self._write_lock, self._file_lock():
+            # Catch up with other writers before changing the index
+            persisted = self._read_version_file()
+            if persisted != self._version:
+                self._reopen(persisted, locked=True)
+            yield
+    
+    @contextmanager
+    def paused_writes(self) -> Iterator[int]:
+        """
+        Keep writers in every thread and process out for the duration of a
+        read made of several calls (e.g. a paged export).
+        
+        Yields:
+            The corpus version being read
+        """
+        with self._write_lock, self._file_lock(shared=True):
+            persisted = self._read_version_file()
+            if persisted != self._version:
+                self._reopen(persisted, locked=True)
+            yield self._version
+    
+    def delete_documents(self, ids: List[str]) -> None:
+        """
+        Delete documents by ID.
+        
+        Args:
+            ids: IDs of the documents to delete
+        """
+        with self._writing():
+            deleted = self.db.get(ids=ids, include=["metadatas"])
+            sources = {metadata.get("source") for metadata in deleted["metadatas"] if metadata}
+            self.db.delete(ids=ids)
+            # Drop summaries of documents that no longer have any chunks
+            for source in sources:
+                if not self.db.get(where={"source": source}, limit=1, include=[])["ids"]:
+                    self.sections.delete(where={"source": source})
+            self._bump_version()
+        self._charge_memory()
+    
+    def delete_source(self, source: str) -> int:
+        """
+        Delete every chunk (and summary) of one source document.
+        
+        Args:
+            source: The chunks' "source" metadata
+        
+        Returns:
+            Number of chunks deleted
+        """
+        with self._in_use():
+            ids = self.db.get(where={"source": source}, include=[])["ids"]
+        if ids:
+            self.delete_documents(ids)
+        return len(ids)
+    
     def similarity_search(self, query: str, k: int = 5) -> List[Tuple[Any, float]]:
         """
         Search for similar documents.
@@ -64,13 +599,331 @@ class ChromaManager(VectorStore):
         Returns:
             List of (document, score) tuples
         """
-        results = self.db.similarity_search_with_score(query, k=k)
+        with timed("query_embed"):
+            embedding = self.embedding_function.embed_query(query)
+        
+        with self._reading(), timed("search"):
+            results = self.db.similarity_search_by_vector_with_relevance_scores(embedding, k=k)
+        self._charge_memory()
         logger.info(f"Found {len(results)} similar documents for query")
         return results
     
+    @property
+    def sections(self) -> Any:
+        """Chroma collection holding the document/section summaries"""
+        client = self.db._client
+        if self._sections_client is not client:
+            self._sections = client.get_or_create_collection(SECTION_COLLECTION, embedding_function=None)
+            self._sections_client = client
+        return self._sections
+    
+    def add_sections(self, documents: List[Any]) -> None:
+        """
+        Add or replace document/section summaries in the upper-level index.
+        
+        Args:
+            documents: Summaries from assign_sections() (IDs are their
+                metadata["section"], so re-ingesting a file replaces them)
+        """
+        if not documents:
+            return
+        texts = [doc.page_content for doc in documents]
+        embeddings = self._summary_embeddings(
+            texts, [doc.metadata for doc in documents], self.embedding_function.embed_documents
+        )
+        with self._writing(), timed("store_write"):
+            self.sections.upsert(
+                ids=[doc.metadata["section"] for doc in documents],
+                embeddings=embeddings,
+                documents=texts,
+                metadatas=[doc.metadata for doc in documents],
+            )
+            self._bump_version()
+        self._charge_memory()
+        logger.info(f"Indexed {len(documents)} document/section summaries")
+    
+    @staticmethod
+    def _summary_embeddings(
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+        embed: Callable[[List[str]], Any]
+    ) -> List[Any]:
+        """Vectors for summaries: sections are embedded, documents get the centroid of theirs"""
+        sections = [i for i, metadata in enumerate(metadatas) if metadata["level"] == "section"]
+        with timed("embed"):
+            section_embeddings = embed([texts[i] for i in sections])
+        # A document is represented by the centroid of its sections: a long
+        # statute's titles don't fit in one embedding input, and it saves a call
+        embeddings: List[Any] = [None] * len(texts)
+        by_source: Dict[str, List[Any]] = {}
+        for i, embedding in zip(sections, section_embeddings):
+            embeddings[i] = list(embedding)
+            by_source.setdefault(metadatas[i]["source"], []).append(embedding)
+        for i, metadata in enumerate(metadatas):
+            if embeddings[i] is None:
+                centroid = np.mean(by_source[metadata["source"]], axis=0)
+                embeddings[i] = (centroid / max(np.linalg.norm(centroid), 1e-12)).tolist()
+        return embeddings
+    
+    def _reproject(self, projection: Any, full_width: Dict[str, Any]) -> None:
+        """
+        Re-project every stored chunk and summary with a newly fitted PCA
+        projection, replacing the truncated vectors stored until the fit.
+        
+        Called by ReducedEmbeddings with the write lock held. The truncated
+        rows are the ones the fitting sample was collected from, so their
+        full-width vectors are projected rather than embedded again; only
+        texts missing from the sample (e.g. imported from a snapshot before
+        the fit) go back to the embedding model.
+        
+        Args:
+            projection: The fitted PCA projection
+            full_width: Full-width sample vectors by sample_key() of their text
+        """
+        base = self.embedding_function.base
+        reembedded = 0
+        
+        def embed(texts: List[str]) -> List[List[float]]:
+            nonlocal reembedded
+            if not texts:
+                return []
+            keys = [sample_key(text) for text in texts]
+            missing = list({key: text for key, text in zip(keys, texts) if key not in full_width}.items())
+            if missing:
+                reembedded += len(missing)
+                vectors = base.embed_documents([text for _, text in missing])
+                full_width.update((key, vector) for (key, _), vector in zip(missing, vectors))
+            return projection.apply(np.asarray([full_width[key] for key in keys], dtype=np.float32)).tolist()
+        
+        started = time.perf_counter()
+        batch_size = self.db._client.get_max_batch_size()
+        collections = [(self.db._collection, None), (self.sections, self._summary_embeddings)]
+        for collection, summaries in collections:
+            items = collection.get(include=["documents", "metadatas"])
+            if not items["ids"]:
+                continue
+            if summaries is None:
+                embeddings = embed(items["documents"])
+            else:
+                embeddings = summaries(items["documents"], items["metadatas"], embed)
+            for start in range(0, len(items["ids"]), batch_size):
+                end = start + batch_size
+                collection.update(ids=items["ids"][start:end], embeddings=embeddings[start:end])
+        self._bump_version()
+        message = (f"Re-projected {self.db._collection.count()} chunks with the fitted PCA projection "
+                   f"in {time.perf_counter() - started:.1f}s")
+        if reembedded:
+            logger.warning(f"{message} ({reembedded} texts were not in the fitting sample and were re-embedded)")
+        else:
+            logger.info(message)
+    
+    def add_section_embeddings(
+        self,
+        ids: List[str],
+        embeddings: Any,
+        texts: List[str],
+        metadatas: List[Any]
+    ) -> None:
+        """
+        Write precomputed summaries (e.g. from a snapshot) to the upper-level index.
+        
+        Args:
+            ids: Section IDs
+            embeddings: One vector per ID (list of lists or 2-D array)
+            texts: Summary text per ID
+            metadatas: Metadata dict per ID, as add_sections() writes it
+        """
+        with self._writing(), timed("store_write"):
+            batch_size = self.db._client.get_max_batch_size()
+            for start in range(0, len(ids), batch_size):
+                end = start + batch_size
+                self.sections.upsert(
+                    ids=ids[start:end],
+                    embeddings=embeddings[start:end],
+                    documents=texts[start:end],
+                    metadatas=metadatas[start:end],
+                )
+            self._bump_version()
+        self._charge_memory()
+    
+    def hierarchical_search(
+        self,
+        query: str,
+        k: int = 5,
+        documents: int = 2,
+        sections: int = 4
+    ) -> List[Tuple[Any, float]]:
+        """
+        Search the summaries first, then only the chunks of the best sections.
+        
+        Falls back to a flat search when the store has no section index
+        (built before hierarchical retrieval was enabled) or nothing matches.
+        
+        Args:
+            query: Query text
+            k: Number of chunks to return
+            documents: Documents to narrow down to
+            sections: Sections (within those documents) whose chunks are searched
+        
+        Returns:
+            List of (document, score) tuples
+        """
+        with timed("query_embed"):
+            embedding = self.embedding_function.embed_query(query)
+        
+        with self._reading(), timed("search"):
+            section_ids = self.select_sections(embedding, documents, sections)
+            chunk_ids = self._section_chunks(section_ids)
+            results = self._rank_chunks(embedding, chunk_ids, k) if chunk_ids else []
+            if not results:
+                results = self.db.similarity_search_by_vector_with_relevance_scores(embedding, k=k)
+        self._charge_memory()
+        logger.info(f"Found {len(results)} similar documents for query (hierarchical)")
+        return results
+    
+    def select_sections(self, embedding: List[float], documents: int = 2, sections: int = 4) -> List[str]:
+        """
+        Pick the sections whose chunks a hierarchical search looks at.
+        
+        Args:
+            embedding: Query vector
+            documents: Best-matching documents to consider (0 = all)
+            sections: Best-matching sections kept within those documents
+        
+        Returns:
+            Section IDs (empty if the store has no section index)
+        """
+        summaries = self._summaries()
+        if not summaries["sources"]:
+            return []
+        query = np.asarray(embedding, dtype=np.float32)
+        # Exact search: the summary index is small, and Chroma's filtered
+        # HNSW search misses too many candidates on it
+        top_documents = _nearest(summaries["documents"], query, documents or len(summaries["sources"]))
+        section_ids: List[str] = []
+        vectors = []
+        for i in top_documents:
+            ids, matrix = summaries["sections"].get(summaries["sources"][i], ([], None))
+            if not ids:
+                continue
+            section_ids.extend(ids)
+            vectors.append(matrix)
+        if not section_ids:
+            return []
+        return [section_ids[i] for i in _nearest(np.concatenate(vectors), query, sections)]
+    
+    def _section_chunks(self, section_ids: List[str]) -> List[str]:
+        """IDs of the chunks in the given sections"""
+        chunks = self._summaries()["chunks"]
+        return [chunk_id for section in section_ids for chunk_id in chunks.get(section, [])]
+    
+    def _rank_chunks(self, embedding: List[float], chunk_ids: List[str], k: int) -> List[Tuple[Any, float]]:
+        """
+        Exact nearest chunks among `chunk_ids`.
+        
+        Fetching a few hundred chunks by ID and ranking them here is much
+        faster than a metadata-filtered Chroma query. Scores use the
+        collection's distance, like similarity_search.
+        """
+        # Rank on vectors alone, then fetch text for the winners only
+        candidates = self.db._collection.get(ids=chunk_ids, include=["embeddings"])
+        if not candidates["ids"]:
+            return []
+        vectors = np.asarray(candidates["embeddings"], dtype=np.float32)
+        query = np.asarray(embedding, dtype=np.float32)
+        configuration = getattr(self.db._collection, 'configuration', None) or {}
+        space = (configuration.get('hnsw') or {}).get('space', 'l2')
+        if space == 'l2':
+            distances = ((vectors - query) ** 2).sum(axis=1)
+        elif space == 'cosine':
+            norms = np.linalg.norm(vectors, axis=1) * max(np.linalg.norm(query), 1e-12)
+            distances = 1.0 - (vectors @ query) / np.clip(norms, 1e-12, None)
+        else:
+            distances = 1.0 - vectors @ query
+        top = [candidates["ids"][i] for i in np.argsort(distances)[:k]]
+        scores = dict(zip(candidates["ids"], distances.tolist()))
+        items = self.db._collection.get(ids=top, include=["documents", "metadatas"])
+        found = {
+            chunk_id: Document(page_content=text or "", metadata=metadata or {}, id=chunk_id)
+            for chunk_id, text, metadata in zip(items["ids"], items["documents"], items["metadatas"])
+        }
+        return [(found[chunk_id], scores[chunk_id]) for chunk_id in top if chunk_id in found]
+    
+    def _summaries(self) -> Dict[str, Any]:
+        """
+        Section index contents grouped for search, reloaded when the corpus
+        version changes: document vectors, section vectors per document and
+        chunk IDs per section.
+        """
+        cached = self._summary_cache
+        if cached is None or cached[0] != self._version or cached[1] is not self.db:
+            items = self.sections.get(include=["embeddings", "metadatas"])
+            vectors = np.asarray(items["embeddings"], dtype=np.float32)
+            sources: List[str] = []
+            document_rows: List[int] = []
+            section_rows: Dict[str, List[int]] = {}
+            chunks: Dict[str, List[str]] = {}
+            for row, metadata in enumerate(items["metadatas"]):
+                if metadata.get("level") == "document":
+                    sources.append(metadata["source"])
+                    document_rows.append(row)
+                else:
+                    section_rows.setdefault(metadata["source"], []).append(row)
+                    chunks[metadata["section"]] = [cid for cid in metadata.get("chunks", "").split("\n") if cid]
+            summaries = {
+                "sources": sources,
+                "documents": vectors[document_rows],
+                "sections": {
+                    source: ([items["metadatas"][row]["section"] for row in rows], vectors[rows])
+                    for source, rows in section_rows.items()
+                },
+                "chunks": chunks,
+            }
+            cached = (self._version, self.db, summaries, approximate_size(summaries))
+            self._summary_cache = cached
+        return cached[2]
+    
+    def has_file_hash(self, file_hash: str) -> bool:
+        """
+        Check whether chunks of a file with this content hash are stored.
+        
+        Args:
+            file_hash: SHA-256 hex digest recorded in chunk metadata
+        
+        Returns:
+            True if at least one chunk carries the hash
+        """
+        with self._in_use():
+            found = self.db.get(where={"file_hash": file_hash}, limit=1, include=[])
+        return bool(found.get("ids"))
+    
+    def relevance(self, distance: float) -> float:
+        """
+        Convert a search distance to a cosine similarity.
+        
+        Assumes unit-length embeddings (as OpenAI returns), for which squared
+        L2 distance is 2 - 2*cos and cosine/ip distance is 1 - cos.
+        
+        Args:
+            distance: Score returned by similarity_search
+        
+        Returns:
+            Similarity, 1.0 for identical vectors and 0.0 for unrelated ones
+        """
+        configuration = getattr(self.db._collection, 'configuration', None) or {}
+        space = (configuration.get('hnsw') or {}).get('space', 'l2')
+        if space == 'l2':
+            return 1.0 - distance / 2.0
+        return 1.0 - distance
+    
     def delete_all(self) -> None:
         """Delete all documents and reset the database"""
-        import time
+        with self._writing():
+            self._delete_all()
+        self._charge_memory()
+    
+    def _delete_all(self) -> None:
+        """delete_all() body; the caller holds the write lock"""
         import gc
         
         logger.info("START delete_all()")
@@ -101,10 +954,17 @@ class ChromaManager(VectorStore):
         max_retries = 3
         
         logger.info(f"Attempting to delete {self.persist_directory}...")
-        while retry_count < max_retries and os.path.exists(self.persist_directory):
+        self._drop_cached_client()
+        while retry_count < max_retries and self._store_entries():
             try:
                 logger.info(f"Delete attempt {retry_count + 1}/{max_retries}...")
-                shutil.rmtree(self.persist_directory)
+                # Keep the version and lock files so other processes still
+                # see (and serialize on) them
+                for entry in self._store_entries():
+                    if os.path.isdir(entry):
+                        shutil.rmtree(entry)
+                    else:
+                        os.remove(entry)
                 logger.info(f"Successfully deleted {self.persist_directory}")
                 break
             except Exception as e:
@@ -126,18 +986,31 @@ class ChromaManager(VectorStore):
         
         logger.info(f"Directory exists after delete attempt: {os.path.exists(self.persist_directory)}")
         
+        # A new corpus gets a new PCA fit
+        if isinstance(self.embedding_function, ReducedEmbeddings):
+            self.embedding_function.reset()
+        
         # Recreate fresh database
         logger.info("Recreating fresh database...")
         gc.collect()
-        self.db = Chroma(
-            persist_directory=self.persist_directory,
-            embedding_function=self.embedding_function
-        )
+        self.db = self._open_db()
+        self._bump_version()
         logger.info(f"Fresh database created. Directory exists: {os.path.exists(self.persist_directory)}")
         logger.info(f"Document count in fresh DB: {self.get_document_count()}")
         logger.info("END delete_all()")
     
     def get_document_count(self) -> int:
-        """Get the number of documents in the database"""
-        items = self.db.get(include=[])
-        return len(items.get("ids", []))
+        """
+        Get the number of documents in the database.
+        
+        Counted by Chroma (not by fetching every ID) once per corpus version,
+        since only writes change it.
+        """
+        version = self.corpus_version
+        with self._in_use():
+            db = self.db
+            cached = self._document_count
+            if cached is None or cached[0] != version or cached[1] is not db:
+                cached = (version, db, db._collection.count())
+                self._document_count = cached
+        return cached[2]
@@ -0,0 +1,273 @@
+"""
+Snapshot export/import of a Chroma collection
+
+A snapshot is a directory with one file per column:
+
+    manifest.json     count, dimensions, embedding model, corpus version,
+                      sha256 per file
+    projection.npz    PCA projection, if the store reduces its vectors
+    vectors.f32       float32 vectors, row-major, little-endian
+    ids.jsonl         one JSON string per line
+    documents.jsonl   one JSON string per line
+    metadatas.jsonl   one JSON object (or null) per line
+    sections/         the same four files for the document/section
+                      summaries of hierarchical retrieval
+
+Rows line up across files. Importing writes the stored vectors directly, so
+no embedding calls are made.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from contextlib import ExitStack, closing
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from src.database.chroma_manager import ChromaManager
+from src.models import describe_embeddings
+from src.models.reduction import PROJECTION_FILE, ReducedEmbeddings
+from src.utils import get_logger
+
+logger = get_logger(__name__)
+
+FORMAT_VERSION = 2
+# Format 1 snapshots (no sections) can still be imported
+READABLE_FORMATS = (1, 2)
+MANIFEST = "manifest.json"
+VECTORS = "vectors.f32"
+COLUMNS = ("ids", "documents", "metadatas")
+SECTIONS = "sections"
+READ_BLOCK = 8 * 1024 * 1024
+
+
+class SnapshotError(Exception):
+    """Raised for corrupt, mismatched or incompatible snapshots"""
+
+
+class _HashingWriter:
+    """Binary file writer that hashes everything written to it"""
+
+    def __init__(self, path: str):
+        self.file = open(path, "wb")
+        self.sha256 = hashlib.sha256()
+
+    def write(self, data: bytes) -> None:
+        self.sha256.update(data)
+        self.file.write(data)
+
+    def close(self) -> str:
+        self.file.close()
+        return self.sha256.hexdigest()
+
+
+def _file_sha256(path: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(READ_BLOCK), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def _read_column(path: str) -> Iterator[Any]:
+    with open(path, "rb") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def _export_collection(
+    collection: Any, path: str, batch_size: int
+) -> Tuple[int, Optional[int], Dict[str, str]]:
+    """
+    Write one collection's records to vector and column files in `path`.
+
+    Returns:
+        (records, dimensions, sha256 per file name)
+    """
+    os.makedirs(path, exist_ok=True)
+    vectors = _HashingWriter(os.path.join(path, VECTORS))
+    columns = {name: _HashingWriter(os.path.join(path, f"{name}.jsonl")) for name in COLUMNS}
+    dimensions = None
+    exported = 0
+    for offset in range(0, collection.count(), batch_size):
+        batch = collection.get(
+            include=["embeddings", "documents", "metadatas"], limit=batch_size, offset=offset
+        )
+        embeddings = np.asarray(batch["embeddings"], dtype="<f4")
+        if embeddings.size:
+            dimensions = embeddings.shape[1]
+        vectors.write(embeddings.tobytes())
+        for name in COLUMNS:
+            lines = "".join(json.dumps(value, ensure_ascii=False) + "\n" for value in batch[name])
+            columns[name].write(lines.encode("utf-8"))
+        exported += len(batch["ids"])
+
+    checksums = {VECTORS: vectors.close()}
+    for name, writer in columns.items():
+        checksums[f"{name}.jsonl"] = writer.close()
+    return exported, dimensions, checksums
+
+
+def _import_collection(
+    write: Callable[[List[str], Any, List[str], List[Any]], None],
+    path: str,
+    count: int,
+    dimensions: Optional[int],
+    batch_size: int
+) -> int:
+    """
+    Pass the records in `path`'s vector and column files to `write` in batches.
+
+    Returns:
+        Number of records written
+    """
+    if count == 0:
+        # An empty vectors file can't be memory-mapped
+        return 0
+    vectors = np.memmap(os.path.join(path, VECTORS), dtype="<f4", mode="r",
+                        shape=(count, dimensions or 0))
+    imported = 0
+    with ExitStack() as stack:
+        # Closing the readers closes their files even if a write fails midway
+        columns = [
+            stack.enter_context(closing(_read_column(os.path.join(path, f"{name}.jsonl"))))
+            for name in COLUMNS
+        ]
+        while imported < count:
+            ids: List[str] = []
+            texts: List[str] = []
+            metadatas: List[Any] = []
+            for _ in range(min(batch_size, count - imported)):
+                record_id, text, metadata = (next(column) for column in columns)
+                ids.append(record_id)
+                texts.append(text)
+                metadatas.append(metadata or None)
+            write(ids, np.asarray(vectors[imported:imported + len(ids)]), texts, metadatas)
+            imported += len(ids)
+    return imported
+
+
+def export_snapshot(store: ChromaManager, path: str, batch_size: int = 5000) -> Dict[str, Any]:
+    """
+    Write every record of `store` to a snapshot directory.
+
+    Writers are held off until the export finishes, so the pages read from
+    Chroma all come from one corpus version.
+
+    Args:
+        store: Store to export
+        path: Snapshot directory (created if missing)
+        batch_size: Records read from Chroma per call
+
+    Returns:
+        The manifest that was written
+    """
+    with store.paused_writes() as corpus_version:
+        exported, dimensions, checksums = _export_collection(store.db._collection, path, batch_size)
+        sections, section_dimensions, section_checksums = _export_collection(
+            store.sections, os.path.join(path, SECTIONS), batch_size
+        )
+    for name, checksum in section_checksums.items():
+        checksums[f"{SECTIONS}/{name}"] = checksum
+    # Queries against the imported vectors must use the same projection
+    embeddings = store.embedding_function
+    if isinstance(embeddings, ReducedEmbeddings) and embeddings.path and os.path.exists(embeddings.path):
+        shutil.copyfile(embeddings.path, os.path.join(path, PROJECTION_FILE))
+        checksums[PROJECTION_FILE] = _file_sha256(os.path.join(path, PROJECTION_FILE))
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "count": exported,
+        "dimensions": dimensions,
+        "dtype": "float32",
+        "embedding_model": describe_embeddings(store.embedding_function)["model"],
+        "sections": {"count": sections, "dimensions": section_dimensions},
+        "corpus_version": corpus_version,
+        "created": time.time(),
+        "sha256": checksums,
+    }
+    with open(os.path.join(path, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+    logger.info(f"Exported {exported} records and {sections} summaries ({dimensions} dimensions, "
+                f"corpus version {corpus_version}) to {path}")
+    return manifest
+
+
+def read_manifest(path: str, verify: bool = True) -> Dict[str, Any]:
+    """
+    Load a snapshot's manifest, optionally checking every file's checksum.
+
+    Raises:
+        SnapshotError: If the manifest is missing/unsupported or a checksum differs
+    """
+    manifest_path = os.path.join(path, MANIFEST)
+    if not os.path.exists(manifest_path):
+        raise SnapshotError(f"No {MANIFEST} in {path}")
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") not in READABLE_FORMATS:
+        raise SnapshotError(f"Unsupported snapshot format {manifest.get('format_version')}")
+    if verify:
+        for name, expected in manifest["sha256"].items():
+            actual = _file_sha256(os.path.join(path, name))
+            if actual != expected:
+                raise SnapshotError(f"Checksum mismatch for {name}: {actual} != {expected}")
+    return manifest
+
+
+def import_snapshot(
+    store: ChromaManager,
+    path: str,
+    batch_size: int = 5000,
+    verify: bool = True,
+    allow_existing: bool = False
+) -> int:
+    """
+    Load a snapshot into `store` without calling the embedding provider.
+
+    The document/section summaries are imported too, so hierarchical
+    retrieval works on the destination without re-ingesting.
+
+    Args:
+        store: Destination store
+        path: Snapshot directory
+        batch_size: Records written per batch
+        verify: Check checksums before writing anything
+        allow_existing: Permit importing into a store that already has records
+
+    Returns:
+        Number of records (chunks) imported
+
+    Raises:
+        SnapshotError: On checksum failure, if the store isn't empty, or if
+            the snapshot was embedded with a different model than the store uses
+    """
+    manifest = read_manifest(path, verify=verify)
+    count, dimensions = manifest["count"], manifest["dimensions"]
+    model = describe_embeddings(store.embedding_function)["model"]
+    if manifest.get("embedding_model") and manifest["embedding_model"] != model:
+        raise SnapshotError(
+            f"Snapshot was embedded with {manifest['embedding_model']!r}, but the store uses {model!r}"
+        )
+    if not allow_existing and store.db._collection.count():
+        raise SnapshotError("Destination store is not empty (use allow_existing to merge)")
+
+    embeddings = store.embedding_function
+    if PROJECTION_FILE in manifest["sha256"] and isinstance(embeddings, ReducedEmbeddings):
+        if embeddings.projection is None:
+            temp_path = f"{embeddings.path}.{os.getpid()}.tmp"
+            shutil.copyfile(os.path.join(path, PROJECTION_FILE), temp_path)
+            os.replace(temp_path, embeddings.path)
+            embeddings.reload()
+        elif _file_sha256(embeddings.path) != manifest["sha256"][PROJECTION_FILE]:
+            raise SnapshotError("Snapshot vectors use a different PCA projection than the store")
+
+    imported = _import_collection(store.add_embeddings, path, count, dimensions, batch_size)
+    sections = manifest.get("sections") or {"count": 0, "dimensions": None}
+    summaries = _import_collection(store.add_section_embeddings, os.path.join(path, SECTIONS),
+                                   sections["count"], sections["dimensions"], batch_size)
+    logger.info(f"Imported {imported} records and {summaries} summaries from {path}")
+    return imported
@@ -2,7 +2,21 @@
 Model and embedding modules for Project Lexora
 """
 
-from .embedding_factory import get_embedding_function
-from .llm_factory import get_llm_model
+import importlib
 
-__all__ = ["get_embedding_function", "get_llm_model"]
+# Re-exports are resolved on first access so importing a light submodule
+# doesn't pull in langchain_openai
+_EXPORTS = {
+    "describe_embeddings": ".embedding_factory",
+    "get_embedding_function": ".embedding_factory",
+    "register_embedding_backend": ".embedding_factory",
+    "get_llm_model": ".llm_factory",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
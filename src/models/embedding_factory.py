@@ -2,16 +2,207 @@
 Embedding factory module for creating embedding functions
 """
 
-from langchain_openai import OpenAIEmbeddings
-from typing import Any
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from langchain_core.embeddings import Embeddings
+from typing import Any, Callable, Dict, List, Tuple
+from src.utils import get_logger, load_config
+from src.utils.metrics import EMBED_BATCH_SIZE
 
+logger = get_logger(__name__)
 
-def get_embedding_function() -> OpenAIEmbeddings:
+_embeddings = None
+_lock = threading.Lock()
+
+
+class BatchingEmbeddings(Embeddings):
     """
-    Get or create the embedding function using OpenAI.
+    Collects embed_query() calls from concurrent requests into one
+    embed_documents() call on the wrapped embeddings.
+    
+    A dispatcher thread takes the first waiting query, gathers more for up
+    to `max_wait_ms` or until `max_batch_size`, and sends the batch; each
+    caller gets its own vector back. The wrapped model must embed queries
+    and documents the same way (true for OpenAI-style embeddings).
+    """
+    
+    def __init__(
+        self,
+        base: Embeddings,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        max_concurrent_batches: int = 4
+    ):
+        """
+        Initialize the batcher.
+        
+        Args:
+            base: Embeddings to send batches to
+            max_batch_size: Most queries per embed_documents() call
+            max_wait_ms: How long to wait for more queries after the first
+            max_concurrent_batches: Batches allowed in flight at once
+        """
+        self.base = base
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrent_batches, thread_name_prefix='embed-batch'
+        )
+        self._dispatcher = None
+        self._start_lock = threading.Lock()
+    
+    def __getattr__(self, name: str) -> Any:
+        # Expose the wrapped model's settings (model name, dimensions, ...)
+        if name == 'base':
+            raise AttributeError(name)
+        return getattr(self.base, name)
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Document batches are already batched; pass straight through"""
+        return self.base.embed_documents(texts)
+    
+    def embed_query(self, text: str) -> List[float]:
+        """Embed one query as part of the next batch"""
+        self._ensure_dispatcher()
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future.result()
+    
+    def _ensure_dispatcher(self) -> None:
+        # Started lazily so it is created in each forked worker
+        if self._dispatcher is None or not self._dispatcher.is_alive():
+            with self._start_lock:
+                if self._dispatcher is None or not self._dispatcher.is_alive():
+                    self._dispatcher = threading.Thread(
+                        target=self._dispatch_loop, name='embed-batcher', daemon=True
+                    )
+                    self._dispatcher.start()
+    
+    def _dispatch_loop(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._executor.submit(self._run_batch, batch)
+    
+    def _run_batch(self, batch: List[Tuple[str, Future]]) -> None:
+        EMBED_BATCH_SIZE.observe(len(batch))
+        try:
+            vectors = self.base.embed_documents([text for text, _ in batch])
+        except BaseException as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), vector in zip(batch, vectors):
+            future.set_result(vector)
+
+
+def _openai_backend(config: Dict[str, Any]) -> Embeddings:
+    """Remote OpenAI-compatible embeddings API"""
+    from langchain_openai import OpenAIEmbeddings
+    
+    kwargs = {'model': config['embedding_model']} if config['embedding_model'] else {}
+    # Non-OpenAI providers (and local stand-ins) expect raw text, not tiktoken ids
+    return OpenAIEmbeddings(check_embedding_ctx_length=config['embedding_check_ctx_length'], **kwargs)
+
+
+def _local_backend(config: Dict[str, Any]) -> Embeddings:
+    """ONNX model on local CPU cores"""
+    from src.models.onnx_embeddings import OnnxEmbeddings
+    
+    if not config['embedding_model_path']:
+        raise ValueError("EMBEDDING_BACKEND=local needs EMBEDDING_MODEL_PATH")
+    return OnnxEmbeddings(
+        config['embedding_model_path'],
+        batch_size=config['embedding_batch_size'],
+        num_workers=config['embedding_workers']
+    )
+
+
+def _hash_backend(config: Dict[str, Any]) -> Embeddings:
+    """Deterministic hashing embedder for development and tests"""
+    from src.models.hash_embeddings import HashingEmbeddings
+    
+    return HashingEmbeddings(dimensions=config['embedding_dimensions'] or 256)
+
+
+# EMBEDDING_BACKEND name -> factory taking the loaded config
+EMBEDDING_BACKENDS: Dict[str, Callable[[Dict[str, Any]], Embeddings]] = {
+    'openai': _openai_backend,
+    'local': _local_backend,
+    'hash': _hash_backend,
+}
+
+
+def register_embedding_backend(name: str, factory: Callable[[Dict[str, Any]], Embeddings]) -> None:
+    """
+    Make an embedding backend selectable with EMBEDDING_BACKEND=<name>.
+    
+    Args:
+        name: Backend name
+        factory: Called with the config dict, returns an Embeddings instance
+    """
+    EMBEDDING_BACKENDS[name] = factory
+
+
+def describe_embeddings(embeddings: Embeddings) -> Dict[str, Any]:
+    """
+    Identify the model behind an embedding function.
+    
+    Args:
+        embeddings: Embedding function (wrappers are looked through)
     
     Returns:
-        OpenAIEmbeddings: Configured embedding function
+        Dict with "model" and "dimensions" (None when unknown until first use)
+    """
+    while isinstance(embeddings, BatchingEmbeddings):
+        embeddings = embeddings.base
+    model = getattr(embeddings, 'model', None) or type(embeddings).__name__
+    return {'model': str(model), 'dimensions': getattr(embeddings, 'dimensions', None)}
+
+
+def get_embedding_function() -> Embeddings:
+    """
+    Get or create the embedding function for EMBEDDING_BACKEND.
+    
+    The instance is created once per process and shared, so every store
+    handle reuses the same model or HTTP client. With
+    EMBED_BATCH_WINDOW_MS > 0, concurrent query embeddings are micro-batched.
+    
+    Returns:
+        Embeddings: Configured embedding function
+    
+    Raises:
+        ValueError: If EMBEDDING_BACKEND names no registered backend
     """
-    embeddings = OpenAIEmbeddings()
-    return embeddings
+    global _embeddings
+    with _lock:
+        if _embeddings is None:
+            config = load_config()
+            backend = config['embedding_backend']
+            if backend not in EMBEDDING_BACKENDS:
+                raise ValueError(
+                    f"Unknown EMBEDDING_BACKEND {backend!r} (available: {', '.join(EMBEDDING_BACKENDS)})"
+                )
+            embeddings = EMBEDDING_BACKENDS[backend](config)
+            logger.info(f"Using {backend} embeddings ({describe_embeddings(embeddings)['model']})")
+            if config['embed_batch_window_ms'] > 0:
+                embeddings = BatchingEmbeddings(
+                    embeddings,
+                    max_batch_size=config['embed_batch_max_size'],
+                    max_wait_ms=config['embed_batch_window_ms']
+                )
+                logger.info(
+                    f"Micro-batching query embeddings (window {config['embed_batch_window_ms']}ms, "
+                    f"max {config['embed_batch_max_size']})"
+                )
+            _embeddings = embeddings
+        return _embeddings
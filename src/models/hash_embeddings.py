@@ -0,0 +1,70 @@
+"""
+Deterministic hashing-trick embeddings for development and tests
+
+No model, no network: each word is hashed into one of `dimensions` buckets
+with a sign, so texts sharing words end up close together.
+"""
+
+import hashlib
+import math
+import re
+from typing import List, Union
+
+from langchain_core.embeddings import Embeddings
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def hash_embedding(text: Union[str, List[int]], dimensions: int = 64) -> List[float]:
+    """
+    Deterministic bag-of-words embedding using the hashing trick.
+
+    Texts that share words end up close together, which is enough for
+    retrieval to behave sensibly in tests.
+
+    Args:
+        text: Input text, or a list of token ids
+        dimensions: Vector width
+
+    Returns:
+        Unit-length vector
+    """
+    if isinstance(text, str):
+        tokens = TOKEN_PATTERN.findall(text.lower())
+    else:
+        tokens = [str(token) for token in text]
+
+    vector = [0.0] * dimensions
+    for token in tokens:
+        digest = hashlib.md5(token.encode("utf-8")).digest()
+        bucket = int.from_bytes(digest[:4], "little") % dimensions
+        vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+
+    norm = math.sqrt(sum(value * value for value in vector))
+    if norm == 0:
+        vector[0] = 1.0
+        return vector
+    return [value / norm for value in vector]
+
+
+class HashingEmbeddings(Embeddings):
+    """Embeddings backend built on hash_embedding()"""
+
+    def __init__(self, dimensions: int = 256):
+        """
+        Initialize the embedder.
+
+        Args:
+            dimensions: Vector width
+        """
+        self.dimensions = dimensions
+
+    @property
+    def model(self) -> str:
+        return "hash"
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [hash_embedding(text, self.dimensions) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return hash_embedding(text, self.dimensions)
@@ -4,32 +4,228 @@ LLM factory module for creating language models
 
 from langchain_openai import ChatOpenAI
 import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Tuple
+import httpx
 from dotenv import load_dotenv
+from src.utils import get_logger, load_config
+from src.utils.metrics import LLM_CALLS
 
 load_dotenv()
 
+logger = get_logger(__name__)
+
+# Process-wide registry: one pooled HTTP client and one ChatOpenAI per model
+_clients: Dict[Tuple[str, float, int], ChatOpenAI] = {}
+_http_client: Optional[httpx.Client] = None
+_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    """Raised when no model answered within the per-call deadline"""
+
+
+def _shared_http_client(config: Dict[str, Any]) -> httpx.Client:
+    """HTTP client whose keep-alive connection pool is shared by every model"""
+    global _http_client
+    if _http_client is None:
+        pool_size = config['llm_pool_size']
+        _http_client = httpx.Client(
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            timeout=httpx.Timeout(config['llm_timeout'], connect=5.0),
+        )
+    return _http_client
+
+
+def _shared_executor(config: Dict[str, Any]) -> ThreadPoolExecutor:
+    """Threads that run provider calls so the caller can enforce a deadline"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=config['llm_pool_size'] * 2, thread_name_prefix='llm'
+        )
+    return _executor
+
+
+def get_chat_client(
+    model_name: str,
+    temperature: float = 0.7,
+    max_tokens: int = 500
+) -> ChatOpenAI:
+    """
+    Get the process-wide ChatOpenAI client for a model, creating it once.
+
+    Args:
+        model_name: Model identifier
+        temperature: Creativity parameter (0-1)
+        max_tokens: Maximum response length
+
+    Returns:
+        ChatOpenAI: Shared client using the pooled HTTP connection
+    """
+    key = (model_name, temperature, max_tokens)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            config = load_config()
+            client = ChatOpenAI(
+                model=model_name,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                api_key=os.getenv('OPENAI_API_KEY'),
+                base_url=os.getenv('OPENAI_API_BASE'),
+                timeout=config['llm_timeout'],
+                max_retries=config['llm_max_retries'],
+                http_client=_shared_http_client(config),
+            )
+            _clients[key] = client
+            logger.info(f"Created LLM client for {model_name}")
+        return client
+
+
+class ResilientLLM:
+    """
+    Chat model wrapper adding a per-call deadline, hedged requests and a
+    fallback model.
+
+    If the primary call hasn't answered after `hedge_delay` seconds, a
+    second request is fired (to the fallback model if one is configured,
+    otherwise to the same model) and whichever answers first wins. A
+    primary error also triggers the fallback immediately.
+
+    Python threads can't be interrupted, so a call that loses (or outlives
+    the deadline) is cancelled if it hasn't started yet, and otherwise
+    bounded by an HTTP timeout no longer than what was left of the deadline
+    when it started; it can't hold its thread and connection past that.
+    """
+
+    def __init__(
+        self,
+        primary: Any,
+        fallback: Any = None,
+        hedge_delay: float = 0.0,
+        deadline: float = 60.0,
+        executor: Optional[ThreadPoolExecutor] = None
+    ):
+        """
+        Initialize the wrapper.
+
+        Args:
+            primary: Chat model used first
+            fallback: Chat model used for hedges and on primary errors
+            hedge_delay: Seconds before firing a hedge (0 disables hedging)
+            deadline: Overall seconds allowed per invoke()
+            executor: Thread pool running the provider calls
+        """
+        self.primary = primary
+        self.fallback = fallback
+        self.hedge_delay = hedge_delay
+        self.deadline = deadline
+        self.executor = executor or _shared_executor(load_config())
+
+    @property
+    def model_name(self) -> str:
+        return getattr(self.primary, 'model_name', type(self.primary).__name__)
+
+    def _call(self, model: Any, messages: List[Any], deadline_at: float, kwargs: Dict[str, Any]) -> Any:
+        """Run one provider call within what is left of the deadline"""
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0:
+            raise LLMDeadlineExceeded("Deadline passed before the call started")
+        request_timeout = getattr(model, 'request_timeout', None)
+        if isinstance(request_timeout, (int, float)) and 'timeout' not in kwargs:
+            # Per-attempt HTTP timeout, so retries also end by the deadline
+            attempts = 1 + (getattr(model, 'max_retries', 0) or 0)
+            kwargs = dict(kwargs, timeout=min(request_timeout, remaining / attempts))
+        return model.invoke(messages, **kwargs)
+
+    def invoke(self, messages: List[Any], **kwargs: Any) -> Any:
+        """
+        Generate a response, returning the first successful answer.
+
+        Raises:
+            LLMDeadlineExceeded: If nothing answered within the deadline
+        """
+        deadline_at = time.monotonic() + self.deadline
+        futures: Dict[Future, str] = {
+            self.executor.submit(self._call, self.primary, messages, deadline_at, kwargs): 'primary'
+        }
+        hedge_model = self.fallback or (self.primary if self.hedge_delay > 0 else None)
+        hedge_at = time.monotonic() + self.hedge_delay if self.hedge_delay > 0 else None
+        last_error: Optional[BaseException] = None
+
+        try:
+            while futures:
+                now = time.monotonic()
+                if now >= deadline_at:
+                    break
+                timeout = deadline_at - now
+                if hedge_at is not None:
+                    timeout = min(timeout, max(0.0, hedge_at - now))
+                done, _ = wait(list(futures), timeout=timeout, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    role = futures.pop(future)
+                    error = future.exception()
+                    if error is None:
+                        LLM_CALLS.inc(role=role, outcome='won')
+                        return future.result()
+                    last_error = error
+                    LLM_CALLS.inc(role=role, outcome='error')
+                    logger.warning(f"LLM {role} call failed: {error}")
+
+                fire_hedge = hedge_at is not None and time.monotonic() >= hedge_at
+                primary_failed = last_error is not None and not futures
+                if hedge_model is not None and (fire_hedge or primary_failed):
+                    role = 'fallback' if hedge_model is self.fallback else 'hedge'
+                    futures[self.executor.submit(self._call, hedge_model, messages, deadline_at, kwargs)] = role
+                    LLM_CALLS.inc(role=role, outcome='fired')
+                    hedge_model = None
+                    hedge_at = None
+
+            if futures or last_error is None:
+                LLM_CALLS.inc(role='primary', outcome='deadline')
+                raise LLMDeadlineExceeded(f"No LLM response within {self.deadline}s")
+            raise last_error
+        finally:
+            # Losers still queued never start; running ones end by their timeout
+            for future, role in futures.items():
+                LLM_CALLS.inc(role=role, outcome='cancelled' if future.cancel() else 'abandoned')
+
 
 def get_llm_model(
     model_name: str = "mistralai/mistral-7b-instruct",
     temperature: float = 0.7,
     max_tokens: int = 500
-) -> ChatOpenAI:
+) -> ResilientLLM:
     """
     Get or create an LLM instance.
-    
+
+    The underlying clients come from the process-wide registry, so creating
+    several engines doesn't open new connection pools.
+
     Args:
         model_name: Model identifier
         temperature: Creativity parameter (0-1)
         max_tokens: Maximum response length
-    
+
     Returns:
-        ChatOpenAI: Configured LLM instance
+        ResilientLLM: Deadline/hedging wrapper around the shared client(s)
     """
-    model = ChatOpenAI(
-        model=model_name,
-        temperature=temperature,
-        max_tokens=max_tokens,
-        api_key=os.getenv('OPENAI_API_KEY'),
-        base_url=os.getenv('OPENAI_API_BASE')
+    config = load_config()
+    primary = get_chat_client(model_name, temperature, max_tokens)
+    fallback_name = config['llm_fallback_model']
+    fallback = (
+        get_chat_client(fallback_name, temperature, max_tokens)
+        if fallback_name and fallback_name != model_name else None
+    )
+    return ResilientLLM(
+        primary,
+        fallback=fallback,
+        hedge_delay=config['llm_hedge_delay'],
+        deadline=config['llm_deadline'],
+        executor=_shared_executor(config),
     )
-    return model
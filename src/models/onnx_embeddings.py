@@ -0,0 +1,128 @@
+"""
+Local CPU embeddings from an ONNX sentence-embedding model
+
+Expects a directory with `model.onnx` (or `onnx/model.onnx`) and a Hugging
+Face `tokenizer.json`, as produced by exporting a sentence-transformers
+model to ONNX. Token embeddings are mean-pooled and L2-normalized.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from src.utils import get_logger
+
+logger = get_logger(__name__)
+
+
+class OnnxEmbeddings(Embeddings):
+    """Embeds on local CPU cores with onnxruntime, batching by text length"""
+
+    def __init__(
+        self,
+        model_path: str,
+        batch_size: int = 32,
+        num_workers: int = 0,
+        max_length: int = 256
+    ):
+        """
+        Load the model and tokenizer.
+
+        Args:
+            model_path: Model directory (or path to the .onnx file)
+            batch_size: Texts per inference call
+            num_workers: Batches run in parallel (0 = one per CPU core)
+            max_length: Tokens kept per text
+
+        Raises:
+            ImportError: If onnxruntime or tokenizers isn't installed
+            FileNotFoundError: If the model or tokenizer file is missing
+        """
+        try:
+            import onnxruntime
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError(
+                "The local embedding backend needs onnxruntime and tokenizers "
+                "(pip install onnxruntime tokenizers)"
+            ) from e
+
+        model_dir = model_path if os.path.isdir(model_path) else os.path.dirname(model_path)
+        model_file = model_path
+        if os.path.isdir(model_path):
+            candidates = [os.path.join(model_path, "model.onnx"), os.path.join(model_path, "onnx", "model.onnx")]
+            model_file = next((path for path in candidates if os.path.exists(path)), candidates[0])
+        tokenizer_file = os.path.join(model_dir, "tokenizer.json")
+        for path in (model_file, tokenizer_file):
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Local embedding model file not found: {path}")
+
+        cores = os.cpu_count() or 1
+        self.num_workers = num_workers or cores
+        self.batch_size = batch_size
+        self.model = os.path.basename(os.path.normpath(model_dir))
+
+        self.tokenizer = Tokenizer.from_file(tokenizer_file)
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+
+        # Parallelism comes from running batches side by side, so each run
+        # gets an equal share of the cores
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = max(1, cores // self.num_workers)
+        self.session = onnxruntime.InferenceSession(
+            model_file, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {model_input.name for model_input in self.session.get_inputs()}
+        self._executor = ThreadPoolExecutor(max_workers=self.num_workers, thread_name_prefix="embed")
+        self.dimensions = len(self._embed_batch(["dimension probe"])[0])
+        logger.info(
+            f"Loaded local embedding model {self.model} ({self.dimensions} dimensions, "
+            f"{self.num_workers} workers)"
+        )
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        """Run one inference call and pool the token embeddings"""
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([encoding.ids for encoding in encodings], dtype=np.int64)
+        attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+        inputs: Dict[str, Any] = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            inputs["token_type_ids"] = np.zeros_like(input_ids)
+        inputs = {name: value for name, value in inputs.items() if name in self._input_names}
+
+        output = self.session.run(None, inputs)[0]
+        if output.ndim == 3:
+            # (batch, tokens, dim) -> mean over real (unpadded) tokens
+            mask = attention_mask[..., None].astype(output.dtype)
+            output = (output * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(output, axis=1, keepdims=True)
+        return output / np.clip(norms, 1e-12, None)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed texts in parallel batches of similar length (less padding).
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            One vector per text, in input order
+        """
+        if not texts:
+            return []
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        batches = [order[start:start + self.batch_size] for start in range(0, len(order), self.batch_size)]
+        results = self._executor.map(lambda batch: self._embed_batch([texts[i] for i in batch]), batches)
+
+        vectors: List[Any] = [None] * len(texts)
+        for batch, embedded in zip(batches, results):
+            for i, vector in zip(batch, embedded):
+                vectors[i] = vector.tolist()
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed_batch([text])[0].tolist()
@@ -0,0 +1,299 @@
+"""
+Embedding dimensionality reduction
+
+Two ways to shrink stored vectors:
+
+    truncate   keep the first N dimensions (for models trained to support it,
+               e.g. OpenAI text-embedding-3 and other Matryoshka models)
+    pca        project onto the top N principal components of a corpus sample
+
+Reduced vectors are re-normalized to unit length so distances stay
+comparable. A fitted PCA projection is saved next to the store so every
+process embeds documents and queries the same way.
+
+PCA is only fitted once enough vectors have been ingested; until then
+documents are truncated and their full-width vectors kept as the fitting
+sample, and the store re-projects what it holds from those vectors when the
+fit happens.
+"""
+
+import hashlib
+import os
+import threading
+from contextlib import nullcontext
+from typing import Any, Callable, ContextManager, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from src.utils import get_logger
+
+logger = get_logger(__name__)
+
+REDUCTION_METHODS = ("truncate", "pca")
+PROJECTION_FILE = "projection.npz"
+# Full-width vectors (and the texts' keys) collected for a PCA fit that is
+# still waiting for more
+SAMPLE_FILE = "projection_sample.npz"
+
+
+def sample_key(text: str) -> str:
+    """Key of a text's row in the fitting sample"""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class Projection:
+    """A fitted reduction from full-width to `dimensions`-wide vectors"""
+
+    def __init__(
+        self,
+        method: str,
+        dimensions: int,
+        mean: Optional[np.ndarray] = None,
+        components: Optional[np.ndarray] = None
+    ):
+        """
+        Initialize a projection.
+
+        Args:
+            method: "truncate" or "pca"
+            dimensions: Output width
+            mean: PCA centering vector (full width)
+            components: PCA basis, shape (dimensions, full width)
+
+        Raises:
+            ValueError: For an unknown method or a PCA projection without a basis
+        """
+        if method not in REDUCTION_METHODS:
+            raise ValueError(f"Unknown reduction {method!r} (use one of {', '.join(REDUCTION_METHODS)})")
+        if method == "pca" and (mean is None or components is None):
+            raise ValueError("A PCA projection needs a mean and components (use Projection.fit_pca)")
+        self.method = method
+        self.dimensions = dimensions
+        self.mean = mean
+        self.components = components
+
+    @classmethod
+    def fit_pca(cls, vectors: Any, dimensions: int) -> "Projection":
+        """
+        Fit a PCA projection to a sample of full-width vectors.
+
+        With fewer samples than `dimensions`, the missing components are
+        zero so the output width stays fixed (fit on a larger sample for
+        better recall).
+
+        Args:
+            vectors: Sample, shape (n, full width)
+            dimensions: Output width
+
+        Returns:
+            The fitted projection
+        """
+        sample = np.asarray(vectors, dtype=np.float32)
+        if dimensions > sample.shape[1]:
+            raise ValueError(f"Cannot reduce {sample.shape[1]}-dimensional vectors to {dimensions}")
+        mean = sample.mean(axis=0)
+        _, _, basis = np.linalg.svd(sample - mean, full_matrices=False)
+        components = np.zeros((dimensions, sample.shape[1]), dtype=np.float32)
+        kept = min(dimensions, basis.shape[0])
+        components[:kept] = basis[:kept]
+        if kept < dimensions:
+            logger.warning(
+                f"PCA fitted on only {sample.shape[0]} vectors; {dimensions - kept} of "
+                f"{dimensions} components are empty"
+            )
+        return cls("pca", dimensions, mean, components)
+
+    def apply(self, vectors: Any) -> np.ndarray:
+        """
+        Reduce and re-normalize vectors.
+
+        Args:
+            vectors: Full-width vectors, shape (n, full width)
+
+        Returns:
+            Array of shape (n, dimensions)
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.method == "truncate":
+            reduced = vectors[:, :self.dimensions]
+        else:
+            reduced = (vectors - self.mean) @ self.components.T
+        norms = np.linalg.norm(reduced, axis=1, keepdims=True)
+        return reduced / np.clip(norms, 1e-12, None)
+
+    def save(self, path: str) -> None:
+        """Write the projection atomically"""
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            if self.method == "pca":
+                np.savez(f, method=self.method, dimensions=self.dimensions, mean=self.mean,
+                         components=self.components)
+            else:
+                np.savez(f, method=self.method, dimensions=self.dimensions)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["Projection"]:
+        """Read a saved projection, or None if there isn't one"""
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            method = str(data["method"]) if "method" in data.files else "pca"
+            if method != "pca":
+                return cls(method, int(data["dimensions"]))
+            return cls("pca", int(data["dimensions"]), data["mean"], data["components"])
+
+
+class ReducedEmbeddings(Embeddings):
+    """Embeddings wrapper passing documents and queries through one Projection"""
+
+    def __init__(
+        self,
+        base: Embeddings,
+        method: str,
+        dimensions: int,
+        path: Optional[str] = None,
+        fit_lock: Optional[Callable[[], ContextManager]] = None,
+        sample_size: int = 5000,
+        min_sample: int = 0,
+        on_refit: Optional[Callable[["Projection"], None]] = None
+    ):
+        """
+        Initialize the wrapper.
+
+        A PCA projection is loaded from `path` if one was saved; otherwise
+        it is fitted once embed_documents() has seen `min_sample` vectors
+        and saved there. Before that, documents (and queries) are truncated.
+
+        Args:
+            base: Full-width embeddings
+            method: "truncate" or "pca"
+            dimensions: Output width
+            path: Where the PCA projection (and the sample collected for
+                it) is persisted
+            fit_lock: Returns a context manager held while fitting, so
+                processes sharing `path` agree on a single projection
+            sample_size: Most vectors used to fit the projection
+            min_sample: Fewest vectors PCA is fitted on (never fewer than
+                `dimensions`)
+            on_refit: Called, under fit_lock, with the PCA projection that
+                replaces the truncation and the sample's full-width vectors
+                by sample_key(), to re-project documents stored so far
+        """
+        if method not in REDUCTION_METHODS:
+            raise ValueError(f"Unknown reduction {method!r} (use one of {', '.join(REDUCTION_METHODS)})")
+        self.base = base
+        self.method = method
+        self.dimensions = dimensions
+        self.path = path
+        self.fit_lock = fit_lock or nullcontext
+        self.min_sample = max(dimensions, min_sample)
+        self.sample_size = max(sample_size, self.min_sample)
+        self.on_refit = on_refit
+        self.sample_path = os.path.join(os.path.dirname(path), SAMPLE_FILE) if path else None
+        self._sample: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._lock = threading.Lock()
+        self.projection: Optional[Projection] = None
+        if method == "truncate":
+            self.projection = Projection("truncate", dimensions)
+        else:
+            self.reload()
+
+    @property
+    def model(self) -> str:
+        base_model = getattr(self.base, "model", None) or type(self.base).__name__
+        return f"{base_model}+{self.method}{self.dimensions}"
+
+    def reload(self) -> None:
+        """Pick up a projection saved (or removed) by another process"""
+        if self.method == "pca" and self.path:
+            self.projection = Projection.load(self.path)
+
+    def reset(self) -> None:
+        """Forget a fitted PCA projection (and its sample) so the next ingest refits it"""
+        if self.method == "pca":
+            self.projection = None
+            self._sample = None
+            for path in (self.path, self.sample_path):
+                if path and os.path.exists(path):
+                    os.remove(path)
+
+    def _load_sample(self) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """The fitting sample so far as (keys, vectors), or None"""
+        if self.sample_path is None:
+            return self._sample
+        if not os.path.exists(self.sample_path):
+            return None
+        with np.load(self.sample_path) as data:
+            return data["keys"], data["vectors"]
+
+    def _save_sample(self, sample: Optional[Tuple[np.ndarray, np.ndarray]]) -> None:
+        """Keep the fitting sample (None = discard it)"""
+        if self.sample_path is None:
+            self._sample = sample
+        elif sample is None:
+            if os.path.exists(self.sample_path):
+                os.remove(self.sample_path)
+        else:
+            keys, vectors = sample
+            temp_path = f"{self.sample_path}.{os.getpid()}.tmp"
+            with open(temp_path, "wb") as f:
+                np.savez(f, keys=keys, vectors=vectors)
+            os.replace(temp_path, self.sample_path)
+
+    def _ensure_projection(self, vectors: np.ndarray, texts: List[str]) -> Projection:
+        """
+        Projection for documents: the shared one if PCA was fitted, else add
+        `vectors` (embedded from `texts`) to the sample and fit once it is
+        large enough, truncating in the meantime.
+        """
+        with self._lock:
+            if self.projection is not None and self.projection.method == self.method:
+                return self.projection
+            with self.fit_lock():
+                self.reload()
+                if self.projection is not None and self.projection.method == self.method:
+                    return self.projection
+                keys = np.array([sample_key(text) for text in texts])
+                previous = self._load_sample()
+                if previous is not None:
+                    keys = np.concatenate([previous[0], keys])
+                    vectors = np.concatenate([previous[1], vectors])
+                # Earlier rows first: those are the ones stored truncated
+                keys, sample = keys[:self.sample_size], vectors[:self.sample_size]
+                if len(sample) < self.min_sample:
+                    if self.projection is None:
+                        logger.warning(
+                            f"Too few vectors to fit PCA ({len(sample)} of {self.min_sample}); "
+                            f"truncating to {self.dimensions} dimensions until there are enough"
+                        )
+                        self.projection = Projection("truncate", self.dimensions)
+                        if self.path:
+                            self.projection.save(self.path)
+                    self._save_sample((keys, sample))
+                    return self.projection
+                provisional = self.projection is not None
+                self.projection = Projection.fit_pca(sample, self.dimensions)
+                if self.path:
+                    self.projection.save(self.path)
+                self._save_sample(None)
+                logger.info(f"Fitted {self.dimensions}-component PCA on {len(sample)} vectors")
+                if provisional and self.on_refit is not None:
+                    self.on_refit(self.projection, dict(zip(keys.tolist(), sample)))
+            return self.projection
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        vectors = np.asarray(self.base.embed_documents(texts), dtype=np.float32)
+        return self._ensure_projection(vectors, texts).apply(vectors).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = np.asarray([self.base.embed_query(text)], dtype=np.float32)
+        if self.projection is None:
+            self.reload()
+        if self.projection is None:
+            # Nothing has been ingested yet, so there is nothing to match
+            return [0.0] * self.dimensions
+        return self.projection.apply(vector)[0].tolist()
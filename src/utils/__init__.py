@@ -3,6 +3,6 @@ Utility modules for Project Lexora
 """
 
 from .config_loader import load_config
-from .logger import get_logger
+from .logger import get_logger, configure_logging, set_request_id, reset_request_id
 
-__all__ = ["load_config", "get_logger"]
+__all__ = ["load_config", "get_logger", "configure_logging", "set_request_id", "reset_request_id"]
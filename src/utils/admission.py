@@ -0,0 +1,102 @@
+"""
+Admission control for provider-bound work
+
+Each AdmissionPool caps how many requests run at once and how many may wait
+for a slot; anything beyond that is rejected immediately so the server can
+answer 503 instead of piling more load onto the LLM/embedding providers.
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from .metrics import (
+    ADMISSION_ACTIVE,
+    ADMISSION_QUEUE_DEPTH,
+    ADMISSION_REJECTED,
+    ADMISSION_WAIT_SECONDS,
+)
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request can't be admitted; carries a Retry-After hint"""
+
+    def __init__(self, pool: str, retry_after: int, reason: str):
+        super().__init__(f"{pool} pool is busy ({reason}), retry after {retry_after}s")
+        self.pool = pool
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class AdmissionPool:
+    """Concurrency limiter with a bounded wait queue"""
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, max_wait: float):
+        """
+        Initialize the pool.
+
+        Args:
+            name: Pool name used in metrics and errors
+            max_concurrency: Requests allowed to run at once
+            max_queue: Requests allowed to wait for a slot
+            max_wait: Longest a request may wait before being rejected (s)
+        """
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.active = 0
+        self.waiting = 0
+        # Moving average of how long a slot is held, for Retry-After hints
+        self._avg_hold = 1.0
+        self._cond = threading.Condition()
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely to free up for a new request"""
+        backlog = (self.waiting + 1) / max(1, self.max_concurrency)
+        return max(1, math.ceil(self._avg_hold * backlog))
+
+    def _reject(self, reason: str) -> AdmissionRejected:
+        ADMISSION_REJECTED.inc(pool=self.name, reason=reason)
+        return AdmissionRejected(self.name, self.retry_after(), reason)
+
+    @contextmanager
+    def admit(self) -> Iterator[None]:
+        """
+        Hold a slot for the enclosed block.
+
+        Raises:
+            AdmissionRejected: If the queue is full or the wait times out
+        """
+        started = time.monotonic()
+        with self._cond:
+            if self.active >= self.max_concurrency:
+                if self.waiting >= self.max_queue:
+                    raise self._reject("queue_full")
+                self.waiting += 1
+                ADMISSION_QUEUE_DEPTH.set(self.waiting, pool=self.name)
+                try:
+                    admitted = self._cond.wait_for(
+                        lambda: self.active < self.max_concurrency, timeout=self.max_wait
+                    )
+                finally:
+                    self.waiting -= 1
+                    ADMISSION_QUEUE_DEPTH.set(self.waiting, pool=self.name)
+                if not admitted:
+                    raise self._reject("timeout")
+            self.active += 1
+            ADMISSION_ACTIVE.set(self.active, pool=self.name)
+
+        acquired = time.monotonic()
+        ADMISSION_WAIT_SECONDS.observe(acquired - started, pool=self.name)
+        try:
+            yield
+        finally:
+            held = time.monotonic() - acquired
+            with self._cond:
+                self.active -= 1
+                self._avg_hold = 0.8 * self._avg_hold + 0.2 * held
+                ADMISSION_ACTIVE.set(self.active, pool=self.name)
+                self._cond.notify()
@@ -0,0 +1,92 @@
+"""
+Request capture for load replay
+
+With CAPTURE_LOG set, every /query request is appended to a JSON-lines file
+with compact keys:
+
+    ts      wall-clock start (epoch seconds)
+    sid     short hash of the session (so replays keep conversations apart)
+    q, k    question and top_k
+    status  HTTP status
+    ms      total handling time
+    stages  per-stage milliseconds (see metrics.timed)
+    cache   cache -> "hit"/"miss" for the lookups the request made
+
+Records are buffered and appended in one write per flush, so worker
+processes can share a file. scripts/replay.py replays a capture (plain or
+.gz) against a running instance or an in-process app.
+"""
+
+import atexit
+import gzip
+import json
+import threading
+import time
+from typing import Any, Dict, Iterator, List
+
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class RequestCapture:
+    """Buffered append-only request log"""
+
+    def __init__(self, path: str, flush_interval: float = 1.0, flush_size: int = 100):
+        """
+        Initialize the capture.
+
+        Args:
+            path: File to append to (created if missing)
+            flush_interval: Most seconds records stay buffered
+            flush_size: Buffered records that trigger a flush
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self._lock = threading.Lock()
+        self._pending: List[str] = []
+        self._last_flush = time.monotonic()
+        atexit.register(self.flush)
+
+    def record(self, entry: Dict[str, Any]) -> None:
+        """Buffer one request record"""
+        line = json.dumps(entry, separators=(",", ":"), ensure_ascii=False)
+        with self._lock:
+            self._pending.append(line)
+            due = (len(self._pending) >= self.flush_size
+                   or time.monotonic() - self._last_flush >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        """Append buffered records (a failure is logged and the records dropped)"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+        if not pending:
+            return
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(pending) + "\n")
+        except OSError as e:
+            logger.warning(f"Could not write request capture {self.path}: {e}")
+
+
+def read_capture(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Records of a capture file, in file order.
+
+    Args:
+        path: Capture file (gzip-compressed if it ends in .gz)
+
+    Yields:
+        Record dicts; malformed lines (e.g. a torn last line) are skipped
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
@@ -24,6 +24,111 @@ def load_config() -> Dict[str, Any]:
         'model_name': os.getenv('MODEL_NAME', 'mistralai/mistral-7b-instruct'),
         'temperature': float(os.getenv('TEMPERATURE', 0.7)),
         'max_tokens': int(os.getenv('MAX_TOKENS', 500)),
+        # LLM client: HTTP timeout per attempt, overall deadline per call,
+        # hedging delay (0 = off) and optional fallback model
+        'llm_timeout': float(os.getenv('LLM_TIMEOUT', 30)),
+        'llm_max_retries': int(os.getenv('LLM_MAX_RETRIES', 1)),
+        'llm_deadline': float(os.getenv('LLM_DEADLINE', 60)),
+        'llm_hedge_delay': float(os.getenv('LLM_HEDGE_DELAY', 0)),
+        'llm_fallback_model': os.getenv('LLM_FALLBACK_MODEL', ''),
+        'llm_pool_size': int(os.getenv('LLM_POOL_SIZE', 20)),
+        # Embedding backend: openai (remote), local (ONNX model on CPU) or hash (dev/tests)
+        'embedding_backend': os.getenv('EMBEDDING_BACKEND', 'openai').lower(),
+        'embedding_model': os.getenv('EMBEDDING_MODEL', ''),
+        'embedding_model_path': os.getenv('EMBEDDING_MODEL_PATH', ''),
+        'embedding_dimensions': int(os.getenv('EMBEDDING_DIMENSIONS', 0)),
+        'embedding_batch_size': int(os.getenv('EMBEDDING_BATCH_SIZE', 32)),
+        'embedding_workers': int(os.getenv('EMBEDDING_WORKERS', 0)),
+        # Shrink stored vectors: none, truncate (Matryoshka models) or pca
+        'embedding_reduction': os.getenv('EMBEDDING_REDUCTION', 'none').lower(),
+        'embedding_reduced_dimensions': int(os.getenv('EMBEDDING_REDUCED_DIMENSIONS', 256)),
+        'embedding_reduction_sample': int(os.getenv('EMBEDDING_REDUCTION_SAMPLE', 5000)),
+        # PCA waits for this many vectors (truncating until then)
+        'embedding_reduction_min_sample': int(os.getenv('EMBEDDING_REDUCTION_MIN_SAMPLE', 1000)),
+        'embedding_check_ctx_length': os.getenv('EMBEDDING_CHECK_CTX_LENGTH', 'true').lower() == 'true',
+        # Micro-batching of concurrent query embeddings (0 = off)
+        'embed_batch_window_ms': float(os.getenv('EMBED_BATCH_WINDOW_MS', 0)),
+        'embed_batch_max_size': int(os.getenv('EMBED_BATCH_MAX_SIZE', 32)),
+        # Chunks below this cosine similarity are not sent to the LLM (0 disables)
+        'relevance_threshold': float(os.getenv('RELEVANCE_THRESHOLD', 0.0)),
+        # Retrieval: 'flat' chunk search, or 'hierarchical' (document/section
+        # summaries first, then chunks of the best sections only)
+        'retrieval_mode': os.getenv('RETRIEVAL_MODE', 'flat').lower(),
+        'retrieval_documents': int(os.getenv('RETRIEVAL_DOCUMENTS', 2)),
+        'retrieval_sections': int(os.getenv('RETRIEVAL_SECTIONS', 4)),
+        # HNSW index of the chunk collection: space (l2, cosine, ip),
+        # ef_construction and max_neighbors (M) apply when the collection is
+        # created; ef_search also updates existing stores
+        'hnsw_space': os.getenv('HNSW_SPACE', 'l2').lower(),
+        'hnsw_ef_construction': int(os.getenv('HNSW_EF_CONSTRUCTION', 100)),
+        'hnsw_max_neighbors': int(os.getenv('HNSW_MAX_NEIGHBORS', 16)),
+        'hnsw_ef_search': int(os.getenv('HNSW_EF_SEARCH', 100)),
+        # Count normalized questions, and serve answers precomputed by
+        # scripts/warm_answers.py (both kept in the store directory)
+        'query_log': os.getenv('QUERY_LOG', 'true').lower() == 'true',
+        'answer_store': os.getenv('ANSWER_STORE', 'true').lower() == 'true',
+        # Store topology: 'readwrite', or 'readonly' for query replicas that
+        # share CHROMA_PATH with a single ingestion service
+        'store_mode': os.getenv('STORE_MODE', 'readwrite').lower(),
+        'store_poll_interval': float(os.getenv('STORE_POLL_INTERVAL', 1.0)),
+        # Parsed PDF pages by content hash, reused when re-chunking or
+        # rebuilding ('' = off; kept outside CHROMA_PATH so --reset keeps it)
+        'page_cache_dir': os.getenv('PAGE_CACHE_DIR', 'page_cache'),
+        # Uploads: keep a content-addressed copy, pruned after N days (0 = never)
+        'upload_keep': os.getenv('UPLOAD_KEEP', 'true').lower() == 'true',
+        'upload_max_age_days': float(os.getenv('UPLOAD_MAX_AGE_DAYS', 0)),
+        # Conversation memory, shared by the worker processes through a
+        # SQLite file ('' = each worker keeps its own; limits are per worker)
+        'conversation_store': os.getenv('CONVERSATION_STORE', os.path.join('sessions', 'conversations.db')),
+        'conversation_max_sessions': int(os.getenv('CONVERSATION_MAX_SESSIONS', 1000)),
+        'conversation_ttl': float(os.getenv('CONVERSATION_TTL', 3600)),
+        'conversation_max_turns': int(os.getenv('CONVERSATION_MAX_TURNS', 4)),
+        'history_token_budget': int(os.getenv('HISTORY_TOKEN_BUDGET', 600)),
+        # Speculative retrieval while the user types (off by default: results
+        # are kept by the worker that fetched them, see the README)
+        'prefetch': os.getenv('PREFETCH', 'false').lower() == 'true',
+        'prefetch_ttl': float(os.getenv('PREFETCH_TTL', 30)),
+        'prefetch_min_interval': float(os.getenv('PREFETCH_MIN_INTERVAL', 0.25)),
+        'prefetch_max_sessions': int(os.getenv('PREFETCH_MAX_SESSIONS', 1000)),
+        'prefetch_match_ratio': float(os.getenv('PREFETCH_MATCH_RATIO', 0.9)),
+        'prefetch_max_concurrency': int(os.getenv('PREFETCH_MAX_CONCURRENCY', 2)),
+        # Memory budget (MB, per worker process) shared by the store's loaded
+        # index, section summaries, cached answers, conversations and
+        # prefetches, evicting least recently used across them (0 = unbounded)
+        'memory_budget_mb': float(os.getenv('MEMORY_BUDGET_MB', 0)),
+        # Serving
+        'host': os.getenv('HOST', '0.0.0.0'),
+        'port': int(os.getenv('PORT', 5000)),
+        'workers': int(os.getenv('WEB_CONCURRENCY', 2)),
+        'threads': int(os.getenv('WEB_THREADS', 16)),
+        'worker_class': os.getenv('WORKER_CLASS', 'gthread'),
+        'worker_timeout': int(os.getenv('WORKER_TIMEOUT', 120)),
+        'warmup_wait': float(os.getenv('WARMUP_WAIT', 30)),
+        # Admission control (per worker process)
+        'query_max_concurrency': int(os.getenv('QUERY_MAX_CONCURRENCY', 4)),
+        'query_max_queue': int(os.getenv('QUERY_MAX_QUEUE', 8)),
+        'query_max_wait': float(os.getenv('QUERY_MAX_WAIT', 10)),
+        'ingest_max_concurrency': int(os.getenv('INGEST_MAX_CONCURRENCY', 1)),
+        'ingest_max_queue': int(os.getenv('INGEST_MAX_QUEUE', 2)),
+        'ingest_max_wait': float(os.getenv('INGEST_MAX_WAIT', 30)),
+        # Append every /query (question, timings, cache outcome) here for
+        # scripts/replay.py ('' = off)
+        'capture_log': os.getenv('CAPTURE_LOG', ''),
+        # Admin endpoints (profiling) are off unless a token is set
+        'admin_token': os.getenv('ADMIN_TOKEN', ''),
+        'profile_dir': os.getenv('PROFILE_DIR', os.path.join('logs', 'profiles')),
+        # Logging
+        'log_dir': os.getenv('LOG_DIR', 'logs'),
+        'log_file': os.getenv('LOG_FILE', 'app.log'),
+        'log_level': os.getenv('LOG_LEVEL', 'INFO').upper(),
+        'log_async': os.getenv('LOG_ASYNC', 'true').lower() == 'true',
+        'log_queue_size': int(os.getenv('LOG_QUEUE_SIZE', 10000)),
+        'log_format': os.getenv('LOG_FORMAT', 'text').lower(),
+        'log_rotation': os.getenv('LOG_ROTATION', 'size').lower(),
+        'log_max_bytes': int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024)),
+        'log_backup_count': int(os.getenv('LOG_BACKUP_COUNT', 5)),
+        'log_rotate_when': os.getenv('LOG_ROTATE_WHEN', 'midnight'),
+        'log_debug_sample_rate': float(os.getenv('LOG_DEBUG_SAMPLE_RATE', 0.1)),
     }
     
     return config
@@ -2,41 +2,324 @@
 Logger utility module
 """
 
+import atexit
+import contextvars
+import itertools
+import json
 import logging
+import logging.handlers
 import os
-from typing import Optional
+import queue
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
 
+from .config_loader import load_config
+from .metrics import LOG_RECORDS_DROPPED
 
-def get_logger(name: str = __name__, level: int = logging.INFO) -> logging.Logger:
+# Request ID for the request being handled on this thread / context
+request_id_var: contextvars.ContextVar = contextvars.ContextVar("request_id", default=None)
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_handler: Optional[logging.Handler] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+# Config the file handler was built from (None when a target was passed in)
+_config: Optional[Dict[str, Any]] = None
+_configured_loggers: Dict[str, logging.Logger] = {}
+_lock = threading.RLock()
+# Least seconds between stderr warnings about dropped records
+DROP_WARNING_INTERVAL = 60.0
+
+
+def set_request_id(request_id: Optional[str]) -> contextvars.Token:
+    """Attach a request ID to every record logged in the current context"""
+    return request_id_var.set(request_id)
+
+
+def reset_request_id(token: contextvars.Token) -> None:
+    """Restore the request ID that was active before set_request_id()"""
+    request_id_var.reset(token)
+
+
+class RequestContextFilter(logging.Filter):
+    """Copies the current request ID onto each record"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class DebugSampler(logging.Filter):
+    """
+    Keeps 1 in N DEBUG records; other levels always pass.
+
+    Counter-based rather than random so the kept fraction is exact.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.every = max(1, round(1 / rate)) if rate > 0 else 0
+        self._counter = itertools.count()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        if not self.every:
+            return False
+        return next(self._counter) % self.every == 0
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            'ts': self.formatTime(record, DATE_FORMAT),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'pid': record.process,
+            'request_id': getattr(record, 'request_id', None),
+        }
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False)
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that drops records instead of blocking when the queue is full.
+
+    Drops are counted (lexora_log_records_dropped_total) and reported on
+    stderr at most every DROP_WARNING_INTERVAL seconds, since the log itself
+    can't take the message.
+    """
+
+    def __init__(self, queue_: queue.Queue):
+        super().__init__(queue_)
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+        self._unreported = 0
+        self._next_warning = 0.0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the request ID on the calling thread; the writer thread
+        # runs outside the request context
+        record.request_id = getattr(record, 'request_id', None) or request_id_var.get()
+        return super().prepare(record)
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self._record_drop()
+
+    def _record_drop(self) -> None:
+        LOG_RECORDS_DROPPED.inc()
+        now = time.monotonic()
+        with self._dropped_lock:
+            self.dropped += 1
+            self._unreported += 1
+            if now < self._next_warning:
+                return
+            unreported, self._unreported = self._unreported, 0
+            self._next_warning = now + DROP_WARNING_INTERVAL
+        sys.stderr.write(f"lexora: log queue full, dropped {unreported} log records (pid {os.getpid()})\n")
+
+
+class _Listener(logging.handlers.QueueListener):
+    """QueueListener whose stop() waits for room in a full queue instead of failing"""
+
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+
+# Rotating handlers rename the file they write, which is only safe with one
+# writer: after a fork each process gets its own file (app.<pid>.log)
+PER_PROCESS_ROTATIONS = ('size', 'time')
+
+
+def build_file_handler(config: Dict[str, Any], per_process: bool = False) -> logging.Handler:
+    """
+    Create the handler that actually writes to disk.
+
+    Args:
+        config: Configuration from load_config()
+        per_process: Give a rotating log a file of this process's own
+            (app.<pid>.log)
+
+    Returns:
+        logging.Handler: Rotating (by size or time), watched (rotated by an
+            external tool such as logrotate) or plain file handler
+    """
+    log_dir = config['log_dir']
+    if not os.path.exists(log_dir):
+        os.makedirs(log_dir, exist_ok=True)
+    log_file = os.path.join(log_dir, config['log_file'])
+
+    rotation = config['log_rotation']
+    if per_process and rotation in PER_PROCESS_ROTATIONS:
+        root, ext = os.path.splitext(log_file)
+        log_file = f"{root}.{os.getpid()}{ext}"
+    if rotation == 'size':
+        handler = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=config['log_max_bytes'],
+            backupCount=config['log_backup_count'], encoding='utf-8'
+        )
+    elif rotation == 'time':
+        handler = logging.handlers.TimedRotatingFileHandler(
+            log_file, when=config['log_rotate_when'],
+            backupCount=config['log_backup_count'], encoding='utf-8'
+        )
+    elif rotation == 'watched':
+        # Reopens the file once logrotate has moved it; every process can
+        # share it since nothing here renames it
+        handler = logging.handlers.WatchedFileHandler(log_file, encoding='utf-8')
+    else:
+        handler = logging.FileHandler(log_file, mode='a', encoding='utf-8')
+
+    if config['log_format'] == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT, datefmt=DATE_FORMAT))
+    return handler
+
+
+def _front_handler(target: logging.Handler, config: Dict[str, Any]) -> logging.Handler:
+    """
+    The handler attached to loggers: a queue in front of `target` in async
+    mode, else `target` itself.
+
+    DEBUG sampling happens here, before a record is formatted or queued.
+    """
+    if config['log_async']:
+        handler: logging.Handler = _DroppingQueueHandler(queue.Queue(maxsize=config['log_queue_size']))
+    else:
+        handler = target
+        handler.addFilter(RequestContextFilter())
+    if config['log_debug_sample_rate'] < 1.0:
+        handler.addFilter(DebugSampler(config['log_debug_sample_rate']))
+    return handler
+
+
+def _attach(handler: logging.Handler) -> None:
+    """Make `handler` the one handler of every application logger (caller holds _lock)"""
+    global _handler
+    for logger in _configured_loggers.values():
+        if _handler is not None:
+            logger.removeHandler(_handler)
+        logger.addHandler(handler)
+    _handler = handler
+
+
+def configure_logging(
+    config: Optional[Dict[str, Any]] = None,
+    target: Optional[logging.Handler] = None
+) -> logging.Handler:
+    """
+    (Re)build the shared handler used by every logger from get_logger().
+
+    In async mode, callers only put records on a bounded queue and a single
+    background QueueListener thread does the formatting and disk I/O.
+
+    Args:
+        config: Configuration from load_config() (loaded if omitted)
+        target: Handler to write through instead of the configured file
+            handler (used by tests to simulate a slow disk)
+
+    Returns:
+        logging.Handler: The handler attached to application loggers
+    """
+    global _listener, _config
+    config = config or load_config()
+
+    with _lock:
+        old_handler = _handler
+        _stop_listener()
+
+        # Only a file handler built from the config is reopened per process after a fork
+        _config = None if target is not None else config
+        target = target or build_file_handler(config)
+        handler = _front_handler(target, config)
+        if config['log_async']:
+            _listener = _Listener(
+                handler.queue, target, respect_handler_level=True
+            )
+            _listener.start()
+        _attach(handler)
+
+        if old_handler is not None and old_handler is not target:
+            old_handler.close()
+        return handler
+
+
+def _stop_listener() -> None:
+    """Flush queued records and stop the background writer"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def _reopen_after_fork() -> None:
+    """
+    Give a forked worker its own writer thread and, for rotating logs, its
+    own file.
+
+    Threads don't survive fork, and processes rotating one file by renaming
+    it race each other (and keep writing to the renamed file).
+    """
+    global _listener
+    if _handler is None:
+        return
+    per_process = _config is not None and _config['log_rotation'] in PER_PROCESS_ROTATIONS
+    if _listener is not None:
+        target = _listener.handlers[0]
+        if per_process:
+            target.close()  # this process's copy of the parent's file
+            target = build_file_handler(_config, per_process=True)
+        # Fresh queue too: the parent's may have been locked mid-operation
+        _handler.queue = queue.Queue(maxsize=_handler.queue.maxsize)
+        _listener = _Listener(_handler.queue, target, respect_handler_level=True)
+        _listener.start()
+    elif per_process:
+        old_handler = _handler
+        _attach(_front_handler(build_file_handler(_config, per_process=True), _config))
+        old_handler.close()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reopen_after_fork)
+atexit.register(_stop_listener)
+
+
+def get_logger(name: str = __name__, level: Optional[int] = None) -> logging.Logger:
     """
     Get a configured logger instance that writes to a log file.
-    
+
+    All loggers share one handler. With LOG_ASYNC enabled (the default) the
+    handler only enqueues records, so disk I/O stays off the request path.
+
     Args:
         name: Logger name
-        level: Logging level
-    
+        level: Logging level (defaults to LOG_LEVEL)
+
     Returns:
         logging.Logger: Configured logger writing to logs/app.log
     """
     logger = logging.getLogger(name)
-    
-    if not logger.handlers:
-        # Create logs directory if it doesn't exist
-        log_dir = "logs"
-        if not os.path.exists(log_dir):
-            os.makedirs(log_dir)
-        
-        # Create file handler
-        log_file = os.path.join(log_dir, "app.log")
-        handler = logging.FileHandler(log_file, mode='a', encoding='utf-8')
-        
-        # Set formatter
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
-        logger.setLevel(level)
-    
+
+    with _lock:
+        if name not in _configured_loggers:
+            config = load_config()
+            handler = _handler or configure_logging(config)
+            logger.addHandler(handler)
+            logger.setLevel(level if level is not None else config['log_level'])
+            _configured_loggers[name] = logger
+
     return logger
@@ -0,0 +1,273 @@
+"""
+Memory budget shared by the in-process caches
+
+A long-running worker keeps state that grows with the corpus and the
+traffic: the store's loaded HNSW index, the section summary matrix, cached
+answers, conversations and prefetched results. Each of them opens an
+Account on one MemoryBudget and charges every entry's (estimated) size to
+it. The budget keeps a single least-recently-used order across all
+accounts, and when the total goes over the limit it asks the owners of the
+oldest entries to drop them, whichever cache they belong to.
+
+Sizes are estimates (strings, arrays and containers are summed; the index
+from its vector count and width), and the interpreter and libraries come on
+top, so set the limit below the container's memory limit.
+"""
+
+import ctypes
+import ctypes.util
+import itertools
+import os
+import sys
+import threading
+import weakref
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from .config_loader import load_config
+from .logger import get_logger
+from .metrics import MEMORY_EVICTIONS, MEMORY_LIMIT_BYTES, MEMORY_USED_BYTES
+
+logger = get_logger(__name__)
+
+# After evicting at least this much, freed heap pages are handed back to the
+# OS (glibc keeps them otherwise, so RSS wouldn't go down)
+TRIM_THRESHOLD = 1024 * 1024
+
+# glibc mallopt() parameter for the most malloc arenas
+M_ARENA_MAX = -8
+
+_libc: Any = None
+_libc_loaded = False
+
+
+def _glibc() -> Any:
+    """The C library if it is glibc (malloc_trim/mallopt available), else None"""
+    global _libc, _libc_loaded
+    if not _libc_loaded:
+        _libc_loaded = True
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6")
+            _libc = libc if hasattr(libc, "malloc_trim") and hasattr(libc, "mallopt") else None
+        except OSError:
+            _libc = None
+    return _libc
+
+
+def release_free_memory() -> None:
+    """Return free heap pages to the OS where the C library supports it"""
+    libc = _glibc()
+    if libc is not None:
+        libc.malloc_trim(0)
+
+
+def limit_malloc_arenas(arenas: int = 2) -> bool:
+    """
+    Cap glibc's malloc arenas for threads started from now on.
+
+    Chroma's native threads each allocate from their own arena by default,
+    and memory freed when an index is unloaded then stays fragmented across
+    them, so RSS keeps creeping up even though the caches stay in budget.
+    Left alone if MALLOC_ARENA_MAX is already set in the environment.
+
+    Returns:
+        True if the limit was applied
+    """
+    libc = _glibc()
+    if libc is None or os.environ.get("MALLOC_ARENA_MAX"):
+        return False
+    return bool(libc.mallopt(M_ARENA_MAX, arenas))
+
+
+def approximate_size(value: Any, _depth: int = 0) -> int:
+    """
+    Rough resident bytes of a value.
+
+    Counts strings, numbers, arrays (by nbytes), containers and the
+    attributes of plain objects such as Documents; shared objects are
+    counted each time they appear.
+    """
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes + 112
+    size = sys.getsizeof(value)
+    if _depth > 8 or isinstance(value, (str, bytes, int, float, bool, type(None))):
+        return size
+    if isinstance(value, dict):
+        return size + sum(
+            approximate_size(key, _depth + 1) + approximate_size(item, _depth + 1) for key, item in value.items()
+        )
+    if isinstance(value, (list, tuple, set, frozenset, deque)):
+        return size + sum(approximate_size(item, _depth + 1) for item in value)
+    attributes = getattr(value, "__dict__", None)
+    if attributes:
+        return size + approximate_size(attributes, _depth + 1)
+    return size
+
+
+class Account:
+    """One cache's entries in a MemoryBudget"""
+
+    def __init__(self, budget: "MemoryBudget", account_id: int, name: str, evict: Callable[[Hashable], None]):
+        self.budget = budget
+        self.id = account_id
+        self.name = name
+        self.evict = evict
+
+    def charge(self, key: Hashable, size: int) -> None:
+        """
+        Record (or resize) an entry as just used, evicting the least
+        recently used entries of any account if that goes over the limit.
+
+        Call without holding the owner's own lock: the owner may be asked
+        to evict other entries before this returns.
+        """
+        self.budget._charge(self, key, size)
+
+    def touch(self, key: Hashable) -> None:
+        """Mark an entry as just used"""
+        self.budget._touch(self, key)
+
+    def release(self, key: Hashable) -> None:
+        """Forget an entry the owner dropped itself"""
+        self.budget._release(self, key)
+
+    def clear(self) -> None:
+        """Forget every entry of this account"""
+        self.budget._forget(self.id)
+
+    @property
+    def used(self) -> int:
+        """Bytes charged to this account"""
+        return self.budget._used_by.get(self.id, 0)
+
+
+class MemoryBudget:
+    """Byte limit shared by several caches, with LRU eviction across all of them"""
+
+    def __init__(self, limit: int):
+        """
+        Initialize the budget.
+
+        Args:
+            limit: Most bytes the accounts may hold together (0 = unbounded,
+                sizes are still tracked)
+        """
+        self.limit = limit
+        self.used = 0
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        # (account ID, key) -> size, least recently used first
+        self._entries: "OrderedDict[Tuple[int, Hashable], int]" = OrderedDict()
+        self._accounts: Dict[int, "weakref.ReferenceType[Account]"] = {}
+        self._names: Dict[int, str] = {}
+        self._used_by: Dict[int, int] = {}
+        self._warned = False
+        MEMORY_LIMIT_BYTES.set(limit)
+
+    def account(self, name: str, evict: Callable[[Hashable], None]) -> Account:
+        """
+        Open an account for a cache.
+
+        Args:
+            name: Cache name for metrics and stats (accounts may share one)
+            evict: Called with an entry's key when the budget drops it; it
+                must discard the entry (and must not block on a lock held
+                while calling charge)
+
+        Returns:
+            Account whose entries are forgotten when it is garbage collected
+        """
+        account = Account(self, next(self._ids), name, evict)
+        with self._lock:
+            self._accounts[account.id] = weakref.ref(account)
+            self._names[account.id] = name
+            self._used_by[account.id] = 0
+        weakref.finalize(account, self._close, account.id)
+        return account
+
+    def stats(self) -> Dict[str, Any]:
+        """Limit, total and per-cache bytes charged"""
+        with self._lock:
+            caches: Dict[str, int] = {}
+            for account_id, used in self._used_by.items():
+                name = self._names[account_id]
+                caches[name] = caches.get(name, 0) + used
+            return {"limit": self.limit, "used": self.used, "entries": len(self._entries), "caches": caches}
+
+    def _adjust(self, account_id: int, delta: int) -> None:
+        """Update the totals (caller holds the lock)"""
+        self.used += delta
+        self._used_by[account_id] = self._used_by.get(account_id, 0) + delta
+        MEMORY_USED_BYTES.inc(delta, cache=self._names[account_id])
+
+    def _charge(self, account: Account, key: Hashable, size: int) -> None:
+        entry = (account.id, key)
+        victims: List[Tuple[int, Hashable, int]] = []
+        with self._lock:
+            previous = self._entries.pop(entry, 0)
+            self._entries[entry] = size
+            self._adjust(account.id, size - previous)
+            while self.limit and self.used > self.limit:
+                oldest = next(iter(self._entries))
+                if oldest == entry:
+                    # Only the entry being charged is left; it's in use, so keep it
+                    if not self._warned:
+                        self._warned = True
+                        logger.warning(
+                            f"{account.name} entry of {size / 2**20:.1f}MB alone exceeds the memory budget "
+                            f"of {self.limit / 2**20:.1f}MB; raise MEMORY_BUDGET_MB"
+                        )
+                    break
+                victim_size = self._entries.pop(oldest)
+                self._adjust(oldest[0], -victim_size)
+                victims.append((oldest[0], oldest[1], victim_size))
+        self._evict(victims)
+
+    def _touch(self, account: Account, key: Hashable) -> None:
+        with self._lock:
+            if (account.id, key) in self._entries:
+                self._entries.move_to_end((account.id, key))
+
+    def _release(self, account: Account, key: Hashable) -> None:
+        with self._lock:
+            size = self._entries.pop((account.id, key), None)
+            if size is not None:
+                self._adjust(account.id, -size)
+
+    def _forget(self, account_id: int) -> None:
+        with self._lock:
+            for entry in [entry for entry in self._entries if entry[0] == account_id]:
+                self._adjust(account_id, -self._entries.pop(entry))
+
+    def _close(self, account_id: int) -> None:
+        """Drop a garbage-collected account's entries"""
+        self._forget(account_id)
+        with self._lock:
+            self._accounts.pop(account_id, None)
+            self._names.pop(account_id, None)
+            self._used_by.pop(account_id, None)
+
+    def _evict(self, victims: List[Tuple[int, Hashable, int]]) -> None:
+        """Ask the owners to drop entries already removed from the ledger"""
+        freed = 0
+        for account_id, key, size in victims:
+            reference = self._accounts.get(account_id)
+            account = reference() if reference is not None else None
+            if account is None:
+                continue
+            try:
+                account.evict(key)
+            except Exception as e:
+                logger.warning(f"Could not evict {account.name} entry: {e}")
+                continue
+            MEMORY_EVICTIONS.inc(cache=account.name)
+            freed += size
+        if freed >= TRIM_THRESHOLD:
+            release_free_memory()
+
+
+# One budget per worker process, shared by every cache that isn't given its own
+MEMORY_BUDGET = MemoryBudget(int(load_config()["memory_budget_mb"] * 1024 * 1024))
+if MEMORY_BUDGET.limit:
+    limit_malloc_arenas()
@@ -0,0 +1,322 @@
+"""
+In-process metrics with Prometheus text exposition
+
+Counters, gauges and histograms are kept per process (each gunicorn worker
+reports its own series, distinguished by the scraper's instance label).
+"""
+
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Per-request stage breakdown (stage -> seconds), active only when started
+_stage_timings: contextvars.ContextVar = contextvars.ContextVar("stage_timings", default=None)
+# Per-request cache outcomes (cache -> "hit"/"miss"), active only when started
+_cache_outcomes: contextvars.ContextVar = contextvars.ContextVar("cache_outcomes", default=None)
+
+
+def _format_labels(labelnames: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """Base class holding one value per label combination"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing value"""
+
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in items
+        ]
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> (per-bucket counts incl. +Inf, sum, count)
+        self._values: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, **labels: str) -> int:
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        with self._lock:
+            items = sorted((key, [list(state[0]), state[1], state[2]]) for key, state in self._values.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _format_labels(self.labelnames, key, 'le="%s"' % le)
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together at /metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Render all metrics in Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "lexora_stage_duration_seconds",
+    "Time spent in each ingestion and query stage",
+    ["stage"],
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    "lexora_request_duration_seconds",
+    "End-to-end HTTP request latency",
+    ["endpoint"],
+)
+REQUESTS = REGISTRY.counter(
+    "lexora_requests_total",
+    "HTTP requests handled",
+    ["endpoint", "status"],
+)
+INGESTED = REGISTRY.counter(
+    "lexora_ingested_total",
+    "Documents (pages) and chunks ingested",
+    ["kind"],
+)
+LLM_TOKENS = REGISTRY.counter(
+    "lexora_llm_tokens_total",
+    "Tokens reported by the LLM provider",
+    ["kind"],
+)
+EMBED_BATCH_SIZE = REGISTRY.histogram(
+    "lexora_embed_batch_size",
+    "Query embeddings sent per micro-batch",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+LLM_CALLS = REGISTRY.counter(
+    "lexora_llm_calls_total",
+    "LLM calls by role (primary/hedge/fallback) and outcome",
+    ["role", "outcome"],
+)
+CACHE_LOOKUPS = REGISTRY.counter(
+    "lexora_cache_lookups_total",
+    "Cache lookups by cache and result (hit/miss)",
+    ["cache", "result"],
+)
+LLM_CALLS_SKIPPED = REGISTRY.counter(
+    "lexora_llm_calls_skipped_total",
+    "Queries answered without an LLM call because no chunk cleared the relevance threshold",
+)
+CHUNKS_FILTERED = REGISTRY.counter(
+    "lexora_chunks_filtered_total",
+    "Retrieved chunks dropped for scoring below the relevance threshold",
+)
+ADMISSION_ACTIVE = REGISTRY.gauge(
+    "lexora_admission_active",
+    "Requests currently holding an admission slot",
+    ["pool"],
+)
+ADMISSION_QUEUE_DEPTH = REGISTRY.gauge(
+    "lexora_admission_queue_depth",
+    "Requests waiting for an admission slot",
+    ["pool"],
+)
+ADMISSION_WAIT_SECONDS = REGISTRY.histogram(
+    "lexora_admission_wait_seconds",
+    "Time spent waiting for an admission slot",
+    ["pool"],
+)
+ADMISSION_REJECTED = REGISTRY.counter(
+    "lexora_admission_rejected_total",
+    "Requests rejected because the queue was full or the wait timed out",
+    ["pool", "reason"],
+)
+MEMORY_LIMIT_BYTES = REGISTRY.gauge(
+    "lexora_memory_budget_bytes",
+    "Configured memory budget shared by the caches (0 = unbounded)",
+)
+MEMORY_USED_BYTES = REGISTRY.gauge(
+    "lexora_memory_used_bytes",
+    "Estimated bytes held by each cache under the memory budget",
+    ["cache"],
+)
+MEMORY_EVICTIONS = REGISTRY.counter(
+    "lexora_memory_evictions_total",
+    "Entries evicted to stay within the memory budget",
+    ["cache"],
+)
+
+
+def start_stage_timings() -> contextvars.Token:
+    """Begin collecting a per-stage breakdown for the current request"""
+    return _stage_timings.set({})
+
+
+def stop_stage_timings(token: contextvars.Token) -> Dict[str, float]:
+    """
+    Stop collecting and return the breakdown.
+
+    Returns:
+        Dict mapping stage name to milliseconds
+    """
+    timings = _stage_timings.get() or {}
+    _stage_timings.reset(token)
+    return {stage: round(seconds * 1000, 3) for stage, seconds in timings.items()}
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """Record a stage duration in the histogram and the active breakdown"""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = _stage_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Time the enclosed block as `stage`"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
+
+
+def start_cache_outcomes() -> contextvars.Token:
+    """Begin collecting the cache lookups made by the current request"""
+    return _cache_outcomes.set({})
+
+
+def stop_cache_outcomes(token: contextvars.Token) -> Dict[str, str]:
+    """
+    Stop collecting and return the outcomes.
+
+    Returns:
+        Dict mapping cache name to "hit" or "miss" (the last lookup wins)
+    """
+    outcomes = _cache_outcomes.get() or {}
+    _cache_outcomes.reset(token)
+    return outcomes
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """Count a cache lookup; hit rate is hits / (hits + misses)"""
+    result = "hit" if hit else "miss"
+    CACHE_LOOKUPS.inc(cache=cache, result=result)
+    outcomes = _cache_outcomes.get()
+    if outcomes is not None:
+        outcomes[cache] = result
+
+
+def record_llm_usage(response: object) -> None:
+    """Count prompt/completion tokens from a LangChain chat response, if reported"""
+    usage: Optional[dict] = getattr(response, "usage_metadata", None)
+    if not usage:
+        token_usage = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+        usage = {
+            "input_tokens": token_usage.get("prompt_tokens", 0),
+            "output_tokens": token_usage.get("completion_tokens", 0),
+        }
+    LLM_TOKENS.inc(usage.get("input_tokens", 0) or 0, kind="prompt")
+    LLM_TOKENS.inc(usage.get("output_tokens", 0) or 0, kind="completion")
+LOG_RECORDS_DROPPED = REGISTRY.counter(
+    "lexora_log_records_dropped_total",
+    "Log records dropped because the async log queue was full",
+)
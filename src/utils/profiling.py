@@ -0,0 +1,323 @@
+"""
+On-demand profiling of hot paths
+
+Functions decorated with @profiled (query answering, document splitting,
+uploads) are profiled only while an admin has armed the profiler, for the
+next N calls and/or a time window:
+
+    cprofile   deterministic cProfile of each call, merged into one .prof
+               file (open with pstats or snakeviz)
+    sampling   a background thread samples the stacks of threads inside a
+               profiled call every few milliseconds, written as folded
+               stacks (flamegraph.pl / speedscope)
+
+Disarmed, a profiled call costs one attribute check. tracemalloc snapshots
+are taken separately and diffed against the previous snapshot.
+"""
+
+import cProfile
+import functools
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+from .config_loader import load_config
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+PROFILE_MODES = ("cprofile", "sampling")
+MAX_STACK_DEPTH = 64
+
+
+class ProfilingError(Exception):
+    """Raised for an invalid profiling request (bad mode, already running, ...)"""
+
+
+class _Session:
+    """One armed profiling window"""
+
+    def __init__(self, mode: str, requests: Optional[int], seconds: Optional[float], interval: float):
+        self.mode = mode
+        self.remaining = requests
+        self.deadline = time.monotonic() + seconds if seconds else None
+        self.interval = interval
+        self.name = time.strftime("%Y%m%d-%H%M%S") + f"-{mode}"
+        self.calls = 0
+        self.in_flight = 0
+        self.stats: Optional[pstats.Stats] = None
+        self.samples: Counter = Counter()
+        # thread ident -> name of the profiled call it is in
+        self.threads: Dict[int, str] = {}
+        self.stop = threading.Event()
+
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+
+class Profiler:
+    """Arms profiling for a window of calls and writes the results to a directory"""
+
+    def __init__(self, directory: str):
+        """
+        Initialize the profiler (disarmed).
+
+        Args:
+            directory: Where result files are written
+        """
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._session: Optional[_Session] = None
+        self._local = threading.local()
+        self._last: Optional[Dict[str, Any]] = None
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+
+    # -- CPU profiling -----------------------------------------------------
+
+    def start(
+        self,
+        mode: str = "sampling",
+        requests: Optional[int] = None,
+        seconds: Optional[float] = None,
+        interval: float = 0.005
+    ) -> Dict[str, Any]:
+        """
+        Arm the profiler.
+
+        Args:
+            mode: "cprofile" or "sampling"
+            requests: Profile this many calls, then stop
+            seconds: Stop after this many seconds
+            interval: Seconds between stack samples (sampling mode)
+
+        Returns:
+            Status (see status())
+
+        Raises:
+            ProfilingError: If the mode is unknown, no limit is given or a
+                window is already armed
+        """
+        if mode not in PROFILE_MODES:
+            raise ProfilingError(f"Unknown profiling mode {mode!r} (use one of {', '.join(PROFILE_MODES)})")
+        if not requests and not seconds:
+            raise ProfilingError("Give a number of requests, a number of seconds or both")
+        session = _Session(mode, requests, seconds, max(0.001, interval))
+        with self._lock:
+            if self._session is not None:
+                raise ProfilingError("Profiling is already running; stop it first")
+            self._session = session
+        if mode == "sampling":
+            threading.Thread(target=self._sample, args=(session,), name="lexora-sampler", daemon=True).start()
+        if seconds:
+            timer = threading.Timer(seconds, self._finish, args=(session,))
+            timer.daemon = True
+            timer.start()
+        logger.info(f"Profiling armed: {mode}, requests={requests}, seconds={seconds}")
+        return self.status()
+
+    def stop(self) -> Optional[Dict[str, Any]]:
+        """
+        Disarm the profiler and write what was collected.
+
+        Returns:
+            The result (see status()['last']), or None if nothing was armed
+        """
+        session = self._session
+        if session is None:
+            return None
+        return self._finish(session)
+
+    def status(self) -> Dict[str, Any]:
+        """Armed window (if any), last result and result files"""
+        session = self._session
+        running = None
+        if session is not None:
+            running = {
+                "mode": session.mode,
+                "calls": session.calls,
+                "remaining": session.remaining,
+                "seconds_left": round(max(0.0, session.deadline - time.monotonic()), 1)
+                if session.deadline is not None else None,
+            }
+        return {"running": running, "last": self._last, "files": self.files()}
+
+    def files(self) -> List[str]:
+        """Result files, newest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(os.listdir(self.directory), reverse=True)
+
+    def profiled(self, name: str) -> Callable:
+        """Decorator profiling calls of the function as `name` while armed"""
+        def decorator(func: Callable) -> Callable:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if self._session is None or getattr(self._local, "active", False):
+                    return func(*args, **kwargs)
+                return self._call(name, func, args, kwargs)
+            return wrapper
+        return decorator
+
+    def _claim(self) -> Optional[_Session]:
+        """Count a call against the armed window, or None if it is used up"""
+        with self._lock:
+            session = self._session
+            if session is None or session.expired():
+                return None
+            if session.remaining is not None:
+                if session.remaining <= 0:
+                    return None
+                session.remaining -= 1
+            session.calls += 1
+            session.in_flight += 1
+            return session
+
+    def _call(self, name: str, func: Callable, args: tuple, kwargs: dict) -> Any:
+        session = self._claim()
+        if session is None:
+            return func(*args, **kwargs)
+        # Nested profiled calls (e.g. splitting inside an upload) belong to this one
+        self._local.active = True
+        profile = None
+        try:
+            if session.mode == "cprofile":
+                profile = cProfile.Profile()
+                try:
+                    profile.enable()
+                except ValueError:
+                    # Another profiler (e.g. a debugger) owns the hook
+                    profile = None
+            else:
+                session.threads[threading.get_ident()] = name
+            return func(*args, **kwargs)
+        finally:
+            if profile is not None:
+                profile.disable()
+            session.threads.pop(threading.get_ident(), None)
+            self._local.active = False
+            with self._lock:
+                if profile is not None and self._session is session:
+                    if session.stats is None:
+                        session.stats = pstats.Stats(profile)
+                    else:
+                        session.stats.add(profile)
+                session.in_flight -= 1
+                done = session.remaining == 0 and session.in_flight == 0
+            if done:
+                self._finish(session)
+
+    def _sample(self, session: _Session) -> None:
+        """Sampler thread: count the stacks of threads inside profiled calls"""
+        while not session.stop.wait(session.interval):
+            if not session.threads:
+                continue
+            frames = sys._current_frames()
+            for ident, name in list(session.threads.items()):
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                if stack:
+                    session.samples[";".join([name] + stack[::-1])] += 1
+
+    def _finish(self, session: _Session) -> Optional[Dict[str, Any]]:
+        """Disarm `session` (once) and write its results"""
+        with self._lock:
+            if self._session is not session:
+                return None
+            self._session = None
+        session.stop.set()
+        os.makedirs(self.directory, exist_ok=True)
+        summary = io.StringIO()
+        if session.mode == "cprofile":
+            filename = f"{session.name}.prof"
+            # Calls still running when a time window closes are left out
+            with self._lock:
+                stats, session.stats = session.stats, None
+            if stats is not None:
+                stats.dump_stats(os.path.join(self.directory, filename))
+                stats.stream = summary
+                stats.sort_stats("cumulative").print_stats(25)
+            else:
+                filename = None
+        else:
+            filename = f"{session.name}.folded"
+            with open(os.path.join(self.directory, filename), "w") as f:
+                for stack, count in session.samples.most_common():
+                    f.write(f"{stack} {count}\n")
+            leaves = Counter()
+            for stack, count in session.samples.items():
+                leaves[stack.rsplit(";", 1)[-1]] += count
+            total = sum(leaves.values()) or 1
+            for leaf, count in leaves.most_common(25):
+                summary.write(f"{100 * count / total:5.1f}%  {leaf}\n")
+        self._last = {
+            "mode": session.mode,
+            "calls": session.calls,
+            "samples": sum(session.samples.values()),
+            "file": filename,
+            "summary": summary.getvalue(),
+        }
+        logger.info(f"Profiling finished: {session.mode}, {session.calls} calls, file {filename}")
+        return self._last
+
+    # -- Memory --------------------------------------------------------------
+
+    def memory_snapshot(self, top: int = 20, frames: int = 1) -> Dict[str, Any]:
+        """
+        Take a tracemalloc snapshot and diff it against the previous one.
+
+        The first call starts tracing (which slows allocation-heavy code
+        until memory_stop()), so its diff is empty.
+
+        Args:
+            top: Allocation sites to report
+            frames: Stack frames kept per allocation when tracing starts
+
+        Returns:
+            Traced and peak MB, the snapshot file and the top allocation
+            sites by growth since the previous snapshot
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            self._snapshot = None
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        previous, self._snapshot = self._snapshot, snapshot
+        os.makedirs(self.directory, exist_ok=True)
+        filename = time.strftime("%Y%m%d-%H%M%S") + "-memory.tracemalloc"
+        snapshot.dump(os.path.join(self.directory, filename))
+        stats = snapshot.compare_to(previous, "lineno") if previous is not None else []
+        traced, peak = tracemalloc.get_traced_memory()
+        return {
+            "file": filename,
+            "traced_mb": round(traced / 2**20, 2),
+            "peak_mb": round(peak / 2**20, 2),
+            "top": [str(stat) for stat in stats[:top]],
+        }
+
+    def memory_stop(self) -> bool:
+        """
+        Stop tracing allocations.
+
+        Returns:
+            True if tracing was running
+        """
+        tracing = tracemalloc.is_tracing()
+        tracemalloc.stop()
+        self._snapshot = None
+        return tracing
+
+
+PROFILER = Profiler(load_config()["profile_dir"])
+profiled = PROFILER.profiled
@@ -0,0 +1,89 @@
+"""
+Content-addressed storage for uploaded files
+
+Uploads are hashed while they stream to disk, never held in memory whole,
+and (optionally) kept as `<folder>/<sha256>.pdf`, so identical uploads share
+one file and different files with the same name never overwrite each other.
+"""
+
+import hashlib
+import os
+import tempfile
+import time
+from typing import BinaryIO, Tuple
+
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def receive_upload(
+    stream: BinaryIO,
+    folder: str,
+    keep: bool = True,
+    extension: str = ".pdf"
+) -> Tuple[str, str, int]:
+    """
+    Read an upload once, hashing it and writing it to disk as it arrives.
+
+    Args:
+        stream: Incoming file stream
+        folder: Upload folder
+        keep: Whether to keep the content-addressed copy; if False the file
+            keeps a unique temporary name and the caller removes it once
+            it has been read
+        extension: Extension for the stored file
+
+    Returns:
+        Tuple of (sha256 hex digest, path of the file on disk, size in bytes)
+    """
+    hasher = hashlib.sha256()
+    size = 0
+    os.makedirs(folder, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=folder, suffix=".part", delete=False) as temp:
+        try:
+            for block in iter(lambda: stream.read(CHUNK_SIZE), b""):
+                hasher.update(block)
+                temp.write(block)
+                size += len(block)
+        except BaseException:
+            temp.close()
+            os.remove(temp.name)
+            raise
+
+    digest = hasher.hexdigest()
+    if not keep:
+        return digest, temp.name, size
+    path = os.path.join(folder, f"{digest}{extension}")
+    # Same hash means same bytes; replacing is atomic and harmless
+    os.replace(temp.name, path)
+    return digest, path, size
+
+
+def prune_uploads(folder: str, max_age_days: float) -> int:
+    """
+    Delete stored uploads older than `max_age_days` (0 keeps everything).
+
+    Args:
+        folder: Upload folder
+        max_age_days: Maximum age by modification time
+
+    Returns:
+        Number of files deleted
+    """
+    if max_age_days <= 0 or not os.path.isdir(folder):
+        return 0
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    for entry in os.scandir(folder):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except OSError as e:
+            logger.warning(f"Could not prune {entry.path}: {e}")
+    if removed:
+        logger.info(f"Pruned {removed} uploads older than {max_age_days} days")
+    return removed
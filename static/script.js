@@ -7,10 +7,19 @@ const chatBox = document.getElementById('chatBox');
 const docCount = document.getElementById('docCount');
 const modelName = document.getElementById('modelName');
 const clearBtn = document.getElementById('clearBtn');
+const newChatBtn = document.getElementById('newChatBtn');
 
 // State
 let isUploading = false;
 
+// Speculative retrieval while typing (see /prefetch)
+const PREFETCH_DELAY_MS = 300;
+const PREFETCH_MIN_LENGTH = 8;
+let prefetchEnabled = true;
+let prefetchTimer = null;
+let prefetchController = null;
+let lastPrefetch = '';
+
 // Initialize on page load
 document.addEventListener('DOMContentLoaded', function() {
     updateStatus();
@@ -43,6 +52,11 @@ function setupEventListeners() {
         e.stopPropagation();
         handleClear();
     });
+    newChatBtn.addEventListener('click', function(e) {
+        e.preventDefault();
+        e.stopPropagation();
+        handleNewChat();
+    });
     queryInput.addEventListener('keypress', function(e) {
         if (e.key === 'Enter') {
             console.log('Enter key pressed on query input, preventDefault');
@@ -51,9 +65,65 @@ function setupEventListeners() {
             handleQuery();
         }
     });
+    queryInput.addEventListener('input', schedulePrefetch);
     console.log('Event listeners set up complete');
 }
 
+// Prefetch retrieval for the question once the user pauses typing
+function schedulePrefetch() {
+    if (!prefetchEnabled) {
+        return;
+    }
+    clearTimeout(prefetchTimer);
+    prefetchTimer = setTimeout(function() {
+        const query = queryInput.value.trim();
+        if (query === lastPrefetch) {
+            return;
+        }
+        if (query.length < PREFETCH_MIN_LENGTH) {
+            if (lastPrefetch) {
+                // Input cleared: drop the stale prefetch
+                lastPrefetch = '';
+                sendPrefetch('');
+            }
+            return;
+        }
+        lastPrefetch = query;
+        sendPrefetch(query);
+    }, PREFETCH_DELAY_MS);
+}
+
+function sendPrefetch(query) {
+    cancelPrefetch();
+    prefetchController = new AbortController();
+    fetch('/prefetch', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ query: query }),
+        signal: prefetchController.signal
+    })
+    .then(response => {
+        if (response.status === 404) {
+            // Disabled on the server: stop trying for this page
+            prefetchEnabled = false;
+        }
+    })
+    .catch(() => {
+        // Aborted or failed: /query just searches as usual
+    });
+}
+
+// Stop waiting for an in-flight prefetch (the server discards superseded ones)
+function cancelPrefetch() {
+    clearTimeout(prefetchTimer);
+    if (prefetchController) {
+        prefetchController.abort();
+        prefetchController = null;
+    }
+}
+
 // Update status (document count and model name)
 function updateStatus() {
     fetch('/status')
@@ -65,6 +135,12 @@ function updateStatus() {
             if (data.model) {
                 modelName.textContent = data.model;
             }
+            // Query replicas can't ingest or clear
+            uploadBtn.disabled = clearBtn.disabled = !!data.read_only;
+            // Engines still warming up: check again shortly
+            if (data.warming) {
+                setTimeout(updateStatus, 1000);
+            }
         })
         .catch(error => console.error('Error updating status:', error));
 }
@@ -125,7 +201,11 @@ function handleUpload() {
         uploadBtn.disabled = false;
         uploadBtn.textContent = 'Upload PDF';
         
-        if (data.success) {
+        if (data.success && data.duplicate) {
+            showMessage(data.message, 'success');
+            fileInput.value = '';
+            updateStatus();
+        } else if (data.success) {
             showMessage('PDF uploaded successfully! Processed ' + (data.chunks || 0) + ' chunks.', 'success');
             fileInput.value = '';
             updateStatus();
@@ -158,6 +238,8 @@ function handleQuery() {
     // Add user message to chat
     addMessageToChat(query, 'user');
     queryInput.value = '';
+    cancelPrefetch();
+    lastPrefetch = '';
     sendBtn.disabled = true;
     console.log('Sending fetch request...');
     
@@ -284,6 +366,27 @@ function handleClear() {
     });
 }
 
+// Start a new conversation: the server forgets this session's history
+function handleNewChat() {
+    cancelPrefetch();
+    lastPrefetch = '';
+    fetch('/conversation/reset', {
+        method: 'POST',
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            chatBox.innerHTML = '';
+        } else {
+            showMessage('Error: ' + data.message, 'error');
+        }
+    })
+    .catch(error => {
+        console.error('Reset error:', error);
+        showMessage('Error starting a new chat: ' + error.message, 'error');
+    });
+}
+
 // Escape HTML to prevent XSS
 function escapeHtml(text) {
     const div = document.createElement('div');
@@ -0,0 +1,68 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Module globals of app.py that tests replace
+APP_GLOBALS = ("pipeline", "query_engine", "chroma_manager", "conversations", "prefetches", "capture")
+
+
+@pytest.fixture
+def app_module():
+    """app.py, with its engines, caches, config and admission pools restored after the test"""
+    import app
+
+    saved = {name: getattr(app, name) for name in APP_GLOBALS}
+    config = dict(app.config)
+    admission = dict(app.admission)
+    was_ready = app.ready.is_set()
+    profile_dir = app.PROFILER.directory
+    try:
+        yield app
+    finally:
+        for name, value in saved.items():
+            setattr(app, name, value)
+        app.config.clear()
+        app.config.update(config)
+        app.admission.clear()
+        app.admission.update(admission)
+        if was_ready:
+            app.ready.set()
+        else:
+            app.ready.clear()
+        app.PROFILER.directory = profile_dir
+
+
+@pytest.fixture
+def app_client(app_module, tmp_path_factory):
+    """
+    Factory for a test client of app.py serving a fresh store of synthetic
+    pages (hash embeddings, fake chat model).
+
+    Keyword arguments: pages, llm, flask_config, and any QueryEngine option.
+    The store is app_module.chroma_manager, the model app_module.query_engine.llm.
+    """
+    from benchmarks.fakes import FakeChatModel, HashEmbeddings, synthetic_pages
+    from src.core.conversation import ConversationStore
+    from src.core.page_cache import PageCache
+    from src.core.query_engine import QueryEngine
+    from src.core.rag_pipeline import RAGPipeline
+    from src.database.chroma_manager import ChromaManager
+
+    def build(pages=20, llm=None, flask_config=None, **engine_options):
+        store = ChromaManager(str(tmp_path_factory.mktemp("store")), embedding_function=HashEmbeddings())
+        pipeline = RAGPipeline(data_path="data", chroma_path=store.persist_directory, vector_store=store,
+                               page_cache=PageCache(str(tmp_path_factory.mktemp("pages"))))
+        if pages:
+            pipeline.add_chunks_to_database(pipeline.split_documents(synthetic_pages(pages)))
+        app_module.pipeline = pipeline
+        app_module.chroma_manager = store
+        app_module.conversations = ConversationStore(path=os.path.join(store.persist_directory, "conversations.db"))
+        app_module.query_engine = QueryEngine(chroma_path=store.persist_directory, vector_store=store,
+                                              llm=llm or FakeChatModel(), **engine_options)
+        app_module.ready.set()
+        return app_module.create_app(flask_config).test_client()
+
+    return build
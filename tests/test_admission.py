@@ -0,0 +1,112 @@
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import FakeChatModel
+from src.utils.admission import AdmissionPool, AdmissionRejected
+from src.utils.metrics import ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTED, ADMISSION_WAIT_SECONDS
+
+
+def test_pool_rejects_when_queue_is_full_and_pools_are_independent():
+    """Beyond concurrency + queue, admit() fails fast; other pools are unaffected"""
+    pool = AdmissionPool('test_full', max_concurrency=1, max_queue=1, max_wait=5.0)
+    other = AdmissionPool('test_other', max_concurrency=1, max_queue=0, max_wait=0.0)
+    release = threading.Event()
+    waiter_admitted = threading.Event()
+
+    def hold():
+        with pool.admit():
+            release.wait(5)
+
+    def wait_in_queue():
+        with pool.admit():
+            waiter_admitted.set()
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    while pool.active == 0:
+        pass
+    waiter = threading.Thread(target=wait_in_queue)
+    waiter.start()
+    while pool.waiting == 0:
+        pass
+    assert ADMISSION_QUEUE_DEPTH.get(pool='test_full') == 1
+
+    with pytest.raises(AdmissionRejected) as excinfo:
+        with pool.admit():
+            pass
+    assert excinfo.value.retry_after >= 1
+    assert ADMISSION_REJECTED.get(pool='test_full', reason='queue_full') == 1
+
+    # A saturated pool doesn't block a different one
+    with other.admit():
+        pass
+
+    release.set()
+    holder.join()
+    waiter.join()
+    assert waiter_admitted.is_set()
+    assert ADMISSION_WAIT_SECONDS.count(pool='test_full') == 2
+
+
+def test_query_burst_never_exceeds_provider_rate_limit(app_client):
+    """A burst larger than the pool gets 200s and fast 503s, never provider 429s"""
+    llm = FakeChatModel(latency=0.3, max_concurrency=2)
+    client = app_client(llm=llm, admission=AdmissionPool('query', max_concurrency=2, max_queue=2, max_wait=5.0))
+
+    burst = 12
+    barrier = threading.Barrier(burst)
+    responses = [None] * burst
+
+    def worker(i):
+        barrier.wait()
+        responses[i] = client.post('/query', json={'query': f'What is offense number {i}?'})
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(burst)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    statuses = [response.status_code for response in responses]
+    assert llm.rate_limited == 0
+    assert set(statuses) <= {200, 503}
+    assert statuses.count(200) >= 4
+    rejected = [response for response in responses if response.status_code == 503]
+    assert rejected
+    assert all(int(response.headers['Retry-After']) >= 1 for response in rejected)
+
+
+def test_coalesced_and_precomputed_queries_need_no_slot(app_module, app_client):
+    """A burst of one hot question makes one LLM call; stored answers are served while the pool is full"""
+    llm = FakeChatModel(latency=0.3)
+    pool = AdmissionPool('query', max_concurrency=1, max_queue=0, max_wait=0.0)
+    client = app_client(llm=llm, admission=pool)
+
+    burst = 12
+    barrier = threading.Barrier(burst)
+    statuses = [None] * burst
+
+    def worker(i):
+        barrier.wait()
+        statuses[i] = client.post('/query', json={'query': 'What is cyberterrorism?'}).status_code
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(burst)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert statuses == [200] * burst
+    assert llm.calls == 1
+
+    assert app_module.query_engine.precompute("What is the punishment for hacking?")
+    client = app_module.create_app().test_client()  # new session
+    with pool.admit():  # every slot taken
+        response = client.post('/query', json={'query': 'What is the punishment for hacking?'})
+        assert client.post('/query', json={'query': 'What is offense number 7?'}).status_code == 503
+        assert response.status_code == 200
+    assert llm.calls == 2  # the burst and precompute()
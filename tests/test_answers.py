@@ -0,0 +1,129 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import FakeChatModel, HashEmbeddings, synthetic_pages
+from src.core import answers
+from src.core.answers import AnswerStore, QueryLog
+from src.core.query_engine import QueryEngine
+from src.core.rag_pipeline import RAGPipeline
+from src.database.chroma_manager import ChromaManager
+
+
+def test_query_log_counts_normalized_questions(tmp_path):
+    """Buffered counts are merged into the file and ranked by frequency"""
+    path = str(tmp_path / "queries.db")
+    log = QueryLog(path, flush_size=2)
+    for question in ["what is theft", "what is fraud", "what is theft", "what is theft"]:
+        log.record(question)
+    other_process = QueryLog(path)
+    other_process.record("what is fraud")
+    other_process.flush()
+    assert log.top(5) == [("what is theft", 3), ("what is fraud", 2)]
+    assert log.top(5, min_count=3) == [("what is theft", 3)]
+
+
+def test_request_path_neither_connects_nor_writes(monkeypatch, tmp_path):
+    """Counts are written by a background thread; answer misses reuse the thread's connection"""
+    directory = str(tmp_path)
+    log = QueryLog(os.path.join(directory, "queries.db"), flush_interval=0.05, flush_size=2)
+    flushed_on = []
+    flush = log.flush
+    monkeypatch.setattr(log, "flush", lambda: flushed_on.append(threading.current_thread()) or flush())
+    for question in ["what is theft", "what is fraud", "what is theft"]:
+        log.record(question)
+    time.sleep(0.2)
+    assert flushed_on and threading.current_thread() not in flushed_on
+    assert QueryLog(log.path).top(5) == [("what is theft", 2), ("what is fraud", 1)]
+
+    store = AnswerStore(os.path.join(directory, "answers.db"))
+    store.get("what is theft", 5, 0)
+    connects = []
+    connect = answers._connect
+    monkeypatch.setattr(answers, "_connect", lambda *args: connects.append(args) or connect(*args))
+    for i in range(20):
+        assert store.get(f"unknown question {i}", 5, 0) is None
+    assert connects == []
+
+    # A replaced file (delete_all) is reopened, so new answers reach other processes
+    os.remove(store.path)
+    store.put("what is theft", 5, 1, "Taking property.", ["a:1"])
+    assert len(connects) == 1
+    assert AnswerStore(store.path).get("what is theft", 5, 1) == ("Taking property.", ["a:1"])
+
+
+def test_precomputed_answers_are_served_until_the_corpus_changes(tmp_path):
+    """A warmed question skips the LLM; any ingest or clear invalidates it"""
+    store = ChromaManager(str(tmp_path), embedding_function=HashEmbeddings(),
+                          read_only=False)
+    pipeline = RAGPipeline(data_path="data", chroma_path=store.persist_directory, vector_store=store)
+    pipeline.add_chunks_to_database(pipeline.split_documents(synthetic_pages(10)))
+    llm = FakeChatModel()
+    engine = QueryEngine(chroma_path=store.persist_directory, vector_store=store, llm=llm,
+                         relevance_threshold=0.0)
+    assert engine.precompute("What is the punishment for hacking?")
+    assert llm.calls == 1
+
+    # A new process (e.g. another worker) loads it at startup
+    restarted = QueryEngine(chroma_path=store.persist_directory, vector_store=store, llm=llm,
+                            relevance_threshold=0.0)
+    answer, sources = restarted.query("what is the punishment for hacking")
+    assert llm.calls == 1 and sources
+    assert restarted.query_log.top(1) == [("what is the punishment for hacking", 1)]
+
+    pipeline.add_chunks_to_database(pipeline.split_documents(synthetic_pages(12)[10:]))
+    restarted.query("What is the punishment for hacking?")
+    assert llm.calls == 2
+
+    assert engine.precompute("What is the punishment for hacking?")
+    store.delete_all()
+    assert len(AnswerStore(engine.answer_store.path)) == 0
+    # The log survives a clear
+    assert restarted.query_log.top(1)[0][1] == 2
+
+
+def test_misses_are_remembered_per_corpus_version(tmp_path):
+    """A question without an answer isn't looked up again until the miss expires or the corpus changes"""
+    path = str(tmp_path / "answers.db")
+    store = AnswerStore(path, miss_ttl=0.2)
+    assert store.get("what is theft", 5, 1) is None
+
+    # Written by another process (e.g. the warmup job) after the miss
+    AnswerStore(path).put("what is theft", 5, 1, "Taking property.", ["a:1"])
+    assert store.get("what is theft", 5, 1) is None
+    time.sleep(0.25)
+    assert store.get("what is theft", 5, 1) == ("Taking property.", ["a:1"])
+
+    AnswerStore(path).put("what is fraud", 5, 2, "Deceit.", ["a:2"])
+    assert store.get("what is fraud", 5, 2) == ("Deceit.", ["a:2"])
+    # Answers this process stores are found at once
+    assert store.get("what is forgery", 5, 2) is None
+    store.put("what is forgery", 5, 2, "Making false documents.", ["a:3"])
+    assert store.get("what is forgery", 5, 2) == ("Making false documents.", ["a:3"])
+
+
+def test_answers_are_not_served_under_other_settings(tmp_path):
+    """An answer precomputed with another model, threshold or retrieval mode is computed again"""
+    store = ChromaManager(str(tmp_path), embedding_function=HashEmbeddings(),
+                          read_only=False)
+    pipeline = RAGPipeline(data_path="data", chroma_path=store.persist_directory, vector_store=store)
+    pipeline.add_chunks_to_database(pipeline.split_documents(synthetic_pages(10)))
+    llm = FakeChatModel()
+    engine = QueryEngine(chroma_path=store.persist_directory, vector_store=store, llm=llm,
+                         relevance_threshold=0.0)
+    assert engine.precompute("What is the punishment for hacking?")
+
+    for options in ({"relevance_threshold": -1.0}, {"relevance_threshold": 0.0, "model_name": "other/model"},
+                    {"relevance_threshold": 0.0, "retrieval_mode": "hierarchical"}):
+        calls = llm.calls
+        other = QueryEngine(chroma_path=store.persist_directory, vector_store=store, llm=llm, **options)
+        other.query("What is the punishment for hacking?")
+        assert llm.calls == calls + 1, options
+
+    calls = llm.calls
+    same = QueryEngine(chroma_path=store.persist_directory, vector_store=store, llm=llm, relevance_threshold=0.0)
+    same.query("What is the punishment for hacking?")
+    assert llm.calls == calls
@@ -0,0 +1,37 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import HashEmbeddings
+from benchmarks.run_benchmarks import compare, metric
+
+
+def test_hash_embeddings_are_deterministic():
+    """Same text gives the same vector; related texts are closer than unrelated ones"""
+    embeddings = HashEmbeddings(dimensions=128)
+    a = embeddings.embed_query("punishment for hacking computer system")
+    b = embeddings.embed_query("punishment for hacking computer system")
+    related = embeddings.embed_query("hacking a computer system is punished")
+    unrelated = embeddings.embed_query("weather forecast sunny tomorrow")
+    dot = lambda x, y: sum(i * j for i, j in zip(x, y))
+    assert a == b
+    assert dot(a, related) > dot(a, unrelated)
+
+
+def test_compare_flags_regressions_in_the_right_direction():
+    """Latency going up and throughput going down both count as regressions"""
+    baseline = {
+        "search_ms": metric(10.0, "ms", "lower"),
+        "ingest_per_s": metric(100.0, "chunks/s", "higher"),
+        "count_ms": metric(1.0, "ms", "lower"),
+    }
+    current = {
+        "search_ms": metric(15.0, "ms", "lower"),
+        "ingest_per_s": metric(60.0, "chunks/s", "higher"),
+        "count_ms": metric(0.5, "ms", "lower"),
+    }
+    regressions = compare(current, baseline, threshold=0.25)
+    assert len(regressions) == 2
+    assert any(line.startswith("search_ms") for line in regressions)
+    assert any(line.startswith("ingest_per_s") for line in regressions)
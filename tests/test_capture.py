@@ -0,0 +1,39 @@
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.capture import RequestCapture, read_capture
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_queries_are_captured_and_replayed(app_module, app_client, monkeypatch, tmp_path):
+    """Each /query becomes one compact record that replay.py can send again"""
+    monkeypatch.setattr(app_module, "TOP_K", 3)
+    first = app_client(pages=10)
+    second = app_module.create_app().test_client()
+    path = str(tmp_path / "capture.jsonl")
+    app_module.capture = RequestCapture(path, flush_size=1000)
+    response = first.post('/query', json={'query': 'What is the punishment for hacking?'})
+    assert 0 < len(response.get_json()['sources']) <= 3
+    first.post('/query', json={'query': 'What about the fine for it?'})
+    second.post('/query', json={'query': 'What is the punishment for hacking?'})
+    second.post('/query', json={'query': ''})
+    app_module.capture.flush()
+
+    records = list(read_capture(path))
+    assert [record['q'] for record in records] == [
+        'What is the punishment for hacking?', 'What about the fine for it?', 'What is the punishment for hacking?'
+    ]
+    assert records[0]['sid'] == records[1]['sid'] != records[2]['sid']
+    assert records[0]['status'] == 200 and records[0]['k'] == 3
+    assert 'llm' in records[0]['stages'] and records[0]['cache']['coalesce'] == 'miss'
+
+    result = subprocess.run(
+        [sys.executable, "scripts/replay.py", path, "--local", "--speed", "0", "--pages", "10", "--json"],
+        cwd=ROOT, capture_output=True, text=True, timeout=300
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert '"errors": 0' in result.stdout and '"requests": 3' in result.stdout
@@ -0,0 +1,211 @@
+import os
+import statistics
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fakes import FakeChatModel, HashEmbeddings, synthetic_pages, OFFENSES
+from src.core.answers import AnswerStore
+from src.core.conversation import Conversation, ConversationStore, estimate_tokens
+from src.core.query_engine import QueryEngine
+from src.core.rag_pipeline import RAGPipeline
+from src.database.chroma_manager import ChromaManager
+
+
+class RecordingLLM:
+    """Wraps FakeChatModel and records the size of every prompt it receives"""
+
+    def __init__(self):
+        self.model = FakeChatModel()
+        self.prompt_tokens = []
+
+    def invoke(self, messages):
+        self.prompt_tokens.append(estimate_tokens(" ".join(str(m.content) for m in messages)))
+        return self.model.invoke(messages)
+
+
+def test_store_evicts_least_recently_used_and_idle_sessions():
+    """The store never holds more than max_sessions and drops idle ones"""
+    store = ConversationStore(max_sessions=2, ttl=0.2)
+    first = store.get("a")
+    second = store.get("b")
+    assert store.get("a") is first
+    store.get("c")
+    assert len(store) == 2
+    assert store.get("a") is first
+    assert store.get("b") is not second
+
+    time.sleep(0.3)
+    store.get("d")
+    assert len(store) == 1
+
+
+WORKER = textwrap.dedent("""
+    import sys
+    from src.core.conversation import ConversationStore
+
+    path, session_id, question = sys.argv[1:4]
+    conversation = ConversationStore(path=path).get(session_id)
+    conversation.add_turn(question, conversation.standalone_query(question), "Answered by " + question)
+    print(conversation.last_query)
+""")
+
+
+def test_conversations_are_shared_across_worker_processes(tmp_path):
+    """A turn recorded by one process is the history another process sees next"""
+    path = str(tmp_path / "sessions" / "conversations.db")
+    store = ConversationStore(path=path)
+    first = "What is the punishment for cyberterrorism?"
+    store.get("s").add_turn(first, first, "Imprisonment for life.")
+
+    def other_worker(question):
+        result = subprocess.run([sys.executable, "-c", WORKER, path, "s", question], cwd=ROOT,
+                                env=dict(os.environ, PYTHONPATH=ROOT), capture_output=True, text=True,
+                                timeout=60)
+        assert result.returncode == 0, result.stderr
+        return result.stdout.strip().splitlines()[-1]
+
+    # The other worker rewrites the follow-up with this worker's turn...
+    assert "cyberterrorism" in other_worker("What about the fine for it?")
+    # ...and this worker, holding an older copy, picks up its turn
+    conversation = store.get("s")
+    assert [q for q, _ in conversation.turns] == [first, "What about the fine for it?"]
+    conversation.add_turn("Define hacking", "Define hacking", "Unauthorised access.")
+    other_worker("And the penalty?")
+    assert len(store.get("s").turns) == 4
+
+    # A reset in another process clears the conversation here too
+    ConversationStore(path=path).reset("s")
+    assert not store.get("s").turns
+
+
+def test_follow_up_questions_become_standalone_queries():
+    """Follow-ups borrow the previous query's content words; new topics don't"""
+    conversation = Conversation()
+    question = "What is the punishment for hacking with computer system?"
+    conversation.add_turn(question, question, "Imprisonment up to three years.")
+
+    rewritten = conversation.standalone_query("What about the fine for it?")
+    assert "hacking" in rewritten and "punishment" in rewritten
+    assert conversation.standalone_query("Define cyberterrorism") == "Define cyberterrorism"
+
+
+def test_standalone_questions_with_pronouns_are_not_follow_ups():
+    """Only short questions, or a demonstrative standing alone, lean on the previous turn"""
+    conversation = Conversation()
+    conversation.add_turn("What is hacking?", "What is hacking?", "Unauthorised access.")
+
+    for question in ("Is it bailable?", "What is the fine for that?", "Does that apply to minors?",
+                     "And for companies?", "What about the fine for it?"):
+        assert conversation.is_follow_up(question), question
+    for question in ("What is the punishment under this act?",
+                     "Does it apply to companies registered outside India under the IT Act?",
+                     "What does that section say about data theft by employees?",
+                     "What is the IT Act?", "Which offences does this chapter cover?"):
+        assert not conversation.is_follow_up(question), question
+
+
+def test_only_follow_ups_depend_on_history(tmp_path):
+    """Standalone questions mid-conversation use stored answers and coalesce across sessions"""
+    store = ChromaManager(str(tmp_path / "store"), embedding_function=HashEmbeddings())
+    pipeline = RAGPipeline(data_path="data", chroma_path=store.persist_directory, vector_store=store)
+    pipeline.add_chunks_to_database(pipeline.split_documents(synthetic_pages(20)))
+    llm = FakeChatModel()
+    answers = AnswerStore(str(tmp_path / "answers.db"))
+    engine = QueryEngine(chroma_path=store.persist_directory, vector_store=store, llm=llm,
+                         answer_store=answers)
+    sessions = ConversationStore()
+    for name in ("a", "b"):
+        sessions.get(name).add_turn(f"What is {name}?", f"What is {name}?", f"{name} is a letter.")
+
+    stored = "What is the punishment for cyberterrorism?"
+    assert engine.precompute(stored, top_k=5)
+    calls = llm.calls
+    engine.query(stored, top_k=5, conversation=sessions.get("a"))
+    assert llm.calls == calls
+
+    # The same new question from two sessions with different histories
+    llm.latency = 0.3
+    barrier = threading.Barrier(2)
+
+    def ask(name):
+        barrier.wait()
+        engine.query("What is the punishment for hacking?", top_k=5, conversation=sessions.get(name))
+
+    threads = [threading.Thread(target=ask, args=(name,)) for name in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert llm.calls == calls + 1
+
+    # A follow-up is answered with its own history, never from the store
+    llm.latency = 0.0
+    engine.query("What about the fine for it?", top_k=5, conversation=sessions.get("a"))
+    assert llm.calls == calls + 2
+    assert len(sessions.get("a").turns) == 4
+
+
+def test_prompt_size_and_latency_stay_flat_over_fifty_turns(tmp_path):
+    """History is summarized, so turn 50 costs about the same as turn 5"""
+    store = ChromaManager(str(tmp_path), embedding_function=HashEmbeddings())
+    pipeline = RAGPipeline(data_path="data", chroma_path=store.persist_directory, vector_store=store)
+    pipeline.add_chunks_to_database(pipeline.split_documents(synthetic_pages(20)))
+    llm = RecordingLLM()
+    engine = QueryEngine(chroma_path=store.persist_directory, vector_store=store, llm=llm,
+                         history_token_budget=400)
+    conversation = ConversationStore(summary_budget=400 // 3).get("session")
+
+    latencies = []
+    for turn in range(50):
+        question = (f"What is the punishment for {OFFENSES[turn % len(OFFENSES)]}?"
+                    if turn % 2 == 0 else "And what is the fine for it?")
+        started = time.perf_counter()
+        engine.query(question, top_k=3, conversation=conversation)
+        latencies.append(time.perf_counter() - started)
+
+    early, late = llm.prompt_tokens[5:10], llm.prompt_tokens[-5:]
+    assert max(late) <= max(early) * 1.1
+    assert max(llm.prompt_tokens) <= 400 + 3 * 200 + 100  # history + 3 chunks + template
+    assert statistics.median(latencies[-10:]) < statistics.median(latencies[5:15]) * 2 + 0.02
+
+
+def test_query_endpoint_keeps_history_per_session(app_module, app_client):
+    """Requests sharing a session cookie share one conversation"""
+    client = app_client()
+
+    client.post('/query', json={'query': 'What is the punishment for cyberterrorism?'})
+    client.post('/query', json={'query': 'What about the fine for it?'})
+    with client.session_transaction() as flask_session:
+        conversation_id = flask_session['conversation_id']
+    conversation = app_module.conversations.get(conversation_id)
+    assert len(conversation.turns) == 2
+    assert "cyberterrorism" in conversation.last_query
+    # Another worker opening the same file continues the conversation
+    other_worker = ConversationStore(path=app_module.conversations.path)
+    assert other_worker.get(conversation_id).last_query == conversation.last_query
+
+    assert client.post('/conversation/reset').status_code == 200
+    with client.session_transaction() as flask_session:
+        assert 'conversation_id' not in flask_session
+
+
+def test_clear_resets_conversations_and_prefetches(app_module, app_client):
+    """Clearing the database forgets every history and prefetched result"""
+    app_module.config['prefetch'] = True
+    client = app_client()
+    client.post('/query', json={'query': 'What is the punishment for cyberterrorism?'})
+    assert client.post('/prefetch', json={'query': 'What about the fine for'}).get_json()['prefetched']
+    with client.session_transaction() as flask_session:
+        conversation_id = flask_session['conversation_id']
+
+    assert client.post('/clear').get_json()['success']
+    assert not app_module.conversations.get(conversation_id).turns
+    assert app_module.prefetches.take(conversation_id) is None
+    other_worker = ConversationStore(path=app_module.conversations.path)
+    assert not other_worker.get(conversation_id).turns
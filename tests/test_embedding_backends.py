@@ -0,0 +1,65 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database.chroma_manager import ChromaManager, EmbeddingMismatchError
+from src.models import embedding_factory
+from src.models.embedding_factory import (
+    BatchingEmbeddings, describe_embeddings, get_embedding_function, register_embedding_backend
+)
+from src.models.hash_embeddings import HashingEmbeddings
+
+
+def test_backend_is_chosen_by_config(monkeypatch):
+    """EMBEDDING_BACKEND picks a registered factory; wrappers keep its identity"""
+    monkeypatch.setattr(embedding_factory, "_embeddings", None)
+    monkeypatch.setenv("EMBEDDING_BACKEND", "hash")
+    monkeypatch.setenv("EMBEDDING_DIMENSIONS", "32")
+    monkeypatch.setenv("EMBED_BATCH_WINDOW_MS", "5")
+    embeddings = get_embedding_function()
+    assert isinstance(embeddings, BatchingEmbeddings)
+    assert describe_embeddings(embeddings) == {"model": "hash", "dimensions": 32}
+    assert embeddings.embed_query("stolen laptop") == HashingEmbeddings(32).embed_query("stolen laptop")
+
+    monkeypatch.setattr(embedding_factory, "_embeddings", None)
+    monkeypatch.setenv("EMBEDDING_BACKEND", "custom")
+    monkeypatch.setenv("EMBED_BATCH_WINDOW_MS", "0")
+    with pytest.raises(ValueError):
+        get_embedding_function()
+    register_embedding_backend("custom", lambda config: HashingEmbeddings(8))
+    try:
+        assert describe_embeddings(get_embedding_function())["dimensions"] == 8
+    finally:
+        embedding_factory.EMBEDDING_BACKENDS.pop("custom")
+        monkeypatch.setattr(embedding_factory, "_embeddings", None)
+
+
+def test_hashing_embeddings_are_deterministic_unit_vectors():
+    """Same text, same vector; shared words score closer than unrelated text"""
+    embeddings = HashingEmbeddings(dimensions=128)
+    first, second = embeddings.embed_documents(["theft of a vehicle", "theft of a vehicle"])
+    unrelated = embeddings.embed_query("annual tax return deadline")
+    related = embeddings.embed_query("vehicle theft")
+    dot = lambda a, b: sum(x * y for x, y in zip(a, b))
+    assert first == second
+    assert abs(dot(first, first) - 1.0) < 1e-9
+    assert dot(first, related) > dot(first, unrelated)
+
+
+def test_store_rejects_a_different_embedding_model(tmp_path):
+    """The first write records model and width; mismatches are caught on open and write"""
+    path = str(tmp_path)
+    store = ChromaManager(path, embedding_function=HashingEmbeddings(64), read_only=False)
+    assert store.embedding_identity() == {}
+    store.add_embeddings(["a"], [HashingEmbeddings(64).embed_query("text")], ["text"], [None])
+    assert store.embedding_identity() == {"embedding_model": "hash", "embedding_dimensions": 64}
+
+    with pytest.raises(EmbeddingMismatchError):
+        store.add_embeddings(["b"], [[0.0] * 16], ["text"], [None])
+    with pytest.raises(EmbeddingMismatchError):
+        ChromaManager(path, embedding_function=HashingEmbeddings(256), read_only=True)
+    # Reopening with the same model is fine
+    ChromaManager(path, embedding_function=HashingEmbeddings(64), read_only=True)
@@ -0,0 +1,82 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_openai_server import hash_embedding
+from benchmarks.fakes import HashEmbeddings
+from src.models.embedding_factory import BatchingEmbeddings
+
+
+class RateLimitedEmbeddings(HashEmbeddings):
+    """Provider stand-in: each call takes `latency` and at most 2 run at once"""
+
+    def __init__(self, latency):
+        super().__init__(dimensions=32, latency=latency)
+        self.slots = threading.Semaphore(2)
+        self.batch_sizes = []
+
+    def embed_documents(self, texts):
+        with self.slots:
+            self.batch_sizes.append(len(texts))
+            return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        with self.slots:
+            self.batch_sizes.append(1)
+            return super().embed_query(text)
+
+
+def _concurrent_queries(embeddings, n):
+    texts = [f"question number {i} about hacking" for i in range(n)]
+    results = [None] * n
+    barrier = threading.Barrier(n)
+
+    def worker(i):
+        barrier.wait()
+        results[i] = embeddings.embed_query(texts[i])
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return texts, results, time.perf_counter() - started
+
+
+def test_concurrent_queries_are_batched_and_each_caller_gets_its_vector():
+    """32 concurrent queries become a few embed_documents calls with correct vectors"""
+    base = RateLimitedEmbeddings(latency=0.05)
+    batcher = BatchingEmbeddings(base, max_batch_size=16, max_wait_ms=20)
+    texts, results, _ = _concurrent_queries(batcher, 32)
+
+    assert results == [hash_embedding(text, 32) for text in texts]
+    assert len(base.batch_sizes) <= 4
+    assert max(base.batch_sizes) <= 16
+
+
+def test_batching_raises_throughput_under_load():
+    """Against a provider with limited concurrency, batching finishes much sooner"""
+    _, _, unbatched = _concurrent_queries(RateLimitedEmbeddings(latency=0.05), 32)
+    batcher = BatchingEmbeddings(RateLimitedEmbeddings(latency=0.05), max_batch_size=32, max_wait_ms=10)
+    _, _, batched = _concurrent_queries(batcher, 32)
+    # Unbatched: 32 calls / 2 slots x 50ms = ~800ms
+    assert batched < unbatched / 3
+
+
+def test_errors_reach_every_caller_in_the_batch():
+    """A failed batch call raises in each waiting caller"""
+    class Failing(HashEmbeddings):
+        def embed_documents(self, texts):
+            raise RuntimeError("provider down")
+
+    batcher = BatchingEmbeddings(Failing(), max_wait_ms=5)
+    try:
+        batcher.embed_query("anything")
+    except RuntimeError as e:
+        assert "provider down" in str(e)
+    else:
+        raise AssertionError("expected the provider error")
@@ -0,0 +1,75 @@
+import os
+import sys
+
+from langchain_core.documents import Document
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import FakeChatModel, synthetic_statutes
+from src.core.query_engine import QueryEngine
+from src.core.rag_pipeline import RAGPipeline
+from src.core.sections import assign_sections
+from src.database.chroma_manager import ChromaManager
+from src.models.hash_embeddings import HashingEmbeddings
+
+
+def _store(path, build_sections=True):
+    store = ChromaManager(str(path), embedding_function=HashingEmbeddings(256),
+                          read_only=False, reduction="none")
+    pipeline = RAGPipeline(data_path="data", chroma_path=store.persist_directory, vector_store=store,
+                           build_sections=build_sections)
+    pages, queries = synthetic_statutes(4, 6)
+    pipeline.add_chunks_to_database(pipeline.split_documents(pages))
+    return store, queries
+
+
+def test_sections_start_at_headings():
+    """Headings open sections; heading-less runs are capped; summaries cover both levels"""
+    chunks = [
+        Document(page_content="Preamble text", metadata={"source": "act.pdf", "page": 0, "id": "act.pdf:0:0"}),
+        Document(page_content="Section 1. Theft.\nWhoever steals", metadata={"source": "act.pdf", "page": 0, "id": "act.pdf:0:1"}),
+        Document(page_content="more about theft", metadata={"source": "act.pdf", "page": 1, "id": "act.pdf:1:0"}),
+        Document(page_content="CHAPTER II\nFraud", metadata={"source": "act.pdf", "page": 2, "id": "act.pdf:2:0"}),
+    ] + [
+        Document(page_content=f"schedule row {i}", metadata={"source": "other.pdf", "page": i, "id": f"other.pdf:{i}:0"})
+        for i in range(5)
+    ]
+    summaries = assign_sections(chunks, max_chunks=3)
+
+    assert [chunk.metadata["section"] for chunk in chunks[:4]] == [
+        "act.pdf:0:0#section", "act.pdf:0:1#section", "act.pdf:0:1#section", "act.pdf:2:0#section"
+    ]
+    assert [chunk.metadata["section"] for chunk in chunks[4:]] == ["other.pdf:0:0#section"] * 3 + ["other.pdf:3:0#section"] * 2
+    titles = {summary.metadata["section"]: summary.metadata["title"] for summary in summaries}
+    assert titles["act.pdf:0:1#section"] == "Section 1. Theft."
+    assert titles["act.pdf:2:0#section"] == "CHAPTER II"
+    assert titles["act.pdf#doc"] == "act"
+    assert sum(summary.metadata["level"] == "document" for summary in summaries) == 2
+
+
+def test_hierarchical_search_narrows_to_the_right_section(tmp_path):
+    """Chunk search runs only inside the best sections and still finds the home section"""
+    store, queries = _store(tmp_path)
+    total = store.get_document_count()
+    hits = 0
+    for index in range(0, len(queries), 5):
+        statute, section = divmod(index, 6)
+        results = store.hierarchical_search(queries[index], k=3, documents=2, sections=2)
+        sections = store.select_sections(store.embedding_function.embed_query(queries[index]), 2, 2)
+        assert len(store._section_chunks(sections)) < total / 4
+        hits += any(doc.metadata["source"] == f"statute_{statute}.pdf"
+                    and doc.metadata["page"] // 2 == section for doc, _score in results)
+    assert hits >= 4
+
+    engine = QueryEngine(chroma_path=store.persist_directory, vector_store=store, llm=FakeChatModel(),
+                         relevance_threshold=0.0, retrieval_mode="hierarchical")
+    _, sources = engine.query(queries[7], top_k=3)
+    assert sources and all(source.startswith("statute_1.pdf") for source in sources)
+
+
+def test_stores_without_a_section_index_fall_back_to_flat_search(tmp_path):
+    """Hierarchical mode on a store ingested flat returns the flat results"""
+    store, queries = _store(tmp_path, build_sections=False)
+    assert store.sections.count() == 0
+    flat = [doc.metadata["id"] for doc, _ in store.similarity_search(queries[0], k=3)]
+    assert [doc.metadata["id"] for doc, _ in store.hierarchical_search(queries[0], k=3)] == flat
@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import HashEmbeddings, synthetic_pages
+from src.core.rag_pipeline import RAGPipeline
+from src.database.chroma_manager import ChromaManager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_hnsw_settings_are_stored_with_the_collection(tmp_path):
+    """Build settings stick to the store; ef_search follows the configuration"""
+    path = str(tmp_path)
+    hnsw = {"space": "cosine", "ef_construction": 50, "max_neighbors": 8, "ef_search": 20}
+    store = ChromaManager(path, embedding_function=HashEmbeddings(), read_only=False, hnsw=hnsw)
+    pipeline = RAGPipeline(data_path="data", chroma_path=path, vector_store=store)
+    pipeline.add_chunks_to_database(pipeline.split_documents(synthetic_pages(10)))
+    assert store.index_configuration() == hnsw
+    results = store.similarity_search("punishment for hacking", k=3)
+    assert all(0.0 <= store.relevance(score) <= 1.0 for _doc, score in results)
+
+    reopened = ChromaManager(path, embedding_function=HashEmbeddings(), read_only=False,
+                             hnsw=dict(hnsw, space="l2", max_neighbors=32, ef_search=64))
+    assert reopened.index_configuration() == dict(hnsw, ef_search=64)
+    assert len(reopened.similarity_search("punishment for hacking", k=3)) == 3
+
+    replica = ChromaManager(path, embedding_function=HashEmbeddings(), read_only=True,
+                            hnsw=dict(hnsw, ef_search=10))
+    assert replica.index_configuration()["ef_search"] == 64
+
+
+def test_tuner_recommends_a_setting_that_meets_the_target():
+    """The sweep reports every combination and picks one above the recall target"""
+    result = subprocess.run(
+        [sys.executable, "scripts/tune_index.py", "--synthetic", "1500", "--dimensions", "64",
+         "--num-queries", "30", "--ef-construction", "64", "--max-neighbors", "8", "16",
+         "--ef-search", "10", "100", "--target-recall", "0.9"],
+        cwd=ROOT, capture_output=True, text=True, timeout=300
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert result.stdout.count("\n    64 ") == 4
+    assert "HNSW_EF_SEARCH=" in result.stdout
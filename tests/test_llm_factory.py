@@ -0,0 +1,104 @@
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import HumanMessage
+
+from benchmarks.fake_openai_server import FakeOpenAIServer
+from src.models import llm_factory
+from src.models.llm_factory import LLMDeadlineExceeded, ResilientLLM, get_chat_client
+
+MESSAGES = [HumanMessage(content="What is the punishment for hacking?")]
+
+
+@pytest.fixture
+def fake_provider(monkeypatch):
+    """Point new clients at a fake server, with a registry private to the test"""
+    monkeypatch.setattr(llm_factory, "_clients", {})
+
+    def client(server, model):
+        monkeypatch.setenv("OPENAI_API_KEY", "fake-key")
+        monkeypatch.setenv("OPENAI_API_BASE", server.url)
+        llm_factory._clients.clear()
+        return get_chat_client(model)
+
+    return client
+
+
+def test_registry_shares_clients_and_connection_pool(fake_provider):
+    """Same model returns the same client; all clients share one HTTP pool"""
+    with FakeOpenAIServer(chat_latency=0.0) as server:
+        first = fake_provider(server, "model-a")
+        assert get_chat_client("model-a") is first
+        other = get_chat_client("model-b")
+        assert other is not first
+        assert other.http_client is first.http_client
+
+
+def test_deadline_bounds_a_stalled_call(fake_provider):
+    """A hung provider call fails at the deadline instead of hanging the worker"""
+    with FakeOpenAIServer(chat_latency=3.0) as server:
+        llm = ResilientLLM(fake_provider(server, "slow"), deadline=0.3)
+        started = time.perf_counter()
+        with pytest.raises(LLMDeadlineExceeded):
+            llm.invoke(MESSAGES)
+        assert time.perf_counter() - started < 1.0
+
+
+def test_abandoned_call_frees_its_thread_by_the_deadline(fake_provider):
+    """A stalled call left behind at the deadline times out instead of holding its thread"""
+    executor = ThreadPoolExecutor(max_workers=1)
+    with FakeOpenAIServer(chat_latency=5.0) as server:
+        llm = ResilientLLM(fake_provider(server, "slow"), deadline=0.3, executor=executor)
+        with pytest.raises(LLMDeadlineExceeded):
+            llm.invoke(MESSAGES)
+        # The only worker thread runs the next call well before the stall would end
+        started = time.perf_counter()
+        executor.submit(lambda: None).result(timeout=4.0)
+        assert time.perf_counter() - started < 2.0
+    executor.shutdown()
+
+
+def test_hedge_beats_a_slow_first_request(fake_provider):
+    """After the hedge delay a second request goes out and its answer is used"""
+    with FakeOpenAIServer(chat_latency=0.0, slow_requests=1, slow_latency=3.0) as server:
+        llm = ResilientLLM(fake_provider(server, "model-a"), hedge_delay=0.1, deadline=5.0)
+        started = time.perf_counter()
+        response = llm.invoke(MESSAGES)
+        assert time.perf_counter() - started < 1.0
+        assert response.content.startswith("Based on the context")
+
+
+def test_fallback_model_answers_when_primary_is_slow(fake_provider):
+    """The hedge goes to the fallback model when one is configured"""
+    with FakeOpenAIServer(chat_latency=0.0, model_latency={"primary-model": 3.0}) as server:
+        primary = fake_provider(server, "primary-model")
+        fallback = get_chat_client("fallback-model")
+        llm = ResilientLLM(primary, fallback=fallback, hedge_delay=0.1, deadline=5.0)
+        started = time.perf_counter()
+        response = llm.invoke(MESSAGES)
+        assert time.perf_counter() - started < 1.0
+        assert response.response_metadata.get("model_name") == "fallback-model"
+
+
+def test_p99_improves_with_hedging(fake_provider):
+    """With 1 in 10 requests stalling, hedging keeps the tail near the median"""
+    def tail(hedge_delay):
+        with FakeOpenAIServer(chat_latency=0.02) as server:
+            client = fake_provider(server, "model-a")
+            llm = ResilientLLM(client, hedge_delay=hedge_delay, deadline=5.0)
+            latencies = []
+            for i in range(10):
+                server.slow_requests = server.stats["chat_started"] + 1 if i % 10 == 0 else 0
+                server.slow_latency = 1.0
+                started = time.perf_counter()
+                llm.invoke(MESSAGES)
+                latencies.append(time.perf_counter() - started)
+            return max(latencies)
+
+    assert tail(hedge_delay=0.1) < 0.5 < tail(hedge_delay=0.0)
@@ -0,0 +1,170 @@
+import io
+import json
+import logging
+import math
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils import load_config, configure_logging, get_logger, set_request_id, reset_request_id
+
+
+class SlowDiskHandler(logging.StreamHandler):
+    """Handler that simulates a disk taking `delay` seconds per write"""
+
+    def __init__(self, delay: float):
+        super().__init__(io.StringIO())
+        self.delay = delay
+
+    def emit(self, record):
+        time.sleep(self.delay)
+        super().emit(record)
+
+
+@pytest.fixture(scope="module")
+def log_dir(tmp_path_factory):
+    """Handlers rebuilt from the config write here, not to the repo's logs/"""
+    return str(tmp_path_factory.mktemp("logs"))
+
+
+def _config(log_dir, **overrides):
+    config = load_config()
+    config["log_dir"] = log_dir
+    config.update(overrides)
+    return config
+
+
+def _percentile(sorted_values, fraction):
+    """Nearest-rank percentile of already sorted values"""
+    return sorted_values[math.ceil(len(sorted_values) * fraction) - 1]
+
+
+def _simulated_request_latencies(logger, requests=50, lines_per_request=5):
+    latencies = []
+    for i in range(requests):
+        started = time.perf_counter()
+        for line in range(lines_per_request):
+            logger.info(f"request {i} line {line}")
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return latencies
+
+
+def test_async_logging_keeps_slow_disk_off_request_path(log_dir):
+    """p99 of a request that logs 5 lines stays flat when each disk write takes 20ms"""
+    logger = get_logger("tests.slow_disk")
+    slow = SlowDiskHandler(delay=0.02)
+    configure_logging(_config(log_dir, log_async=True, log_queue_size=1000), target=slow)
+    try:
+        latencies = _simulated_request_latencies(logger, requests=100)
+        p99 = _percentile(latencies, 0.99)
+        # Synchronous writes would cost 5 x 20ms = 100ms per request
+        assert p99 < 0.01, f"p99 {p99 * 1000:.1f}ms should not include disk time"
+    finally:
+        slow.delay = 0  # don't wait out the backlog when the listener stops
+        configure_logging(_config(log_dir, log_async=True))
+
+
+def test_dropped_records_are_counted_and_reported_once(capsys, log_dir):
+    """A full queue drops records, counts them in /metrics and warns on stderr without flooding it"""
+    from src.utils.metrics import LOG_RECORDS_DROPPED
+
+    logger = get_logger("tests.full_queue")
+    slow = SlowDiskHandler(delay=0.05)
+    handler = configure_logging(_config(log_dir, log_async=True, log_queue_size=2), target=slow)
+    before = LOG_RECORDS_DROPPED.get()
+    try:
+        for i in range(50):
+            logger.info(f"line {i}")
+    finally:
+        slow.delay = 0
+        configure_logging(_config(log_dir, log_async=True))
+    assert handler.dropped > 0
+    assert LOG_RECORDS_DROPPED.get() - before == handler.dropped
+    warnings = [line for line in capsys.readouterr().err.splitlines() if "log queue full" in line]
+    assert len(warnings) == 1
+
+
+def test_sync_logging_pays_for_slow_disk(log_dir):
+    """Sanity check for the simulation: sync mode blocks on every write"""
+    logger = get_logger("tests.slow_disk_sync")
+    configure_logging(_config(log_dir, log_async=False), target=SlowDiskHandler(delay=0.01))
+    try:
+        latencies = _simulated_request_latencies(logger, requests=3)
+        assert latencies[0] >= 0.05
+    finally:
+        configure_logging(_config(log_dir, log_async=True))
+
+
+def test_json_records_carry_request_id(log_dir):
+    """JSON lines include the request ID set for the current context"""
+    logger = get_logger("tests.json")
+    stream = io.StringIO()
+    target = logging.StreamHandler(stream)
+    from src.utils.logger import JsonFormatter
+    target.setFormatter(JsonFormatter())
+    configure_logging(_config(log_dir, log_async=True, log_format="json"), target=target)
+
+    token = set_request_id("req-123")
+    try:
+        logger.info("hello")
+    finally:
+        reset_request_id(token)
+    configure_logging(_config(log_dir, log_async=True))  # stops the listener, flushing the queue
+
+    record = json.loads(stream.getvalue().strip().splitlines()[-1])
+    assert record["message"] == "hello"
+    assert record["request_id"] == "req-123"
+    assert record["logger"] == "tests.json"
+
+
+def test_debug_lines_are_sampled(log_dir):
+    """Only 1 in 10 DEBUG lines is queued at a 0.1 sample rate"""
+    logger = get_logger("tests.sampling", level=logging.DEBUG)
+    stream = io.StringIO()
+    target = logging.StreamHandler(stream)
+    handler = configure_logging(_config(log_dir, log_async=True, log_debug_sample_rate=0.1), target=target)
+    queued = []
+    put_nowait = handler.queue.put_nowait
+    handler.queue.put_nowait = lambda record: (queued.append(record), put_nowait(record))
+    for i in range(100):
+        logger.debug(f"debug {i}")
+    logger.info("info always kept")
+    # Dropped before formatting and queueing, not by the writer
+    assert len(queued) == 11
+    configure_logging(_config(log_dir, log_async=True))
+
+    lines = stream.getvalue().strip().splitlines()
+    assert len([line for line in lines if line.startswith("debug")]) == 10
+    assert "info always kept" in lines
+
+
+def test_forked_workers_rotate_their_own_files(log_dir, tmp_path):
+    """After a fork a size-rotated log goes to app.<pid>.log, so workers never rotate one file"""
+    worker_logs = str(tmp_path / "logs")
+    config = _config(worker_logs, log_async=True, log_rotation="size", log_format="text")
+    logger = get_logger("tests.fork")
+    configure_logging(config)
+    try:
+        logger.info("from the master")
+        pid = os.fork()
+        if pid == 0:
+            from src.utils.logger import _stop_listener
+            logger.info("from a worker")
+            _stop_listener()  # flush; os._exit skips atexit
+            os._exit(0)
+        _, status = os.waitpid(pid, 0)
+        assert status == 0
+    finally:
+        configure_logging(_config(log_dir, log_async=True))
+
+    with open(os.path.join(worker_logs, "app.log")) as f:
+        master = f.read()
+    with open(os.path.join(worker_logs, f"app.{pid}.log")) as f:
+        worker = f.read()
+    assert "from the master" in master and "from a worker" not in master
+    assert "from a worker" in worker and "from the master" not in worker
@@ -0,0 +1,114 @@
+import gc
+import os
+import subprocess
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import HashEmbeddings, synthetic_pages
+from src.core.conversation import ConversationStore
+from src.core.prefetch import Prefetch, PrefetchCache
+from src.core.rag_pipeline import RAGPipeline
+from src.database.chroma_manager import ChromaManager
+from src.utils.memory import MemoryBudget
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_budget_evicts_least_recently_used_across_caches():
+    """Whichever cache the oldest entry belongs to gives it up"""
+    budget = MemoryBudget(10_000)
+    conversations = ConversationStore(budget=budget)
+    prefetches = PrefetchCache(min_interval=0, budget=budget)
+    results = [(document, 0.1) for document in synthetic_pages(3)]
+
+    conversations.get("old")
+    token = prefetches.begin("typing")
+    prefetches.finish("typing", token, Prefetch("hacking", 5, 0, results))
+    conversations.get("old")  # used again: now newer than the prefetch
+    assert budget.used <= budget.limit and len(conversations) == 1
+    for i in range(10):
+        conversations.get(f"new-{i}")
+
+    assert budget.used <= budget.limit
+    assert prefetches.take("typing") is None
+    stats = budget.stats()
+    assert stats["caches"]["prefetch"] == 0
+    assert stats["caches"]["conversations"] == stats["used"]
+    assert len(conversations) < 11
+
+    # A cache that goes away takes its entries with it
+    del conversations
+    gc.collect()
+    assert budget.used == 0
+
+
+def test_idle_index_is_unloaded_and_reloaded_on_demand(tmp_path):
+    """Evicting the store's index drops the client; the next search loads it again"""
+    budget = MemoryBudget(2 * 1024 * 1024)
+    store = ChromaManager(str(tmp_path), embedding_function=HashEmbeddings(),
+                          read_only=False, budget=budget)
+    pipeline = RAGPipeline(data_path="data", chroma_path=store.persist_directory, vector_store=store,
+                           page_cache=None)
+    pipeline.add_chunks_to_database(pipeline.split_documents(synthetic_pages(20)))
+    assert budget.stats()["caches"]["index"] > 0
+    db = store.db
+
+    conversations = ConversationStore(budget=budget)
+    conversations.get("busy").add_turn("q", "q", "x" * budget.limit)
+    assert store.db is not db
+    assert budget.stats()["caches"]["index"] == 0
+
+    assert len(store.similarity_search("punishment for hacking", k=3)) == 3
+    assert budget.stats()["caches"]["index"] > 0
+
+
+def _open_files_and_rss_mb():
+    with open("/proc/self/statm") as f:
+        rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    return len(os.listdir("/proc/self/fd")), rss
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/statm"), reason="needs /proc")
+def test_repeated_index_eviction_releases_chroma(tmp_path):
+    """Each eviction stops the old Chroma system, so files and memory stay flat"""
+    budget = MemoryBudget(2 * 1024 * 1024)
+    store = ChromaManager(str(tmp_path), embedding_function=HashEmbeddings(256),
+                          read_only=False, budget=budget)
+    pipeline = RAGPipeline(data_path="data", chroma_path=store.persist_directory, vector_store=store,
+                           page_cache=None)
+    pipeline.add_chunks_to_database(pipeline.split_documents(synthetic_pages(300)))
+    conversations = ConversationStore(budget=budget)
+
+    def churn(rounds, offset):
+        for i in range(rounds):
+            assert len(store.similarity_search("punishment for hacking", k=3)) == 3
+            db = store.db
+            conversations.get(f"busy{offset + i}").add_turn("q", "q", "x" * budget.limit)
+            assert store.db is not db
+
+    # Without the collector, only stopping the old systems frees them
+    gc.disable()
+    try:
+        churn(3, 0)
+        files, rss = _open_files_and_rss_mb()
+        churn(20, 3)
+        after_files, after_rss = _open_files_and_rss_mb()
+    finally:
+        gc.enable()
+    assert after_files <= files + 2
+    assert after_rss < rss + 25
+
+
+def test_soak_stays_within_budget():
+    """A growing corpus and ever more sessions stay inside the budget"""
+    result = subprocess.run(
+        [sys.executable, "benchmarks/soak_test.py", "--budget-mb", "2", "--slack-mb", "64", "--rounds", "4",
+         "--pages", "20", "--queries", "60", "--dimensions", "128"],
+        cwd=ROOT, capture_output=True, text=True, timeout=600
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "✓ Caches peaked" in result.stdout
+    assert "conversations 0" not in result.stdout
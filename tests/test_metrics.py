@@ -0,0 +1,70 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.metrics import MetricsRegistry, start_stage_timings, stop_stage_timings, timed
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Histogram output follows the Prometheus text format"""
+    registry = MetricsRegistry()
+    histogram = registry.histogram("demo_seconds", "Demo", ["stage"], buckets=(0.1, 1.0))
+    histogram.observe(0.05, stage="a")
+    histogram.observe(0.5, stage="a")
+    histogram.observe(5.0, stage="a")
+
+    text = registry.render()
+    assert '# TYPE demo_seconds histogram' in text
+    assert 'demo_seconds_bucket{stage="a",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{stage="a",le="1.0"} 2' in text
+    assert 'demo_seconds_bucket{stage="a",le="+Inf"} 3' in text
+    assert 'demo_seconds_count{stage="a"} 3' in text
+
+
+def test_stage_breakdown_only_collected_when_started():
+    """timed() feeds the per-request breakdown while one is active"""
+    with timed("outside"):
+        pass
+    token = start_stage_timings()
+    with timed("inside"):
+        pass
+    with timed("inside"):
+        pass
+    timings = stop_stage_timings(token)
+    assert set(timings) == {"inside"}
+
+
+def test_query_reports_stage_timings_and_metrics(app_module, monkeypatch, tmp_path):
+    """/query returns a stage breakdown on request and /metrics exposes it"""
+    from benchmarks.fake_openai_server import FakeOpenAIServer
+    from benchmarks.load_test import fake_env, seed_corpus
+    from src.models import llm_factory
+
+    # Clients created here point at the fake server, so keep them out of the registry
+    monkeypatch.setattr(llm_factory, "_clients", {})
+    with FakeOpenAIServer(chat_latency=0.0) as server:
+        chroma_path = str(tmp_path)
+        for name, value in fake_env(server.url, chroma_path).items():
+            monkeypatch.setenv(name, value)
+        seed_corpus(chroma_path, pages=10)
+
+        app_module.config['chroma_path'] = chroma_path
+        app_module.ready.clear()
+        assert app_module.warmup()
+        client = app_module.create_app().test_client()
+
+        response = client.post('/query', json={'query': 'What is the punishment for hacking?', 'timings': True})
+        data = response.get_json()
+        assert response.status_code == 200, data
+        assert {'query_embed', 'search', 'context_build', 'llm'} <= set(data['timings_ms'])
+
+        plain = client.post('/query', json={'query': 'What is the punishment for hacking?'}).get_json()
+        assert 'timings_ms' not in plain
+
+        metrics = client.get('/metrics')
+        text = metrics.get_data(as_text=True)
+        assert metrics.status_code == 200
+        assert 'lexora_stage_duration_seconds_count{stage="llm"}' in text
+        assert 'lexora_requests_total{endpoint="lexora.query",status="200"}' in text
+        assert 'lexora_llm_tokens_total{kind="prompt"}' in text
@@ -0,0 +1,67 @@
+import os
+import shutil
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import HashEmbeddings, synthetic_pages, write_pdf
+from src.core import rag_pipeline
+from src.core.page_cache import PageCache
+from src.core.rag_pipeline import RAGPipeline
+from src.database.chroma_manager import ChromaManager
+
+
+def _pipeline(data_path, page_cache, chroma_path):
+    store = ChromaManager(str(chroma_path), embedding_function=HashEmbeddings())
+    return RAGPipeline(data_path=data_path, chroma_path=store.persist_directory, vector_store=store,
+                       page_cache=page_cache)
+
+
+def test_rebuild_reads_parsed_pages_from_the_cache(monkeypatch, tmp_path_factory):
+    """A second load of the same bytes parses nothing and gives the same pages"""
+    data_path = str(tmp_path_factory.mktemp("data"))
+    write_pdf(os.path.join(data_path, "act.pdf"), [page.page_content for page in synthetic_pages(4)])
+    os.makedirs(os.path.join(data_path, ".hidden"))
+    write_pdf(os.path.join(data_path, ".hidden", "skip.pdf"), ["not loaded"])
+    cache = PageCache(str(tmp_path_factory.mktemp("pages")))
+
+    parses = []
+    parser = rag_pipeline.PyPDFParser
+    monkeypatch.setattr(rag_pipeline, "PyPDFParser", lambda: parses.append(1) or parser())
+
+    first = _pipeline(data_path, cache, tmp_path_factory.mktemp("store")).load_documents()
+    assert len(first) == 4 and len(parses) == 1
+
+    # Same bytes under another path (a rebuild from a moved data directory)
+    moved = str(tmp_path_factory.mktemp("moved"))
+    shutil.copy(os.path.join(data_path, "act.pdf"), os.path.join(moved, "act.pdf"))
+    second = _pipeline(moved, cache, tmp_path_factory.mktemp("store")).load_documents()
+    assert len(parses) == 1
+    assert [d.page_content for d in second] == [d.page_content for d in first]
+    assert second[0].metadata == dict(first[0].metadata, source=os.path.join(moved, "act.pdf"))
+
+    # An upgraded parser doesn't trust pages from the old one
+    _pipeline(moved, PageCache(cache.directory, parser_version="other"),
+              tmp_path_factory.mktemp("store")).load_documents()
+    assert len(parses) == 2
+
+
+def test_concurrent_writes_of_one_entry_stay_readable(tmp_path):
+    """Threads caching the same file at once each write their own temp file"""
+    cache = PageCache(str(tmp_path))
+    pages = synthetic_pages(30)
+    barrier = threading.Barrier(8)
+
+    def put():
+        barrier.wait()
+        cache.put("ab" * 32, pages)
+
+    threads = [threading.Thread(target=put) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    cached = cache.get("ab" * 32, "act.pdf")
+    assert [d.page_content for d in cached] == [d.page_content for d in pages]
+    assert os.listdir(tmp_path) == ["ab" * 32 + ".json.gz"]
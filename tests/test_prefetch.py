@@ -0,0 +1,104 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.prefetch import Prefetch, PrefetchCache
+from src.utils.admission import AdmissionPool
+
+
+def test_cache_is_rate_limited_cancellable_and_bounded():
+    """Prefetches are throttled per session, superseded ones are dropped, sessions are capped"""
+    cache = PrefetchCache(max_sessions=2, ttl=0.2, min_interval=0.05)
+    first = cache.begin("a")
+    assert cache.begin("a") is None  # too soon
+    time.sleep(0.06)
+    second = cache.begin("a")
+    assert not cache.finish("a", first, Prefetch("what is th", 5, 0, []))
+    assert cache.finish("a", second, Prefetch("what is theft", 5, 0, []))
+    assert cache.take("a").search_text == "what is theft"
+    assert cache.take("a") is None
+
+    time.sleep(0.06)
+    token = cache.begin("a")
+    cache.cancel("a")
+    assert not cache.finish("a", token, Prefetch("what is fraud", 5, 0, []))
+
+    time.sleep(0.06)
+    cache.finish("a", cache.begin("a"), Prefetch("what is fraud", 5, 0, []))
+    time.sleep(0.25)
+    assert cache.take("a") is None  # expired
+
+    cache.begin("b")
+    cache.begin("c")
+    assert len(cache) == 2
+
+    prefetch = Prefetch("what is the punishment for hack", 5, 3, [])
+    assert prefetch.matches("what is the punishment for hacking", 5, 3, 0.9)
+    assert not prefetch.matches("what is the punishment for hacking", 5, 4, 0.9)
+    assert not prefetch.matches("what is the punishment for fraud", 5, 3, 0.9)
+
+
+def test_query_reuses_chunks_prefetched_while_typing(app_module, app_client):
+    """A prefetch for the partial question saves /query its search"""
+    app_module.config['prefetch'] = True
+    client = app_client(relevance_threshold=0.0)
+    store = app_module.chroma_manager
+    searches = []
+    search = store.similarity_search
+    store.similarity_search = lambda query, k=5: searches.append(query) or search(query, k=k)
+
+    response = client.post('/prefetch', json={'query': 'What is the punishment for cyberterr'})
+    assert response.get_json()['prefetched'] is True
+    assert client.post('/prefetch', json={'query': 'What is the punishment for cyberterro'}).status_code == 429
+    response = client.post('/query', json={'query': 'What is the punishment for cyberterrorism?'})
+    assert response.get_json()['sources']
+    assert len(searches) == 1
+
+    # Nothing prefetched for the next question, so it searches as usual
+    client.post('/query', json={'query': 'What is the punishment for hacking?'})
+    assert len(searches) == 2
+
+    # A cancelled prefetch is not used
+    time.sleep(app_module.config['prefetch_min_interval'])
+    client.post('/prefetch', json={'query': 'What is the fine for stalking'})
+    assert client.post('/prefetch', json={'query': ''}).get_json()['success']
+    client.post('/query', json={'query': 'What is the fine for stalking?'})
+    assert len(searches) == 4
+
+
+def test_busy_worker_skips_prefetches_quietly(app_module, app_client):
+    """A prefetch turned away by its pool is a plain 200, not a 503"""
+    app_module.config['prefetch'] = True
+    app_module.admission['prefetch'] = pool = AdmissionPool('prefetch_busy_test', 1, 0, 0)
+    client = app_client()
+    release = threading.Event()
+
+    def hold():
+        with pool.admit():
+            release.wait()
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    while pool.active == 0:
+        pass
+    try:
+        response = client.post('/prefetch', json={'query': 'What is the punishment for hacking'})
+    finally:
+        release.set()
+        holder.join()
+    assert response.status_code == 200
+    assert response.get_json() == {'success': True, 'message': 'Skipped', 'prefetched': False}
+
+
+def test_prefetch_is_off_by_default(app_module, app_client, monkeypatch):
+    """Without PREFETCH=true the endpoint doesn't exist"""
+    from src.utils import load_config
+
+    monkeypatch.delenv("PREFETCH", raising=False)
+    assert load_config()['prefetch'] is False
+    app_module.config['prefetch'] = False
+    client = app_client(pages=0)
+    assert client.post('/prefetch', json={'query': 'What is the punishment for hacking'}).status_code == 404
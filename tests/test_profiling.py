@@ -0,0 +1,65 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.profiling import Profiler
+
+
+def busy_work(n=20000):
+    return sum(i * i for i in range(n))
+
+
+def test_profiler_covers_the_requested_window_only(tmp_path):
+    """cProfile stops after N calls, sampling after T seconds; disarmed calls are nearly free"""
+    profiler = Profiler(str(tmp_path))
+    work = profiler.profiled("work")(busy_work)
+
+    started = time.perf_counter()
+    for _ in range(10000):
+        work(1)
+    assert (time.perf_counter() - started) / 10000 < 20e-6
+
+    profiler.start("cprofile", requests=2)
+    work()
+    assert profiler.status()["running"]["remaining"] == 1
+    work()
+    last = profiler.status()["last"]
+    assert profiler.status()["running"] is None
+    assert last["calls"] == 2 and "busy_work" in last["summary"]
+    assert os.path.exists(os.path.join(profiler.directory, last["file"]))
+
+    profiler.start("sampling", seconds=0.3, interval=0.002)
+    deadline = time.monotonic() + 0.2
+    while time.monotonic() < deadline:
+        work()
+    time.sleep(0.2)
+    last = profiler.status()["last"]
+    assert last["mode"] == "sampling" and last["samples"] > 0
+    with open(os.path.join(profiler.directory, last["file"])) as f:
+        assert f.readline().startswith("work;")
+
+
+def test_admin_endpoints_need_the_token(app_module, app_client, tmp_path):
+    """Profiling is hidden without ADMIN_TOKEN; with it, a profiled query can be downloaded"""
+    client = app_client(pages=10)
+    app_module.PROFILER.directory = str(tmp_path)
+
+    app_module.config['admin_token'] = ''
+    assert client.get('/admin/profile').status_code == 404
+    app_module.config['admin_token'] = 'secret'
+    assert client.get('/admin/profile').status_code == 403
+    headers = {'X-Admin-Token': 'secret'}
+    response = client.post('/admin/profile', json={'mode': 'cprofile', 'requests': 1}, headers=headers)
+    assert response.status_code == 200
+    client.post('/query', json={'query': 'What is the punishment for hacking?'})
+    last = client.get('/admin/profile', headers=headers).get_json()['last']
+    assert "query_engine.py" in last["summary"]
+    download = client.get(f"/admin/profile/files/{last['file']}", headers=headers)
+    assert download.status_code == 200 and download.data
+
+    assert client.post('/admin/memory', headers=headers).get_json()['top'] == []
+    client.post('/query', json={'query': 'What is the punishment for fraud?'})
+    assert client.post('/admin/memory', json={'top': 5}, headers=headers).get_json()['top']
+    assert client.post('/admin/memory/stop', headers=headers).status_code == 200
@@ -0,0 +1,89 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import FakeChatModel, HashEmbeddings, synthetic_pages
+from src.core.query_engine import NO_ANSWER, QueryEngine
+from src.core.rag_pipeline import RAGPipeline
+from src.database.chroma_manager import ChromaManager
+from src.utils.metrics import LLM_CALLS_SKIPPED
+
+
+def _engine(path, pages=20, llm_latency=0.0, embeddings=None, relevance_threshold=0.0):
+    store = ChromaManager(str(path),
+                          embedding_function=embeddings or HashEmbeddings())
+    pipeline = RAGPipeline(data_path="data", chroma_path=store.persist_directory, vector_store=store)
+    pipeline.add_chunks_to_database(pipeline.split_documents(synthetic_pages(pages)))
+    llm = FakeChatModel(latency=llm_latency)
+    engine = QueryEngine(chroma_path=store.persist_directory, vector_store=store, llm=llm,
+                         relevance_threshold=relevance_threshold)
+    return engine, pipeline, llm
+
+
+def _burst(engine, questions):
+    barrier = threading.Barrier(len(questions))
+    results = [None] * len(questions)
+
+    def worker(i):
+        barrier.wait()
+        results[i] = engine.query(questions[i], top_k=5)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(questions))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_identical_concurrent_questions_share_one_llm_call(tmp_path):
+    """A burst of N identical (after normalization) questions calls the LLM once"""
+    engine, _, llm = _engine(tmp_path, llm_latency=0.5)
+    variants = ["What is cyberterrorism?", "what is  cyberterrorism", "WHAT IS CYBERTERRORISM?"]
+    results = _burst(engine, [variants[i % len(variants)] for i in range(20)])
+
+    assert llm.calls == 1
+    assert len({answer for answer, _ in results}) == 1
+
+
+def test_different_top_k_or_corpus_version_are_not_coalesced(tmp_path):
+    """Coalescing is keyed on top_k and corpus version as well as the question"""
+    engine, pipeline, llm = _engine(tmp_path, llm_latency=0.0)
+    engine.query("What is cyberterrorism?", top_k=5)
+    engine.query("What is cyberterrorism?", top_k=3)
+    assert llm.calls == 2
+
+    # A question still in flight when the corpus changes doesn't answer the
+    # same question asked afterwards
+    llm.latency = 0.5
+    leader = threading.Thread(target=engine.query, args=("What is cyberterrorism?",), kwargs={"top_k": 5})
+    leader.start()
+    while not llm.in_flight:
+        time.sleep(0.01)
+    version = engine.vector_store.corpus_version
+    pipeline.add_chunks_to_database(pipeline.split_documents(synthetic_pages(25)[20:]))
+    assert engine.vector_store.corpus_version > version
+    engine.query("What is cyberterrorism?", top_k=5)
+    leader.join()
+    assert llm.calls == 4
+
+
+def test_relevance_threshold_skips_llm_for_off_topic_questions(tmp_path):
+    """Off-topic questions get the canned answer without an LLM call"""
+    engine, _, llm = _engine(tmp_path, relevance_threshold=0.5)
+    skipped = LLM_CALLS_SKIPPED.get()
+
+    answer, sources = engine.query("best pizza recipe in naples")
+    assert (answer, sources) == (NO_ANSWER, [])
+    assert llm.calls == 0
+    assert LLM_CALLS_SKIPPED.get() == skipped + 1
+
+    answer, sources = engine.query("punishment for hacking with computer system", top_k=5)
+    assert llm.calls == 1
+    assert sources
+    results = engine.vector_store.similarity_search("punishment for hacking with computer system", k=5)
+    relevant = [s for _, s in results if engine.vector_store.relevance(s) >= 0.5]
+    assert len(sources) == len(relevant)
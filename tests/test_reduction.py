@@ -0,0 +1,100 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import synthetic_pages
+from src.core.rag_pipeline import RAGPipeline
+from src.database.chroma_manager import ChromaManager
+from src.database.snapshot import export_snapshot, import_snapshot
+from src.models.hash_embeddings import HashingEmbeddings
+from src.models.reduction import PROJECTION_FILE, SAMPLE_FILE, Projection
+
+
+def _pca_store(path):
+    return ChromaManager(str(path), embedding_function=HashingEmbeddings(64), read_only=False,
+                         reduction="pca", reduced_dimensions=16)
+
+
+def test_pca_projection_is_fitted_once_and_shared(monkeypatch, tmp_path):
+    """The first ingest fits and saves the projection; other handles reuse it"""
+    monkeypatch.setenv("EMBEDDING_REDUCTION_MIN_SAMPLE", "16")
+    store = _pca_store(tmp_path / "store")
+    pipeline = RAGPipeline(data_path="data", chroma_path=store.persist_directory, vector_store=store)
+    pipeline.add_chunks_to_database(pipeline.split_documents(synthetic_pages(30)))
+
+    assert os.path.exists(os.path.join(store.persist_directory, PROJECTION_FILE))
+    assert store.embedding_function.projection.method == "pca"
+    assert store.embedding_identity() == {"embedding_model": "hash+pca16", "embedding_dimensions": 16}
+    query = "punishment for hacking"
+    reader = ChromaManager(store.persist_directory, embedding_function=HashingEmbeddings(64), read_only=True,
+                           reduction="pca", reduced_dimensions=16)
+    assert reader.embedding_function.embed_query(query) == store.embedding_function.embed_query(query)
+    assert len(reader.similarity_search(query, k=3)) == 3
+
+    # The projection travels with snapshots
+    snapshot = str(tmp_path / "snapshot")
+    export_snapshot(store, snapshot)
+    replica = _pca_store(tmp_path / "replica")
+    import_snapshot(replica, snapshot)
+    assert replica.embedding_function.embed_query(query) == store.embedding_function.embed_query(query)
+
+    # A cleared store refits on its next ingest
+    store.delete_all()
+    assert store.embedding_function.projection is None
+    assert not os.path.exists(os.path.join(store.persist_directory, PROJECTION_FILE))
+
+
+def test_pca_waits_for_a_minimum_sample(monkeypatch, tmp_path):
+    """Small ingests are truncated; the fit re-projects them once the sample is large enough"""
+    monkeypatch.setenv("EMBEDDING_REDUCTION_MIN_SAMPLE", "50")
+    store = _pca_store(tmp_path)
+    pipeline = RAGPipeline(data_path="data", chroma_path=store.persist_directory, vector_store=store)
+    pages = synthetic_pages(40)
+    pipeline.add_chunks_to_database(pipeline.split_documents(pages[:10]))
+    assert store.embedding_function.projection.method == "truncate"
+    assert os.path.exists(os.path.join(store.persist_directory, SAMPLE_FILE))
+
+    query = "punishment for hacking"
+    reader = ChromaManager(store.persist_directory, embedding_function=HashingEmbeddings(64), read_only=True,
+                           reduction="pca", reduced_dimensions=16, poll_interval=0.0)
+    assert len(reader.similarity_search(query, k=3)) == 3
+    early = store.db._collection.get(limit=1, include=["documents"])
+
+    # The fit projects the sample it kept instead of embedding the early chunks again
+    embedded = []
+    embed_documents = store.embedding_function.base.embed_documents
+    monkeypatch.setattr(store.embedding_function.base, "embed_documents",
+                        lambda texts: embedded.extend(texts) or embed_documents(texts))
+    later = pipeline.split_documents(pages[10:])
+    pipeline.add_chunks_to_database(later)
+    assert len(embedded) == len(later)
+    projection = store.embedding_function.projection
+    assert projection.method == "pca"
+    assert not os.path.exists(os.path.join(store.persist_directory, SAMPLE_FILE))
+    stored = store.db._collection.get(ids=early["ids"], include=["embeddings"])["embeddings"][0]
+    expected = projection.apply(HashingEmbeddings(64).embed_documents(early["documents"]))[0]
+    assert np.allclose(stored, expected, atol=1e-5)
+
+    assert reader.corpus_version == store.corpus_version
+    assert reader.embedding_function.embed_query(query) == store.embedding_function.embed_query(query)
+
+
+def test_projections_reduce_to_unit_vectors():
+    """Truncation keeps leading dimensions; PCA keeps the high-variance directions"""
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((200, 32)) * np.linspace(3.0, 0.1, 32)
+
+    truncated = Projection("truncate", 8).apply(vectors)
+    assert truncated.shape == (200, 8)
+    assert np.allclose(np.linalg.norm(truncated, axis=1), 1.0, atol=1e-5)
+    assert np.allclose(truncated[0], vectors[0, :8] / np.linalg.norm(vectors[0, :8]), atol=1e-5)
+
+    pca = Projection.fit_pca(vectors, 4)
+    assert pca.apply(vectors).shape == (200, 4)
+    # The leading component follows the highest-variance input axis
+    assert np.argmax(np.abs(pca.components[0])) == 0
+    # Too few samples still yields the requested width
+    assert Projection.fit_pca(vectors[:2], 4).apply(vectors).shape == (200, 4)
@@ -0,0 +1,114 @@
+import os
+import sys
+import threading
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import HashEmbeddings, synthetic_pages, synthetic_statutes
+from src.core.rag_pipeline import RAGPipeline
+from src.database.chroma_manager import ChromaManager
+from src.database.snapshot import SnapshotError, export_snapshot, import_snapshot
+
+
+def _store(path, pages=0):
+    store = ChromaManager(str(path), embedding_function=HashEmbeddings())
+    if pages:
+        pipeline = RAGPipeline(data_path="data", chroma_path=store.persist_directory, vector_store=store)
+        pipeline.add_chunks_to_database(pipeline.split_documents(synthetic_pages(pages)))
+    return store
+
+
+def _records(store):
+    items = store.db._collection.get(include=["embeddings", "documents", "metadatas"])
+    order = np.argsort(items["ids"])
+    return ([items["ids"][i] for i in order], np.asarray(items["embeddings"])[order],
+            [items["documents"][i] for i in order], [items["metadatas"][i] for i in order])
+
+
+def test_round_trip_without_embedding_calls(tmp_path):
+    """Import reproduces IDs, vectors, texts and metadata and never embeds"""
+    source = _store(tmp_path / "source", pages=15)
+    snapshot = str(tmp_path / "snapshot")
+    manifest = export_snapshot(source, snapshot, batch_size=7)
+    assert manifest["count"] == source.get_document_count()
+    assert manifest["dimensions"] == 64
+
+    target = _store(tmp_path / "target")
+    assert import_snapshot(target, snapshot, batch_size=11) == manifest["count"]
+    assert target.embedding_function.calls == 0
+
+    src_ids, src_vectors, src_texts, src_metadatas = _records(source)
+    dst_ids, dst_vectors, dst_texts, dst_metadatas = _records(target)
+    assert src_ids == dst_ids and src_texts == dst_texts and src_metadatas == dst_metadatas
+    assert np.allclose(src_vectors, dst_vectors)
+    assert target.similarity_search("What is cyberterrorism?", k=3)
+
+
+def test_round_trip_keeps_section_summaries(tmp_path):
+    """Hierarchical retrieval on an imported store matches the source"""
+    source = _store(tmp_path / "source")
+    pipeline = RAGPipeline(data_path="data", chroma_path=source.persist_directory, vector_store=source,
+                           build_sections=True)
+    pages, _ = synthetic_statutes(3, 4)
+    pipeline.add_chunks_to_database(pipeline.split_documents(pages))
+    snapshot = str(tmp_path / "snapshot")
+    manifest = export_snapshot(source, snapshot, batch_size=5)
+    assert manifest["sections"]["count"] == source.sections.count() > 0
+
+    target = _store(tmp_path / "target")
+    import_snapshot(target, snapshot, batch_size=4)
+    assert target.embedding_function.calls == 0
+    assert sorted(target.sections.get(include=[])["ids"]) == sorted(source.sections.get(include=[])["ids"])
+    for question in ("punishment for theft", "definition of fraud"):
+        assert target.select_sections(target.embedding_function.embed_query(question))
+        expected = [doc.metadata["id"] for doc, _ in source.hierarchical_search(question, k=3)]
+        assert [doc.metadata["id"] for doc, _ in target.hierarchical_search(question, k=3)] == expected
+
+
+def test_corrupt_snapshot_or_non_empty_store_is_rejected(tmp_path):
+    """Checksums are verified and a populated store isn't overwritten"""
+    snapshot = str(tmp_path / "snapshot")
+    export_snapshot(_store(tmp_path / "source", pages=3), snapshot)
+
+    with pytest.raises(SnapshotError):
+        import_snapshot(_store(tmp_path / "populated", pages=1), snapshot)
+
+    with open(os.path.join(snapshot, "documents.jsonl"), "ab") as f:
+        f.write(b'"tampered"\n')
+    with pytest.raises(SnapshotError):
+        import_snapshot(_store(tmp_path / "target"), snapshot)
+
+
+def test_empty_store_round_trip(tmp_path):
+    """An empty store exports and imports as zero records"""
+    snapshot = str(tmp_path / "snapshot")
+    manifest = export_snapshot(_store(tmp_path / "source"), snapshot)
+    assert manifest["count"] == 0
+
+    target = _store(tmp_path / "target")
+    assert import_snapshot(target, snapshot) == 0
+    assert target.get_document_count() == 0
+
+
+def test_export_holds_off_writers(tmp_path):
+    """Writes wait for an export, which records the corpus version it read"""
+    store = _store(tmp_path / "store", pages=3)
+    written = threading.Event()
+
+    def write():
+        store.add_embeddings(["late"], [[0.5] * 64], ["late chunk"], [None])
+        written.set()
+
+    with store.paused_writes() as version:
+        writer = threading.Thread(target=write)
+        writer.start()
+        assert not written.wait(0.3)
+    writer.join()
+    assert store.corpus_version == version + 1
+
+    manifest = export_snapshot(store, str(tmp_path / "snapshot"))
+    assert manifest["corpus_version"] == store.corpus_version
+    assert manifest["count"] == store.get_document_count()
@@ -0,0 +1,40 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run(code: str) -> str:
+    env = dict(os.environ, OPENAI_API_KEY=os.getenv("OPENAI_API_KEY", "test-key"))
+    return subprocess.check_output([sys.executable, "-c", code], cwd=ROOT, env=env,
+                                   stderr=subprocess.DEVNULL).decode().strip()
+
+
+def test_importing_app_does_not_import_langchain():
+    """Heavy dependencies are only imported when the engines warm up"""
+    output = _run(
+        "import sys, app; "
+        "print(sorted(m for m in sys.modules if m.split('.')[0] in "
+        "('langchain', 'langchain_core', 'langchain_openai', 'langchain_chroma', 'langchain_community', 'chromadb')))"
+    )
+    assert output == "[]"
+
+
+def test_index_and_status_answer_while_warming():
+    """/ and /status respond immediately while a slow warmup runs; /query gets 503"""
+    output = _run(
+        "import time, app\n"
+        "app.initialize_pipeline = lambda: time.sleep(3) or False\n"
+        "app.config['warmup_wait'] = 0.1\n"
+        "client = app.create_app().test_client()\n"
+        "started = time.perf_counter()\n"
+        "index = client.get('/').status_code\n"
+        "status = client.get('/status').get_json()\n"
+        "health = client.get('/health').status_code\n"
+        "query = client.post('/query', json={'query': 'hi'}).status_code\n"
+        "print(index, status['warming'], health, query, round(time.perf_counter() - started, 2))\n"
+    )
+    index, warming, health, query, elapsed = output.splitlines()[-1].split()
+    assert (index, warming, health, query) == ("200", "True", "503", "503")
+    assert float(elapsed) < 1.0
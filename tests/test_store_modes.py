@@ -0,0 +1,103 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fakes import HashEmbeddings
+from src.database.chroma_manager import ChromaManager, ReadOnlyStoreError
+
+WRITER = textwrap.dedent("""
+    import sys, time
+    from benchmarks.fakes import HashEmbeddings, synthetic_pages
+    from src.core.rag_pipeline import RAGPipeline
+    from src.database.chroma_manager import ChromaManager
+
+    path, name, batches = sys.argv[1], sys.argv[2], int(sys.argv[3])
+    store = ChromaManager(path, embedding_function=HashEmbeddings(), read_only=False)
+    pipeline = RAGPipeline(data_path="data", chroma_path=path, vector_store=store)
+    pages = synthetic_pages(batches * 5, source=f"{name}.pdf")
+    for b in range(batches):
+        pipeline.add_chunks_to_database(pipeline.split_documents(pages[b * 5:(b + 1) * 5]))
+        time.sleep(0.1)
+""")
+
+READER = textwrap.dedent("""
+    import json, os, sys, time
+    from benchmarks.fakes import HashEmbeddings
+    from src.database.chroma_manager import ChromaManager
+
+    path, done_flag, expected = sys.argv[1], sys.argv[2], int(sys.argv[3])
+    store = ChromaManager(path, embedding_function=HashEmbeddings(), read_only=True, poll_interval=0.05)
+    versions, found = [], 0
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        versions.append(store.corpus_version)
+        found = len(store.similarity_search("punishment for hacking", k=expected))
+        if os.path.exists(done_flag) and found == expected:
+            break
+        time.sleep(0.02)
+    print(json.dumps({"versions": versions, "found": found}))
+""")
+
+
+def _run(script, *args):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    return subprocess.Popen([sys.executable, "-c", script, *map(str, args)], cwd=ROOT, env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+
+
+def test_readers_follow_concurrent_writers_without_restarting(tmp_path):
+    """Two writer and two reader processes share one store; readers catch up"""
+    path = str(tmp_path / "store")
+    done_flag = str(tmp_path / "done")
+    batches = 4
+    # Every synthetic page splits into two chunks
+    expected = 2 * (2 * batches * 5)
+    ChromaManager(path, embedding_function=HashEmbeddings(), read_only=False)
+
+    readers = [_run(READER, path, done_flag, expected) for _ in range(2)]
+    writers = [_run(WRITER, path, f"writer{i}", batches) for i in range(2)]
+    for writer in writers:
+        _, stderr = writer.communicate(timeout=120)
+        assert writer.returncode == 0, stderr
+    open(done_flag, "w").close()
+
+    for reader in readers:
+        stdout, stderr = reader.communicate(timeout=120)
+        assert reader.returncode == 0, stderr
+        result = json.loads(stdout.strip().splitlines()[-1])
+        assert result["found"] == expected
+        assert result["versions"] == sorted(result["versions"])
+        assert result["versions"][-1] == 2 * batches
+
+
+def test_read_only_store_rejects_writes(tmp_path):
+    """Query replicas can't write to the shared store"""
+    path = str(tmp_path)
+    store = ChromaManager(path, embedding_function=HashEmbeddings(), read_only=True)
+    with pytest.raises(ReadOnlyStoreError):
+        store.add_embeddings(["a"], [[0.0] * 64], ["text"], [None])
+    with pytest.raises(ReadOnlyStoreError):
+        store.delete_all()
+
+
+def test_document_count_follows_other_processes_writes(tmp_path):
+    """The cached count changes with the corpus version, including other writers'"""
+    path = str(tmp_path)
+    writer = ChromaManager(path, embedding_function=HashEmbeddings(), read_only=False)
+    reader = ChromaManager(path, embedding_function=HashEmbeddings(), read_only=True, poll_interval=0.0)
+    assert reader.get_document_count() == 0
+
+    writer.add_embeddings(["a", "b"], [[0.1] * 64, [0.2] * 64], ["one", "two"], [{"source": "x.pdf"}] * 2)
+    assert writer.get_document_count() == 2
+    assert reader.get_document_count() == 2
+
+    writer.delete_documents(["a"])
+    assert writer.get_document_count() == 1
+    assert reader.get_document_count() == 1
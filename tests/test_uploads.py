@@ -0,0 +1,77 @@
+import hashlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import synthetic_pages, write_pdf
+from src.utils.uploads import prune_uploads, receive_upload
+
+
+def _pdf_bytes(directory, pages):
+    path = os.path.join(directory, "doc.pdf")
+    write_pdf(path, [page.page_content for page in pages])
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_reupload_of_known_pdf_skips_parsing(app_module, app_client, tmp_path):
+    """A second upload of the same bytes returns 'already indexed' without reprocessing"""
+    upload_folder = str(tmp_path / "uploads")
+    client = app_client(pages=0, flask_config={'UPLOAD_FOLDER': upload_folder})
+    store = app_module.chroma_manager
+    data = _pdf_bytes(tmp_path, synthetic_pages(30))
+
+    first = client.post('/upload', data={'file': (io.BytesIO(data), 'statute.pdf')}).get_json()
+    assert first['chunks'] > 0
+    count = store.get_document_count()
+
+    started = time.perf_counter()
+    second = client.post('/upload', data={'file': (io.BytesIO(data), 'renamed.pdf')}).get_json()
+    elapsed = time.perf_counter() - started
+    assert second['duplicate'] is True and second['chunks'] == 0
+    assert store.get_document_count() == count
+    assert elapsed < 0.5
+
+    assert os.listdir(upload_folder) == [f"{hashlib.sha256(data).hexdigest()}.pdf"]
+
+
+def test_uploads_keep_their_name_and_replace_older_versions(app_module, app_client, tmp_path):
+    """Chunks are named after the upload; new contents under one name replace the old ones"""
+    upload_folder = str(tmp_path / "uploads")
+    client = app_client(pages=0, flask_config={'UPLOAD_FOLDER': upload_folder})
+    store = app_module.chroma_manager
+
+    first = client.post('/upload', data={'file': (io.BytesIO(_pdf_bytes(tmp_path, synthetic_pages(3))), 'a.pdf')})
+    assert first.get_json()['chunks'] > 0
+    source = os.path.join(upload_folder, 'a.pdf')
+    items = store.db.get(include=["metadatas"])
+    assert all(metadata["source"] == source for metadata in items["metadatas"])
+    assert all(chunk_id.startswith(f"{source}:") for chunk_id in items["ids"])
+
+    second = client.post('/upload', data={'file': (io.BytesIO(_pdf_bytes(tmp_path, synthetic_pages(6)[3:])), 'a.pdf')})
+    assert second.get_json()['chunks'] > 0
+    assert store.get_document_count() == second.get_json()['chunks']
+    hashes = {metadata["file_hash"] for metadata in store.db.get(include=["metadatas"])["metadatas"]}
+    assert len(hashes) == 1
+    assert len(os.listdir(upload_folder)) == 2
+
+
+def test_receive_upload_without_keep_and_pruning(tmp_path):
+    """keep=False leaves a temporary file for the caller; prune_uploads removes files past their age"""
+    folder = str(tmp_path)
+    digest, path, size = receive_upload(io.BytesIO(b"%PDF-1.4 test"), folder, keep=False)
+    assert size == 13 and len(digest) == 64 and os.path.basename(path) != f"{digest}.pdf"
+    with open(path, "rb") as f:
+        assert f.read() == b"%PDF-1.4 test"
+    os.remove(path)
+
+    _, path, _ = receive_upload(io.BytesIO(b"%PDF-1.4 old"), folder)
+    old = time.time() - 3 * 86400
+    os.utime(path, (old, old))
+    receive_upload(io.BytesIO(b"%PDF-1.4 new"), folder)
+    assert prune_uploads(folder, max_age_days=0) == 0
+    assert prune_uploads(folder, max_age_days=1) == 1
+    assert len(os.listdir(folder)) == 1